@@ -0,0 +1,84 @@
+r"""Seeded generators of synthetic nested JSON records.
+
+Each scenario returns the records and the Shoots that extract from them.
+The same seed always gives the same records.
+
+```
+>>> records, shoots = SCENARIOS['sparse'](1000, seed=0)
+```
+"""
+import random
+import string
+
+from shootsandleaves.shoot import Shoot
+
+
+def _word(rng, length=8):
+    r"""Return a random lowercase word."""
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def wide_flat(n, seed=0, width=100):
+    r"""Return records with `width` scalar fields at the top level."""
+    rng = random.Random(seed)
+    records = [{
+        f'field{i}': rng.random() if i % 2 else _word(rng)
+        for i in range(width)
+    } for _ in range(n)]
+    shoots = [Shoot(f'field{i}') for i in range(width)]
+    return records, shoots
+
+
+def deep(n, seed=0, depth=10, width=5):
+    r"""Return records with `width` fields nested `depth` levels down."""
+    rng = random.Random(seed)
+    path = [f'level{i}' for i in range(depth)]
+    records = []
+    for _ in range(n):
+        record = leaf = {}
+        for key in path:
+            leaf[key] = {}
+            leaf = leaf[key]
+        leaf.update({f'field{i}': rng.randint(0, 1000) for i in range(width)})
+        records.append(record)
+    prefix = '.'.join(path)
+    shoots = [Shoot(f'field{i}', f'{prefix}.field{i}', dtype='int64')
+              for i in range(width)]
+    return records, shoots
+
+
+def long_arrays(n, seed=0, length=100):
+    r"""Return records holding an array of `length` objects."""
+    rng = random.Random(seed)
+    records = [{
+        'id': i,
+        'items': [{'sku': _word(rng, 4), 'qty': rng.randint(1, 10)}
+                  for _ in range(length)],
+    } for i in range(n)]
+    shoots = [
+        Shoot('id', dtype='int64'),
+        Shoot('skus', 'items.:.sku'),
+        Shoot('qty', 'items.:.qty', transform=sum, default=0),
+        Shoot('first', 'items.0.sku'),
+    ]
+    return records, shoots
+
+
+def sparse(n, seed=0, width=100, density=0.1):
+    r"""Return records in which most of `width` fields are missing."""
+    rng = random.Random(seed)
+    records = [{
+        'event': {f'field{i}': rng.random()
+                  for i in range(width) if rng.random() < density}
+    } for _ in range(n)]
+    shoots = [Shoot(f'field{i}', f'event.field{i}', dtype='float64')
+              for i in range(width)]
+    return records, shoots
+
+
+SCENARIOS = {
+    'wide_flat': wide_flat,
+    'deep': deep,
+    'long_arrays': long_arrays,
+    'sparse': sparse,
+}
@@ -0,0 +1,161 @@
+r"""Measure extraction throughput and memory, and check for regressions.
+
+```
+$ python benchmarks/run.py --output results.json
+$ python benchmarks/run.py --baseline results.json --tolerance 0.2
+```
+
+For each scenario in `generators.SCENARIOS`, this times `get`,
+`Leaf.get_from`, `Shoot.extract` and `Grove.dataframe_from_iterator`,
+interpreted and compiled, and records the best throughput in records
+per second and, for the Groves, the peak memory traced while building
+the DataFrame. With `--baseline`, it exits with status 1 if any
+throughput falls more than `--tolerance` below the baseline's, or any
+peak memory rises more than `--tolerance` above it.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from generators import SCENARIOS
+
+from shootsandleaves.grove import Grove
+from shootsandleaves.leaf import get
+
+
+def _best_time(function, repeat):
+    r"""Return the shortest of `repeat` timings of `function()`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _peak_memory(function):
+    r"""Return the peak memory in bytes allocated while calling function."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_scenario(name, records, shoots, repeat):
+    r"""Return a dict of the results of each benchmark of one scenario."""
+    leaves = [leaf for shoot in shoots for leaf in shoot.explicit_leaves]
+    selectors = [leaf.selector for leaf in leaves]
+    grove = Grove(shoots)
+    compiled = Grove(shoots, compiled=True)
+
+    def run_get():
+        for obj in records:
+            for selector in selectors:
+                get(obj, selector)
+
+    def run_leaves():
+        for obj in records:
+            for leaf in leaves:
+                leaf.get_from(obj)
+
+    def run_shoots():
+        for obj in records:
+            for shoot in shoots:
+                shoot.extract(obj)
+
+    def run_grove():
+        grove.dataframe_from_iterator(records)
+
+    def run_compiled():
+        compiled.dataframe_from_iterator(records)
+
+    results = {}
+    for benchmark, function in (('get', run_get),
+                                ('leaf_get_from', run_leaves),
+                                ('shoot_extract', run_shoots),
+                                ('grove_dataframe', run_grove),
+                                ('grove_compiled', run_compiled)):
+        seconds = _best_time(function, repeat)
+        results[f'{name}.{benchmark}'] = {
+            'seconds': seconds,
+            'records_per_second': len(records) / seconds,
+        }
+    for benchmark, function in (('grove_dataframe', run_grove),
+                                ('grove_compiled', run_compiled)):
+        results[f'{name}.{benchmark}']['peak_bytes'] = _peak_memory(function)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    r"""Return a list of messages describing regressions from baseline."""
+    regressions = []
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            continue
+        expected = baseline[key]['records_per_second']
+        actual = result['records_per_second']
+        if actual < expected * (1 - tolerance):
+            regressions.append(
+                f'{key}: {actual:,.0f} records/s is '
+                f'{1 - actual / expected:.0%} below {expected:,.0f}')
+        if 'peak_bytes' in result and 'peak_bytes' in baseline[key]:
+            expected = baseline[key]['peak_bytes']
+            actual = result['peak_bytes']
+            if actual > expected * (1 + tolerance):
+                regressions.append(
+                    f'{key}: peak memory of {actual:,} bytes is '
+                    f'{actual / expected - 1:.0%} above {expected:,}')
+    return regressions
+
+
+def main(argv=None):
+    r"""Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--records', type=int, default=5000,
+                        help='number of records per scenario')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timings per benchmark; the best is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', action='append',
+                        choices=sorted(SCENARIOS),
+                        help='scenario to run; may be repeated')
+    parser.add_argument('--output', help='file to write results to')
+    parser.add_argument('--baseline', help='results file to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed fractional drop in throughput, '
+                        'and rise in peak memory')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.scenario or sorted(SCENARIOS):
+        records, shoots = SCENARIOS[name](args.records, seed=args.seed)
+        results.update(run_scenario(name, records, shoots, args.repeat))
+    for key, result in sorted(results.items()):
+        print(f'{key:32} {result["records_per_second"]:>14,.0f} records/s')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'records': args.records,
+                'seed': args.seed,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f'REGRESSION {message}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
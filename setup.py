@@ -14,6 +14,7 @@ setuptools.setup(
         'Operating System :: OS Independent',
     ),
     description='Declarative framework for loading JSON into Pandas',
+    extras_require={'arrow': ['pyarrow'], 'simdjson': ['pysimdjson']},
     include_package_data=True,
     install_requires=['pandas', 'six'],
     long_description=long_description,
@@ -0,0 +1,89 @@
+r"""Incremental extraction for long-running consumers.
+
+```
+>>> accumulator = GroveAccumulator(grove)
+>>> for message in consumer:
+...     accumulator.add(message)
+...     if time_to_report():
+...         report(accumulator.snapshot())
+...     if time_to_flush():
+...         write(accumulator.drain())
+```
+"""
+
+
+class GroveAccumulator(object):
+    r"""Collect the values a Grove extracts, an object at a time.
+
+    Values are appended straight to the Grove's column buffers, without
+    building a dict per object. Integer and bool shoots always use the
+    nullable dtypes, and every DataFrame returned has the dtypes of the
+    first, as for `Grove.iter_dataframes`. Categorical shoots keep their
+    dictionaries, and so their codes, across drains.
+    """
+
+    def __init__(self, grove, capacity=None):
+        r"""Construct an empty GroveAccumulator for `grove`.
+
+        The typed buffers start with room for `capacity` objects, and
+        double in size whenever they fill.
+        """
+        self.grove = grove
+        self.capacity = capacity
+        self._dtypes = {}
+        self._dictionaries = {}
+        self._reset()
+
+    def _reset(self):
+        r"""Replace the columns with empty ones."""
+        self._columns = self.grove._make_columns(
+            self.capacity, nullable=True, dictionaries=self._dictionaries)
+        self._appends = [column.append for column in self._columns]
+        self._size = 0
+
+    def __len__(self):
+        r"""Return the number of objects added since the last drain."""
+        return self._size
+
+    def add(self, obj):
+        r"""Extract the values of `obj`."""
+        for append, value in zip(self._appends,
+                                 self.grove._project_row(obj)):
+            append(value)
+        self._size += 1
+
+    def add_many(self, data):
+        r"""Extract the values of each object in `data`."""
+        self._size += self.grove._fill(self._columns, data)
+
+    def _dataframe(self, series):
+        r"""Return a DataFrame of `series`, with the dtypes of the first.
+
+        Empty DataFrames do not set the dtypes.
+        """
+        if self._size:
+            series = self.grove._conform(series, self._dtypes)
+        return self.grove._dataframe(series)
+
+    def snapshot(self):
+        r"""Return a DataFrame of the objects added since the last drain.
+
+        Typed and categorical columns are views of the buffers rather
+        than copies, so a snapshot costs little however many objects
+        have been added. Objects added later do not change it. The views
+        are read-only, so writing to them raises a ValueError rather
+        than changing later snapshots; copy a snapshot to modify it.
+        Columns held in lists, and those of shoots with a vectorized
+        transform, are converted in full.
+        """
+        return self._dataframe([column.view() for column in self._columns])
+
+    def drain(self):
+        r"""Return a DataFrame of the objects added, and start afresh.
+
+        The buffers are handed to the DataFrame, so once it and any
+        snapshots are released, so is their memory.
+        """
+        df = self._dataframe([column.to_series() for column in self._columns])
+        self._reset()
+        return df
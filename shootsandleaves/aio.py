@@ -0,0 +1,62 @@
+r"""Helpers for extracting objects that arrive from async iterators.
+
+```
+>>> async for batch in async_batches(consumer, size=1000, interval=5):
+...     pass  # Up to 1000 objects, or those received within 5 seconds.
+```
+"""
+import asyncio
+
+
+async def async_batches(data, size, interval=None):
+    r"""Yield successive lists of up to `size` objects from `data`.
+
+    `data` is an async iterable. If `interval` is given, a list is also
+    yielded once `interval` seconds have passed since its first object
+    arrived, even while waiting for the next object.
+    """
+    iterator = data.__aiter__()
+    batch = []
+    if interval is None:
+        async for obj in iterator:
+            batch.append(obj)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = None
+    # The next object is awaited in a task, which keeps running when
+    # the wait for it times out.
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - loop.time(), 0)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield batch
+                batch, deadline = [], None
+                continue
+            task, pending = pending, None
+            try:
+                obj = task.result()
+            except StopAsyncIteration:
+                break
+            if not batch:
+                deadline = loop.time() + interval
+            batch.append(obj)
+            if len(batch) == size:
+                yield batch
+                batch, deadline = [], None
+    finally:
+        if pending is not None:
+            pending.cancel()
+    if batch:
+        yield batch
@@ -0,0 +1,137 @@
+r"""Apache Arrow arrays built directly from extracted values.
+
+```
+>>> table = grove.to_arrow(data)
+>>> for batch in grove.iter_record_batches(data, batch_size=10000):
+...     writer.write_batch(batch)
+```
+
+This requires the optional `pyarrow` package. Values are converted by
+`pyarrow.array`, so strings are packed into Arrow's string buffers,
+lists, such as the values of leaves with a slice, become list arrays,
+and dicts become struct arrays.
+"""
+from pandas import CategoricalDtype, DatetimeTZDtype, StringDtype, api
+from shootsandleaves.column import TypedColumn, typed_dtype
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+
+def require_pyarrow():
+    r"""Raise an ImportError if pyarrow is not installed."""
+    if pyarrow is None:
+        raise ImportError('Arrow output requires the pyarrow package')
+
+
+def arrow_type(dtype):
+    r"""Return the Arrow type for a Shoot's `dtype`, or None to infer it.
+
+    `dtype` may be an Arrow type, or anything pandas accepts as a dtype.
+    A ValueError is raised if it has no Arrow equivalent.
+    """
+    if dtype is None or isinstance(dtype, pyarrow.DataType):
+        return dtype
+    dtype = api.types.pandas_dtype(dtype)
+    if isinstance(dtype, CategoricalDtype):
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    if isinstance(dtype, StringDtype):
+        return pyarrow.string()
+    if isinstance(dtype, DatetimeTZDtype):
+        return pyarrow.timestamp(dtype.unit, tz=str(dtype.tz))
+    # The nullable extension dtypes, such as Int64, wrap a numpy dtype.
+    dtype = getattr(dtype, 'numpy_dtype', dtype)
+    if dtype.kind == 'O':
+        return None
+    try:
+        return pyarrow.from_numpy_dtype(dtype)
+    except (TypeError, pyarrow.ArrowNotImplementedError) as e:
+        raise ValueError(f'dtype {dtype} has no Arrow equivalent') from e
+
+
+class ArrowColumn(object):
+    r"""A column of a Shoot's values, converted to an Arrow array at the end.
+
+    Missing values, None or NaN, become nulls. Values of shoots with a
+    numeric, bool or datetime `dtype` are collected in a `TypedColumn`,
+    so they are converted as for `Grove.dataframe_from_iterator`, such
+    as datetimes parsed from strings.
+    """
+
+    def __init__(self, shoot):
+        r"""Construct an empty ArrowColumn for `shoot`."""
+        self.shoot = shoot
+        self.type = arrow_type(shoot.dtype)
+        typed = None
+        if not isinstance(shoot.dtype, pyarrow.DataType):
+            typed = typed_dtype(shoot.dtype)
+        if typed is None:
+            self.values = []
+            self.append = self.values.append
+        else:
+            self.values = TypedColumn(typed)
+            self.append = self.values.append
+
+    def __len__(self):
+        r"""Return the number of values appended."""
+        return len(self.values)
+
+    def to_array(self):
+        r"""Return an Arrow array of the values appended."""
+        if isinstance(self.values, TypedColumn):
+            return pyarrow.Array.from_pandas(self.values.to_series(),
+                                             type=self.type)
+        return pyarrow.array(self.values, type=self.type, from_pandas=True)
+
+
+def _common_type(name, arrow_type, other):
+    r"""Return the type holding the values of both Arrow types.
+
+    Null types take the other type, numbers are widened, and the fields
+    of structs, including those in lists, are merged. A ValueError
+    naming the column is raised if the types are incompatible.
+    """
+    try:
+        return pyarrow.unify_schemas(
+            [pyarrow.schema([(name, arrow_type)]),
+             pyarrow.schema([(name, other)])],
+            promote_options='permissive').field(0).type
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+        raise ValueError(
+            f'Column {name!r} has values of type {other} which cannot be '
+            f'combined with the type {arrow_type} of earlier batches. Set '
+            'the dtype of its Shoot.') from e
+
+
+def record_batch(shoots, columns, schema=None):
+    r"""Return a RecordBatch holding the values of `columns`.
+
+    `columns` holds an `ArrowColumn` for each of `shoots`, or a
+    `ProjectionColumn` for shoots with a vectorized transform. If
+    `schema` is given, each array is cast to the common type of its
+    field in `schema` and its own, as by `_common_type`, so that no
+    values are lost; the batch's schema then holds the types of both.
+    A ValueError naming the column is raised if a conversion fails.
+    """
+    arrays = []
+    for i, (shoot, column) in enumerate(zip(shoots, columns)):
+        name = shoot.column_name
+        try:
+            if isinstance(column, ArrowColumn):
+                array = column.to_array()
+            else:
+                array = pyarrow.Array.from_pandas(
+                    column.to_series(), type=arrow_type(shoot.dtype))
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError,
+                pyarrow.ArrowNotImplementedError) as e:
+            raise ValueError(
+                f'Column {name!r} cannot be converted to Arrow: {e}. '
+                'Set the dtype of its Shoot.') from e
+        if schema is not None and array.type != schema.field(i).type:
+            array = array.cast(
+                _common_type(name, schema.field(i).type, array.type))
+        arrays.append(array)
+    return pyarrow.RecordBatch.from_arrays(
+        arrays, names=[shoot.column_name for shoot in shoots])
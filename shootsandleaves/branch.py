@@ -0,0 +1,311 @@
+r"""A trie of Leaf selectors for walking shared prefixes once.
+
+```
+>>> branch = Branch([Leaf('a.b.x'), Leaf('a.b.y'), Leaf('a.:.z')])
+>>> branch.get_from(obj)  # The same as [lf.get_from(obj) for lf in ...]
+```
+"""
+from operator import itemgetter
+
+from shootsandleaves.leaf import (_GUARDED_MISS_RATE, _LOOKUP_ERRORS,
+                                  _MISSING_VALUE, _PROBE_CALLS,
+                                  _compile_guarded, _compile_path,
+                                  _compile_selector, _fan_out, _field_key,
+                                  _guarded_step)
+
+
+class _Node(object):
+    r"""A node in a Branch, reached by applying `fields` to its parent.
+
+    A node whose final field is a slice "fans out": its children are
+    applied to each item of the sliced iterable.
+    """
+
+    def __init__(self, fields=()):
+        self.fields = list(fields)
+        self.children = {}
+        # Indexes of leaves whose selector ends at this node.
+        self.terminal = []
+        # Indexes of all leaves in the subtree rooted at this node.
+        self.indexes = []
+        # For a fan-out, (index, accessor, default) for each leaf below
+        # it, the accessor applying the rest of its selector to an item.
+        self.rests = []
+        # Whether the fields are looked up guarded, as chosen by
+        # `Branch.adapt` from the number of times the node was reached
+        # and found missing while probing.
+        self.guarded = True
+        self.calls = 0
+        self.misses = 0
+
+    @property
+    def plain_field(self):
+        r"""Return the field of a node of one hashable field, or None."""
+        if len(self.fields) != 1:
+            return None
+        field, = self.fields
+        try:
+            hash(field)
+        except TypeError:
+            return None
+        return None if isinstance(field, slice) else field
+
+    @property
+    def fan_out(self):
+        r"""Return True if the children apply to items of a slice."""
+        return bool(self.fields) and isinstance(self.fields[-1], slice)
+
+    def insert(self, fields, index):
+        r"""Add the leaf `index`, with selector `fields`, below self."""
+        node = self
+        node.indexes.append(index)
+        for field in fields:
+            node = node.children.setdefault(_field_key(field),
+                                            _Node([field]))
+            node.indexes.append(index)
+        node.terminal.append(index)
+
+    def compress(self):
+        r"""Merge chains of single-child nodes into runs of fields."""
+        while (len(self.children) == 1 and not self.terminal
+               and not self.fan_out and self.fields):
+            child, = self.children.values()
+            self.fields.extend(child.fields)
+            self.children = child.children
+            self.terminal = child.terminal
+        for child in self.children.values():
+            child.compress()
+        self.path = _compile_path(self.fields) if self.fields else None
+        self.guarded_path = (_compile_guarded(self.fields) if self.fields
+                             else None)
+        terminal = set(self.terminal)
+        # Leaves below a fan-out which receive one value per item.
+        self.fanned = [_ for _ in self.indexes if _ not in terminal]
+
+    def walk(self):
+        r"""Yield the nodes below self, in depth-first order."""
+        for child in self.children.values():
+            yield child
+            yield from child.walk()
+
+
+def _compile_step(node, depth, leaves, probe=False):
+    r"""Return a function storing the values of the leaves below `node`.
+
+    The function is called as `step(obj, out)`, with the value of the
+    parent of `node`, and stores each leaf's value at its index in `out`.
+    `depth` is the number of fields of the selectors applied up to and
+    including `node`. Leaves below a slice are each evaluated by their
+    own accessor, applied to every item, rather than walking the rest
+    of the trie per item, which costs more than it shares.
+
+    If `node.guarded`, fields are looked up in dicts with `dict.get`,
+    which is cheapest when they are often missing, and otherwise by
+    catching the exception of a missing field, which is cheapest when
+    they are usually present. If `probe`, they are looked up guarded,
+    and the step also counts in `node.calls` and `node.misses` how
+    often it is called and finds its fields missing.
+    """
+    terminal = node.terminal
+    missing = [(_, leaves[_].default) for _ in node.indexes]
+    if node.fan_out:
+        node.rests = [
+            (_, _compile_selector(leaves[_].selector[depth:]),
+             leaves[_].default)
+            for _ in node.fanned
+        ]
+        rests = node.rests
+
+        def below(value, out):
+            for index, rest, default in rests:
+                out[index] = _fan_out(value, rest, default)
+    else:
+        below = _compile_children(node, depth, leaves, probe)
+
+    if probe:
+        path = node.guarded_path
+
+        def step(obj, out):
+            node.calls += 1
+            value = path(obj, _MISSING_VALUE)
+            if value is _MISSING_VALUE:
+                node.misses += 1
+                for index, default in missing:
+                    out[index] = default
+                return
+            for index in terminal:
+                out[index] = value
+            below(value, out)
+        return step
+    if node.guarded:
+        return _compile_guarded_step(node, leaves, missing, below)
+
+    path = node.path
+    if len(node.fields) == 1:
+        # Subscripting through itemgetter avoids a Python-level call.
+        f0, = node.fields
+        path = itemgetter(f0)
+
+    if not node.children and len(terminal) == 1:
+        # The commonest node: a single leaf ending here.
+        index, = terminal
+        default = leaves[index].default
+        if len(node.fields) == 1:
+            def step(obj, out):
+                try:
+                    out[index] = obj[f0]
+                except _LOOKUP_ERRORS:
+                    out[index] = default
+        else:
+            def step(obj, out):
+                try:
+                    out[index] = path(obj)
+                except _LOOKUP_ERRORS:
+                    out[index] = default
+        return step
+
+    def step(obj, out):
+        try:
+            value = path(obj)
+        except _LOOKUP_ERRORS:
+            for index, default in missing:
+                out[index] = default
+            return
+        for index in terminal:
+            out[index] = value
+        below(value, out)
+    return step
+
+
+def _compile_guarded_step(node, leaves, missing, below):
+    r"""Return the step of `node` looking its fields up guarded.
+
+    `missing` and `below` are as made by `_compile_step`.
+    """
+    terminal = node.terminal
+    path = node.guarded_path
+    f0 = node.plain_field
+    s0 = None if f0 is None else _guarded_step(f0)
+
+    if not node.children and len(terminal) == 1:
+        index, = terminal
+        default = leaves[index].default
+        if f0 is None:
+            def step(obj, out):
+                out[index] = path(obj, default)
+        else:
+            def step(obj, out):
+                if type(obj) is dict:
+                    out[index] = obj.get(f0, default)
+                else:
+                    value = s0(obj)
+                    out[index] = default if value is _MISSING_VALUE else value
+        return step
+
+    def step(obj, out):
+        if f0 is not None and type(obj) is dict:
+            value = obj.get(f0, _MISSING_VALUE)
+        else:
+            value = path(obj, _MISSING_VALUE)
+        if value is _MISSING_VALUE:
+            for index, default in missing:
+                out[index] = default
+            return
+        for index in terminal:
+            out[index] = value
+        below(value, out)
+    return step
+
+
+def _compile_children(node, depth, leaves, probe=False):
+    r"""Return a function storing the values of the leaves below `node`.
+
+    It is called as `walk(value, out)` with the value `node` resolved
+    to, and calls the step of each child; see `_compile_step`.
+    """
+    steps = [_compile_step(child, depth + len(child.fields), leaves, probe)
+             for child in node.children.values()]
+    if len(steps) == 1:
+        return steps[0]
+
+    def walk(obj, out):
+        for step in steps:
+            step(obj, out)
+    return walk
+
+
+class Branch(object):
+    r"""Evaluate many Leaves against an object in a single traversal.
+
+    The selectors of all leaves are merged into a trie. Each interior
+    node is resolved once per object, and its value is shared with every
+    leaf beneath it. The trie is compiled into nested closures, one per
+    node, so that walking it costs no more per leaf than calling the
+    leaf's own accessor. Below a slice, each leaf applies its own
+    accessor to the items.
+
+    A missing field costs several times more to look up by catching its
+    exception than by checking for it first, while checking costs a
+    little more for fields that are present. So the first
+    `_PROBE_CALLS` objects are walked checking for fields and counting
+    how often each node's are missing, and then `adapt` recompiles the
+    trie, choosing the cheaper lookup for each node.
+    """
+
+    def __init__(self, leaves):
+        r"""Construct a Branch from an iterable of Leaves."""
+        self.leaves = list(leaves)
+        self.defaults = [leaf.default for leaf in self.leaves]
+        self._root = _Node()
+        for index, leaf in enumerate(self.leaves):
+            self._root.insert(leaf.selector, index)
+        self._root.compress()
+        self._walk = None
+        self._probes = 0
+        if self._root.children:
+            self._probing = _compile_children(self._root, 0, self.leaves,
+                                              probe=True)
+            self._walk = self._probe
+
+    def _probe(self, obj, out):
+        r"""Walk the trie counting missing fields, adapting once enough are."""
+        self._probing(obj, out)
+        self._probes += 1
+        if self._probes == _PROBE_CALLS:
+            self.adapt()
+
+    def probe(self, objs):
+        r"""Count the fields missing from `objs`, then `adapt` to them."""
+        if self._root.children:
+            out = [None] * len(self.leaves)
+            for obj in objs:
+                self._probing(obj, out)
+        self.adapt()
+
+    def adapt(self):
+        r"""Choose how each node looks up its fields from the counts so far.
+
+        Nodes whose fields were missing from at least `_GUARDED_MISS_RATE`
+        of the objects they were looked up in check for them, and others
+        catch the exception of a missing field. Nodes never reached keep
+        checking.
+        """
+        for node in self._root.walk():
+            if node.calls:
+                node.guarded = (
+                    node.misses >= _GUARDED_MISS_RATE * node.calls)
+        if self._root.children:
+            self._walk = _compile_children(self._root, 0, self.leaves)
+
+    def get_from(self, obj):
+        r"""Return a list of the value of each leaf in `obj`.
+
+        The result is equal to `[leaf.get_from(obj) for leaf in
+        self.leaves]`.
+        """
+        out = [None] * len(self.leaves)
+        for index in self._root.terminal:
+            out[index] = obj
+        if self._walk is not None:
+            self._walk(obj, out)
+        return out
@@ -0,0 +1,144 @@
+r"""Generate a single Python function that extracts a Grove's rows.
+
+```
+>>> fill, source = compile_fill(branch, shoots, shoot_indexes)
+>>> print(source)
+>>> rows = fill(data, [column.append for column in columns])
+```
+
+The generated function walks a Branch's trie inline, looking each
+node's fields up as the Branch chose to, and appends each shoot's value
+straight to its column, so that no method is called per cell other than
+the transforms.
+Leaves below a slice apply their own accessors to its items, as in
+`Branch`.
+"""
+from shootsandleaves.leaf import (_LOOKUP_ERRORS, _MISSING_VALUE, _fan_out,
+                                  _guarded_step)
+
+
+class _Writer(object):
+    r"""Accumulate the source lines and global names of a function."""
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {'LOOKUP_ERRORS': _LOOKUP_ERRORS,
+                          'MISSING': _MISSING_VALUE, 'fan_out': _fan_out}
+        self._nodes = 0
+
+    def emit(self, depth, line):
+        r"""Add `line`, indented `depth` levels."""
+        self.lines.append('    ' * depth + line)
+
+    def constant(self, prefix, value):
+        r"""Return the name of a global bound to `value`."""
+        name = f'{prefix}{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def literal(self, field):
+        r"""Return source for the selector field `field`."""
+        if type(field) in (str, int):
+            return repr(field)
+        return self.constant('F', field)
+
+    def node(self):
+        r"""Return a new name for the value of a node."""
+        self._nodes += 1
+        return f'n{self._nodes}'
+
+
+def _emit_children(writer, branch, node, parent, depth):
+    r"""Emit code storing the values of the leaves below `node`.
+
+    `parent` names the value that `node` resolved to. Nodes that
+    `Branch.adapt` chose to guard check for their fields, looking them
+    up in dicts with `dict.get`, and others catch the exception of a
+    missing field.
+    """
+    for child in node.children.values():
+        name = writer.node()
+        field = child.plain_field
+        if not child.guarded:
+            path = ''.join(f'[{writer.literal(_)}]' for _ in child.fields)
+            writer.emit(depth, 'try:')
+            writer.emit(depth + 1, f'{name} = {parent}{path}')
+            writer.emit(depth, 'except LOOKUP_ERRORS:')
+        elif field is not None:
+            step = writer.constant('step', _guarded_step(field))
+            writer.emit(depth, f'if type({parent}) is dict:')
+            writer.emit(depth + 1, f'{name} = {parent}.get('
+                        f'{writer.literal(field)}, MISSING)')
+            writer.emit(depth, 'else:')
+            writer.emit(depth + 1, f'{name} = {step}({parent})')
+            writer.emit(depth, f'if {name} is MISSING:')
+        else:
+            path = writer.constant('path', child.guarded_path)
+            writer.emit(depth, f'{name} = {path}({parent}, MISSING)')
+            writer.emit(depth, f'if {name} is MISSING:')
+        for index in child.indexes:
+            writer.emit(depth + 1, f'v{index} = d{index}')
+        writer.emit(depth, 'else:')
+        for index in child.terminal:
+            writer.emit(depth + 1, f'v{index} = {name}')
+        if child.fan_out:
+            # Each leaf below the slice applies its own accessor to the
+            # items, as in `Branch`.
+            for index, rest, _default in child.rests:
+                rest = writer.constant('rest', rest)
+                writer.emit(depth + 1,
+                            f'v{index} = fan_out({name}, {rest}, d{index})')
+        else:
+            _emit_children(writer, branch, child, name, depth + 1)
+
+
+def _shoot_value(writer, shoot, indexes):
+    r"""Return an expression for the value of `shoot` to append."""
+    values = ', '.join(f'v{_}' for _ in indexes)
+    if shoot.vectorized_transform is not None:
+        # The projection is transformed a column at a time.
+        return f'[{values}]'
+    if shoot.transform is None:
+        return f'v{indexes[0]}' if shoot._single else f'[{values}]'
+    transform = writer.constant('transform', shoot.transform)
+    if not shoot._single:
+        return f'{transform}([{values}])'
+    default = writer.constant('default', shoot.default)
+    value = f'v{indexes[0]}'
+    return f'({value} if {value} is {default} else {transform}({value}))'
+
+
+def compile_fill(branch, shoots, shoot_indexes):
+    r"""Return a function appending the values of shoots, and its source.
+
+    `shoot_indexes` holds, for each shoot, the positions in
+    `branch.leaves` of its leaves. The function is called as `fill(data,
+    appends)`, with a function appending to the column of each shoot,
+    and returns the number of objects in `data`, as `Grove._fill` does.
+
+    A SyntaxError is raised if the function cannot be compiled, as when
+    the trie is nested more deeply than Python allows.
+    """
+    writer = _Writer()
+    for index, default in enumerate(branch.defaults):
+        writer.namespace[f'd{index}'] = default
+    writer.emit(0, 'def fill(data, appends):')
+    if shoots:
+        names = ', '.join(f'append{_}' for _ in range(len(shoots)))
+        writer.emit(1, f'{names}, = appends')
+    writer.emit(1, 'rows = 0')
+    writer.emit(1, 'for rows, obj in enumerate(data, 1):')
+    for index in branch._root.terminal:
+        writer.emit(2, f'v{index} = obj')
+    _emit_children(writer, branch, branch._root, 'obj', 2)
+    for position, (shoot, indexes) in enumerate(zip(shoots, shoot_indexes)):
+        value = _shoot_value(writer, shoot, indexes)
+        writer.emit(2, f'append{position}({value})')
+    if not shoots:
+        writer.emit(2, 'pass')
+    writer.emit(1, 'return rows')
+
+    source = '\n'.join(writer.lines) + '\n'
+    code = compile(source, '<grove>', 'exec')
+    exec(code, writer.namespace)
+    return writer.namespace['fill'], source
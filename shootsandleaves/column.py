@@ -0,0 +1,616 @@
+r"""Growable column buffers for building DataFrames one value at a time.
+
+```
+>>> column = make_column('float64', capacity=1000)
+>>> column.append(1.5)
+>>> column.to_series(name='amount')
+```
+"""
+import numpy as np
+from pandas import (NaT, Categorical, CategoricalDtype, DataFrame,
+                    MultiIndex, Series, Timestamp, api, isna)
+from pandas.arrays import BooleanArray, IntegerArray
+from shootsandleaves.schema import ACCEPTED_TYPES, is_missing
+
+# Kinds of numpy dtype that are stored in typed buffers: bool, signed
+# and unsigned integers, floats, timedeltas and datetimes.
+_TYPED_KINDS = 'biufmM'
+
+# Capacity of a typed buffer when no better estimate is available.
+_INITIAL_CAPACITY = 1024
+
+
+def typed_dtype(dtype):
+    r"""Return the numpy dtype for `dtype` if it can be buffered, else None."""
+    if dtype is None:
+        return None
+    try:
+        dtype = np.dtype(dtype)
+    except TypeError:
+        return None
+    return dtype if dtype.kind in _TYPED_KINDS else None
+
+
+def categorical_dtype(dtype):
+    r"""Return the CategoricalDtype for `dtype` if it is one, else None."""
+    if dtype is None:
+        return None
+    try:
+        dtype = api.types.pandas_dtype(dtype)
+    except TypeError:
+        return None
+    return dtype if isinstance(dtype, CategoricalDtype) else None
+
+
+def make_column(dtype=None, capacity=None, nullable=False, codes=None):
+    r"""Return an empty column suited to values of `dtype`.
+
+    Numeric, bool, timedelta and datetime dtypes get a `TypedColumn`,
+    'category' gets a `CategoryColumn` using the dictionary `codes`,
+    and anything else, including None, gets an `ObjectColumn`.
+    """
+    categorical = categorical_dtype(dtype)
+    if categorical is not None:
+        return CategoryColumn(categorical, capacity, codes)
+    typed = typed_dtype(dtype)
+    if typed is None:
+        return ObjectColumn(dtype)
+    return TypedColumn(typed, capacity, nullable)
+
+
+class ObjectColumn(object):
+    r"""A column holding values in a list, converted to `dtype` at the end."""
+
+    def __init__(self, dtype=None):
+        r"""Construct an empty ObjectColumn."""
+        self.dtype = dtype
+        self.values = []
+        self.append = self.values.append
+        self.extend = self.values.extend
+
+    def __len__(self):
+        r"""Return the number of values appended."""
+        return len(self.values)
+
+    def to_series(self, name=None):
+        r"""Return a Series of the values appended."""
+        return Series(self.values, dtype=self.dtype, name=name)
+
+    view = to_series
+
+
+class ProjectionColumn(object):
+    r"""A column of the projections of a Shoot with a vectorized transform.
+
+    The values of each leaf are kept in a list of their own, and the
+    Shoot turns them into a single Series at the end.
+    """
+
+    def __init__(self, shoot):
+        r"""Construct an empty ProjectionColumn for `shoot`."""
+        self.shoot = shoot
+        self.columns = [[] for _ in shoot.explicit_leaves]
+        self._size = 0
+
+    def __len__(self):
+        r"""Return the number of projections appended."""
+        return self._size
+
+    def append(self, projection):
+        r"""Append the result of `self.shoot.project` for one object."""
+        for column, value in zip(self.columns, projection):
+            column.append(value)
+        self._size += 1
+
+    def view(self, name=None):
+        r"""Return a Series of the extracted values so far.
+
+        The vectorized transform is applied to all of the projections
+        appended so far.
+        """
+        series = self.shoot.extract_from_projections(self.columns)
+        series.name = name
+        return series
+
+    def to_series(self, name=None):
+        r"""Return a Series of the extracted values, emptying the column."""
+        columns = self.columns
+        self.columns = [[] for _ in columns]
+        self._size = 0
+        series = self.shoot.extract_from_projections(columns)
+        series.name = name
+        return series
+
+
+def _to_integer(value):
+    r"""Return `value`, raising a ValueError if it is a fractional float.
+
+    numpy would truncate it, where pandas refuses to.
+    """
+    if isinstance(value, (float, np.floating)) and not value.is_integer():
+        raise ValueError(
+            f'Trying to coerce float values to integers: {value!r}')
+    return value
+
+
+def _to_datetime(value):
+    r"""Return `value` parsed by pandas as a naive numpy datetime64.
+
+    A ValueError is raised if it is missing, or has a timezone, which a
+    datetime64 column cannot hold.
+    """
+    timestamp = Timestamp(value)
+    if timestamp is NaT:
+        raise ValueError(f'{value!r} is not a datetime')
+    if timestamp.tzinfo is not None:
+        raise ValueError(
+            f'Cannot store the timezone-aware {value!r} in a naive '
+            'datetime64 column; use a DatetimeTZDtype such as '
+            "'datetime64[ns, UTC]'")
+    return timestamp.to_datetime64()
+
+
+# Conversions applied by `TypedColumn.append` before storing a value.
+_CONVERTERS = {'i': _to_integer, 'u': _to_integer, 'M': _to_datetime}
+
+
+def _integral_array(values, dtype):
+    r"""Return `values` as an array that fits the integer `dtype` exactly.
+
+    Returns None if that needs converting values one at a time, as when
+    some are missing, fractional or out of range.
+    """
+    try:
+        array = np.asarray(values)
+    except (TypeError, ValueError):
+        return None
+    if array.dtype.kind in 'iub':
+        return array if np.can_cast(array.dtype, dtype) else None
+    if array.dtype.kind != 'f' or not len(array):
+        return None
+    info = np.iinfo(dtype)
+    if (np.isfinite(array).all() and np.array_equal(array, np.trunc(array))
+            and info.min <= array.min() and array.max() <= info.max):
+        return array.astype(dtype)
+    return None
+
+
+class TypedColumn(object):
+    r"""A column holding values in a preallocated numpy buffer.
+
+    The buffer doubles in size whenever it fills. Missing values, None
+    or anything `isna` recognises, are recorded in a validity mask.
+    `to_series` wraps the buffer without copying it: masked slots become
+    NaN or NaT for float and datetime dtypes, and integer or bool
+    columns with missing values become the nullable `Int64`-style or
+    `boolean` extension dtypes. If `nullable` is True, integer and bool
+    columns always use the nullable dtypes, so that the dtype does not
+    depend on the values.
+
+    Values are converted as `Series(values, dtype=dtype)` would convert
+    them: floats with a fractional part raise a ValueError rather than
+    being truncated into integer columns, and datetimes are parsed by
+    pandas, which raises if they have a timezone. Datetime strings are
+    kept until `extend`, `view` or `to_series` parses them together, so
+    an `append`ed string which is not a datetime raises only then.
+    """
+
+    def __init__(self, dtype, capacity=None, nullable=False):
+        r"""Construct an empty TypedColumn with room for `capacity` values."""
+        self.dtype = np.dtype(dtype)
+        self.nullable = nullable
+        # Converts values that numpy would store silently, or differently
+        # from pandas, before they are stored.
+        self._convert = _CONVERTERS.get(self.dtype.kind)
+        # The positions and values of the datetime strings not yet parsed.
+        self._positions = []
+        self._strings = [] if self.dtype.kind == 'M' else None
+        self._reset(capacity)
+
+    def __len__(self):
+        r"""Return the number of values appended."""
+        return self._size
+
+    def _reset(self, capacity=None):
+        r"""Replace the buffers with empty ones."""
+        capacity = max(capacity or _INITIAL_CAPACITY, 1)
+        self._values = np.empty(capacity, dtype=self.dtype)
+        self._mask = np.zeros(capacity, dtype=bool)
+        self._size = 0
+        if self._strings is not None:
+            self._positions, self._strings = [], []
+        # True once `view` has handed out views of the buffers.
+        self._shared = False
+
+    def _grow(self):
+        r"""Double the capacity of the buffers."""
+        self._reserve(2 * len(self._values))
+
+    def _reserve(self, capacity):
+        r"""Enlarge the buffers to hold `capacity` values."""
+        values = np.empty(capacity, dtype=self.dtype)
+        values[:self._size] = self._values[:self._size]
+        mask = np.zeros(capacity, dtype=bool)
+        mask[:self._size] = self._mask[:self._size]
+        self._values, self._mask = values, mask
+
+    def append(self, value):
+        r"""Append `value`, converting it to `self.dtype`."""
+        size = self._size
+        if size == len(self._values):
+            self._grow()
+        if value is None:
+            self._mask[size] = True
+        elif self._strings is not None and isinstance(value, str):
+            self._positions.append(size)
+            self._strings.append(value)
+        else:
+            try:
+                convert = self._convert
+                self._values[size] = (value if convert is None
+                                      else convert(value))
+            except (TypeError, ValueError):
+                if not (np.ndim(value) == 0 and isna(value)):
+                    raise
+                self._mask[size] = True
+        self._size = size + 1
+
+    def extend(self, values):
+        r"""Append each of the list `values`.
+
+        The values are converted together when possible, and one at a
+        time, as by `append`, otherwise. If any value cannot be
+        converted, none of them are appended.
+        """
+        size = self._size
+        end = size + len(values)
+        if end > len(self._values):
+            # Grow geometrically, so that many small extends take linear
+            # time, as appends do.
+            self._reserve(max(end, 2 * len(self._values)))
+        kind = self.dtype.kind
+        if kind in 'fm':
+            # These kinds convert None to NaN or NaT, or fail.
+            try:
+                self._values[size:end] = values
+            except (TypeError, ValueError, OverflowError):
+                pass
+            else:
+                self._size = end
+                return
+        elif kind in 'iu':
+            array = _integral_array(values, self.dtype)
+            if array is not None:
+                self._values[size:end] = array
+                self._size = end
+                return
+        # Bool buffers would turn None into False rather than masking
+        # it, and datetimes are parsed by pandas.
+        try:
+            for value in values:
+                self.append(value)
+            self._parse()
+        except BaseException:
+            # Leave the column as it was.
+            self._mask[size:self._size] = False
+            self._size = size
+            positions = self._positions
+            while positions and positions[-1] >= size:
+                positions.pop()
+                self._strings.pop()
+            raise
+
+    def _parse(self):
+        r"""Store the datetime strings appended, parsed together by pandas.
+
+        Strings which pandas cannot parse together, such as ones in
+        several formats, are parsed one at a time, as `append` parses
+        other values. They are left unparsed if any raises.
+        """
+        strings = self._strings
+        if not strings:
+            return
+        try:
+            parsed = Series(strings, dtype=self.dtype).to_numpy()
+            if isna(parsed).any():
+                # Let `_to_datetime` raise about the empty string.
+                raise ValueError
+        except (TypeError, ValueError, OverflowError):
+            parsed = [_to_datetime(_) for _ in strings]
+        self._values[self._positions] = parsed
+        self._positions, self._strings = [], []
+
+    def _wrap(self, values, mask, name):
+        r"""Return a Series of `values`, missing where `mask` is True.
+
+        Missing float and datetime values must already be NaN or NaT;
+        see `_fill_missing`.
+        """
+        kind = values.dtype.kind
+        if kind in 'iub' and (self.nullable or mask.any()):
+            array = BooleanArray if kind == 'b' else IntegerArray
+            return Series(array(values, mask), name=name, copy=False)
+        return Series(values, name=name, copy=False)
+
+    @staticmethod
+    def _fill_missing(values, mask):
+        r"""Set missing float and datetime `values` to NaN or NaT.
+
+        Integer and bool values are left as they are, for their mask.
+        """
+        kind = values.dtype.kind
+        if kind not in 'iub' and mask.any():
+            values[mask] = np.nan if kind == 'f' else values.dtype.type('NaT')
+
+    def arrays(self):
+        r"""Return the values appended and their mask, as views of the buffers.
+
+        Slots where the mask is True hold arbitrary values.
+        """
+        self._parse()
+        size = self._size
+        return self._values[:size], self._mask[:size]
+
+    def view(self, name=None):
+        r"""Return a Series of the values appended so far, without copying.
+
+        The Series is a read-only view of the column's buffers, which
+        values appended later do not change. Writing to it raises a
+        ValueError rather than changing the column.
+        """
+        self._parse()
+        self._shared = True
+        size = self._size
+        values, mask = self._values[:size], self._mask[:size]
+        # The missing slots of the buffer hold arbitrary values, so they
+        # can be filled before the view is frozen.
+        self._fill_missing(values, mask)
+        values.setflags(write=False)
+        mask.setflags(write=False)
+        return self._wrap(values, mask, name)
+
+    def to_series(self, name=None):
+        r"""Return a Series wrapping the values appended.
+
+        The column's buffers are handed to the Series, so the column is
+        empty afterwards.
+        """
+        self._parse()
+        size = self._size
+        values, mask = self._values, self._mask
+        if self._shared:
+            # Views of the buffers exist, so they must not be resized.
+            values, mask = values[:size], mask[:size]
+        elif size < len(values):
+            # Release the unused tail. Nothing else refers to the
+            # buffers yet, so they can be shrunk in place.
+            values.resize(size, refcheck=False)
+            mask.resize(size, refcheck=False)
+        self._reset()
+        self._fill_missing(values, mask)
+        return self._wrap(values, mask, name)
+
+
+class CategoryColumn(object):
+    r"""A dictionary-encoded column, built into a Categorical at the end.
+
+    Each value is looked up in the dictionary `codes`, which maps values
+    to their integer codes, and gets the next code if it is new. Only
+    the codes are kept, in a `TypedColumn`, so repeated values cost four
+    bytes each. Missing values get the code -1. Categories are sorted,
+    as by `astype('category')`, when the Categorical is built, and the
+    codes are remapped to them, unless `dtype` lists the categories, in
+    which case other values are missing, as for `astype`.
+
+    A dictionary may be shared by several columns, such as the chunks of
+    a stream, so that their values are encoded consistently. The
+    categories of later columns then include those of earlier ones.
+    """
+
+    def __init__(self, dtype='category', capacity=None, codes=None):
+        r"""Construct an empty CategoryColumn."""
+        self.dtype = categorical_dtype(dtype)
+        self.fixed = self.dtype.categories is not None
+        if self.fixed:
+            codes = {value: i for i, value in
+                     enumerate(self.dtype.categories)}
+        self.codes = {} if codes is None else codes
+        self._codes = TypedColumn('int32', capacity)
+
+    def __len__(self):
+        r"""Return the number of values appended."""
+        return len(self._codes)
+
+    def append(self, value):
+        r"""Append the code of `value`, adding it to the dictionary if new."""
+        codes = self.codes
+        try:
+            code = codes[value]
+        except KeyError:
+            if (self.fixed or value is None
+                    or (np.ndim(value) == 0 and isna(value))):
+                code = -1
+            else:
+                code = codes[value] = len(codes)
+        self._codes.append(code)
+
+    def extend(self, values):
+        r"""Append the code of each of `values`."""
+        for value in values:
+            self.append(value)
+
+    def arrays(self):
+        r"""Return the codes appended and their mask, as for `TypedColumn`.
+
+        Missing values have the code -1, so the mask is all False.
+        """
+        return self._codes.arrays()
+
+    def to_series(self, name=None):
+        r"""Return a categorical Series of the values appended.
+
+        The codes are handed to the Series, so the column is empty
+        afterwards, though its dictionary is kept.
+        """
+        return self._wrap(self._codes.to_series().to_numpy(), name)
+
+    def view(self, name=None):
+        r"""Return a categorical Series of the values appended so far.
+
+        The codes are not copied; see `TypedColumn.view`.
+        """
+        return self._wrap(self._codes.view().to_numpy(), name)
+
+    def _wrap(self, codes, name):
+        r"""Return a categorical Series of `codes`.
+
+        Codes of a dictionary that is not already sorted are remapped
+        through a lookup array, which copies them.
+        """
+        dtype = self.dtype
+        if not self.fixed:
+            categories = list(self.codes)
+            # pandas sorts the categories as `astype` would, and keeps
+            # values it cannot sort in the order given.
+            ordered = Categorical(categories).categories
+            positions = ordered.get_indexer(categories)
+            if (positions != np.arange(len(positions))).any():
+                lookup = np.append(positions, -1).astype(codes.dtype)
+                codes = lookup[codes]
+            dtype = CategoricalDtype(ordered, dtype.ordered)
+        return Series(Categorical.from_codes(codes, dtype=dtype), name=name,
+                      copy=False)
+
+
+class WideningColumn(object):
+    r"""A column of an inferred dtype, which widens to fit other values.
+
+    Values of the types that `ACCEPTED_TYPES` lists for the dtype are
+    appended to a column made by `make_column`. Any other value widens
+    the column, converting the values appended so far: an 'int64'
+    column becomes 'float64' to hold a float, and any column becomes an
+    object column, whose dtype pandas infers, to hold anything else.
+    Missing values never widen a column.
+    """
+
+    def __init__(self, dtype, capacity=None, nullable=False, codes=None):
+        r"""Construct an empty WideningColumn of the inferred `dtype`."""
+        self.dtype = dtype
+        self.nullable = nullable
+        self._column = make_column(None if dtype == 'object' else dtype,
+                                   capacity, nullable, codes)
+        self._accepted = ACCEPTED_TYPES.get(dtype)
+
+    def __len__(self):
+        r"""Return the number of values appended."""
+        return len(self._column)
+
+    def append(self, value):
+        r"""Append `value`, widening the column first if need be."""
+        accepted = self._accepted
+        if (accepted is not None and type(value) not in accepted
+                and not is_missing(value)):
+            self._widen(value)
+        try:
+            self._column.append(value)
+        except (TypeError, ValueError, OverflowError):
+            # Such as an unhashable value in a categorical column, or an
+            # integer too large for int64.
+            if self.dtype == 'object':
+                raise
+            self._widen(None)
+            self._column.append(value)
+
+    def extend(self, values):
+        r"""Append each of `values`, widening the column if need be."""
+        for value in values:
+            self.append(value)
+
+    def _widen(self, value):
+        r"""Replace the column with one of a dtype wide enough for value."""
+        if self.dtype == 'int64' and isinstance(value, float):
+            dtype = 'float64'
+        else:
+            dtype = 'object'
+        series = self._column.to_series()
+        self.dtype = dtype
+        self._accepted = ACCEPTED_TYPES.get(dtype)
+        self._column = make_column(None if dtype == 'object' else dtype,
+                                   2 * len(series), self.nullable)
+        append = self._column.append
+        for value in series.astype(object).tolist():
+            append(None if isna(value) else value)
+
+    def view(self, name=None):
+        r"""Return a Series of the values appended so far."""
+        return self._column.view(name)
+
+    def to_series(self, name=None):
+        r"""Return a Series of the values appended."""
+        return self._column.to_series(name)
+
+
+def _length(value):
+    r"""Return the number of items in a list value, or 0 for a scalar."""
+    return len(value) if isinstance(value, (list, tuple)) else 0
+
+
+class ExplodedTable(object):
+    r"""Columns of the items of shoots that fan out over the same slice.
+
+    For each row, the list values of the shoots are appended item by
+    item to a column per shoot, typed as `make_column` would type the
+    shoot's `dtype`, and the number of items is recorded. The lists of
+    one row must all have that number of items. A value that is not a
+    list or tuple, such as a shoot's default when the slice is missing,
+    has no items.
+    """
+
+    def __init__(self, name):
+        r"""Construct an empty ExplodedTable named `name`."""
+        self.name = name
+        self.shoots = []
+        self.positions = []
+        self.columns = []
+        self.lengths = TypedColumn('int64')
+
+    def add(self, shoot, position):
+        r"""Add `shoot`, whose value is at `position` in each row."""
+        self.shoots.append(shoot)
+        self.positions.append(position)
+        self.columns.append(make_column(shoot.dtype))
+
+    def append(self, row):
+        r"""Append the items of the shoots' values in `row`."""
+        values = [row[_] for _ in self.positions]
+        size = _length(values[0])
+        for shoot, column, value in zip(self.shoots, self.columns, values):
+            if _length(value) != size:
+                raise ValueError(
+                    f'Column {shoot.column_name!r} has {_length(value)} '
+                    f'items where other columns over {self.name!r} have '
+                    f'{size}')
+            if size:
+                append = column.append
+                for item in value:
+                    append(item)
+        self.lengths.append(size)
+
+    def to_dataframe(self, parent_index):
+        r"""Return a long-format DataFrame of the items, emptying the table.
+
+        The DataFrame is indexed by the label in `parent_index` of the
+        row each item came from, and by the item's position in its list.
+        """
+        lengths = self.lengths.to_series().to_numpy()
+        starts = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) - np.repeat(starts, lengths)
+        index = MultiIndex.from_arrays(
+            [parent_index.repeat(lengths), positions],
+            names=[parent_index.name, 'position'])
+        series = {}
+        for shoot, column in zip(self.shoots, self.columns):
+            values = column.to_series()
+            values.index = index
+            series[shoot.column_name] = values
+        return DataFrame(series, index=index, copy=False)
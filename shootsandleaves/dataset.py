@@ -0,0 +1,247 @@
+r"""Writing partitioned Parquet datasets from NDJSON shards.
+
+```
+>>> grove.write_dataset('events/*.ndjson.gz', 'out', partition_by=['day'])
+```
+
+Each shard is written to files of its own, one per partition, in Hive
+style directories such as `out/day=2020-01-01/`. Files are written
+under temporary names and renamed once the whole shard is done, and the
+shard is then recorded in the manifest `out/_manifest.ndjson`, so that
+an interrupted run can be resumed without redoing recorded shards. This
+requires the optional `pyarrow` package.
+"""
+import glob
+import hashlib
+import json
+import os
+from functools import partial
+from urllib.parse import quote
+
+from shootsandleaves.arrow import pyarrow, require_pyarrow
+from shootsandleaves.ingest import DEFAULT_CHUNK_BYTES, iter_ndjson
+from shootsandleaves.parallel import DEFAULT_BATCH_SIZE, map_tasks
+
+# The name of the manifest of completed shards in a dataset directory.
+MANIFEST = '_manifest.ndjson'
+
+# The directory name of a partition whose value is missing, as in Hive.
+_NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+def shard_paths(inputs):
+    r"""Return a sorted list of paths from a glob pattern or iterable."""
+    if isinstance(inputs, (str, bytes, os.PathLike)):
+        return sorted(glob.glob(os.fsdecode(inputs)))
+    return sorted(os.fsdecode(_) for _ in inputs)
+
+
+def read_manifest(out_dir):
+    r"""Return a dict mapping recorded shard paths to their entries."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return {}
+    return {entry['shard']: entry for entry in entries}
+
+
+def record_shard(out_dir, entry):
+    r"""Append the entry of a completed shard to the manifest."""
+    with open(os.path.join(out_dir, MANIFEST), 'a') as f:
+        f.write(json.dumps(entry, sort_keys=True) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _partition_dir(names, key):
+    r"""Return the relative directory of the partition with values key."""
+    parts = []
+    for name, value in zip(names, key):
+        value = _NULL_PARTITION if value is None else quote(str(value),
+                                                            safe='')
+        parts.append(f'{quote(name, safe="")}={value}')
+    return os.path.join(*parts) if parts else ''
+
+
+def _file_name(shard):
+    r"""Return the name of the files written for `shard`.
+
+    The name is the same on every run, so that redoing a shard replaces
+    its files, and differs between shards with the same base name.
+    """
+    digest = hashlib.sha1(os.fsencode(os.path.abspath(shard))).hexdigest()
+    stem = os.path.basename(shard).split('.')[0]
+    return f'{stem}-{digest[:12]}.parquet'
+
+
+def _split(batch, partition_by):
+    r"""Yield (key, rows) for each partition of a RecordBatch.
+
+    `key` holds the values of the `partition_by` columns, which are
+    dropped from `rows`.
+    """
+    if not partition_by:
+        yield (), batch
+        return
+    columns = [batch.column(name).to_pylist() for name in partition_by]
+    groups = {}
+    try:
+        for row, key in enumerate(zip(*columns)):
+            groups.setdefault(key, []).append(row)
+    except TypeError as e:
+        raise ValueError(
+            f'Cannot partition by {partition_by}: values must be '
+            'hashable scalars') from e
+    keep = [i for i, name in enumerate(batch.schema.names)
+            if name not in partition_by]
+    batch = batch.select(keep)
+    for key, rows in groups.items():
+        yield key, batch.take(pyarrow.array(rows, type=pyarrow.int64()))
+
+
+def _unify(schemas):
+    r"""Return the schema that the Parquet files of a dataset share.
+
+    Null fields take the types of other schemas, and numeric fields are
+    widened; a ValueError is raised if the types are incompatible.
+    """
+    try:
+        return pyarrow.unify_schemas(schemas, promote_options='permissive')
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+        raise ValueError(
+            f'Shards have incompatible types: {e}. Set the dtypes of '
+            'their Shoots.') from e
+
+
+def _rewrite(source, target, schema):
+    r"""Copy the Parquet file `source` to `target`, cast to `schema`.
+
+    The row groups are copied one at a time. Returns the writer of
+    `target`, open for further row groups.
+    """
+    from pyarrow import parquet
+
+    writer = parquet.ParquetWriter(target, schema)
+    try:
+        with parquet.ParquetFile(source) as f:
+            for i in range(f.num_row_groups):
+                writer.write_table(f.read_row_group(i).cast(schema))
+    except BaseException:
+        writer.close()
+        raise
+    return writer
+
+
+def write_shard(grove, shard, out_dir, partition_by=(),
+                row_group_size=DEFAULT_BATCH_SIZE,
+                chunk_bytes=DEFAULT_CHUNK_BYTES, pushdown=False):
+    r"""Write the records of one NDJSON shard to Parquet files.
+
+    The records are extracted by `grove` in RecordBatches of
+    `row_group_size` rows, so only one batch is held in memory at a
+    time, and each batch is written as one row group to the file of
+    each partition it holds. A file whose schema has null fields, from
+    batches whose values were all missing, is rewritten with their
+    types once a batch has values for them. Returns the manifest entry
+    of the shard.
+    """
+    from pyarrow import parquet
+
+    writers = {}
+    rows = 0
+    name = _file_name(shard)
+    projection = grove.projection if pushdown else None
+    records = iter_ndjson([shard], chunk_bytes, projection)
+    try:
+        for batch in grove.iter_record_batches(records, row_group_size):
+            rows += batch.num_rows
+            for key, part in _split(batch, partition_by):
+                directory = _partition_dir(partition_by, key)
+                path = os.path.join(out_dir, directory, f'.{name}.tmp')
+                writer = writers.get(directory)
+                if writer is None:
+                    os.makedirs(os.path.join(out_dir, directory),
+                                exist_ok=True)
+                    writer = writers[directory] = parquet.ParquetWriter(
+                        path, part.schema)
+                elif part.schema != writer.schema:
+                    schema = _unify([writer.schema, part.schema])
+                    if schema != writer.schema:
+                        writer.close()
+                        os.replace(path, path + '.old')
+                        writer = writers[directory] = _rewrite(
+                            path + '.old', path, schema)
+                        os.remove(path + '.old')
+                    part = part.cast(schema)
+                writer.write_batch(part)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    files = []
+    for directory in writers:
+        path = os.path.join(directory, name)
+        os.replace(os.path.join(out_dir, directory, f'.{name}.tmp'),
+                   os.path.join(out_dir, path))
+        files.append(path)
+    return {'shard': shard, 'rows': rows, 'files': sorted(files)}
+
+
+def _conform_files(out_dir, manifest):
+    r"""Rewrite the files of a dataset whose schemas differ from the rest.
+
+    Shards are written independently, so a column whose values were
+    all missing in one shard has Arrow's null type in its files, and a
+    column inferred as integers in one shard may hold floats in another.
+    Such files are rewritten, under a temporary name, with the types of
+    the dataset. Only the footers of the other files are read.
+    """
+    from pyarrow import parquet
+
+    paths = [os.path.join(out_dir, path)
+             for entry in manifest.values() for path in entry['files']]
+    schemas = [parquet.read_schema(path) for path in paths]
+    if not schemas:
+        return
+    schema = _unify(schemas)
+    for path, file_schema in zip(paths, schemas):
+        if file_schema != schema:
+            temporary = os.path.join(os.path.dirname(path),
+                                     f'.{os.path.basename(path)}.tmp')
+            _rewrite(path, temporary, schema).close()
+            os.replace(temporary, path)
+
+
+def write_dataset(grove, inputs, out_dir, partition_by=(), workers=None,
+                  row_group_size=DEFAULT_BATCH_SIZE,
+                  chunk_bytes=DEFAULT_CHUNK_BYTES, pushdown=False):
+    r"""Write NDJSON shards to a partitioned Parquet dataset.
+
+    See `Grove.write_dataset`.
+    """
+    require_pyarrow()
+    partition_by = list(partition_by)
+    names = [shoot.column_name for shoot in grove.shoots]
+    unknown = [_ for _ in partition_by if _ not in names]
+    if unknown:
+        raise ValueError(f'Cannot partition by unknown columns {unknown}')
+    if row_group_size < 1:
+        raise ValueError('row_group_size must be positive')
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = read_manifest(out_dir)
+    shards = [_ for _ in shard_paths(inputs) if _ not in manifest]
+    function = partial(write_shard, out_dir=out_dir,
+                       partition_by=partition_by,
+                       row_group_size=row_group_size,
+                       chunk_bytes=chunk_bytes, pushdown=pushdown)
+    if workers:
+        results = map_tasks(grove, function, shards, workers)
+    else:
+        results = (function(grove, shard) for shard in shards)
+    # Shards are recorded in order, as each completes, so the manifest
+    # never names a shard whose files are not all in place.
+    for entry in results:
+        record_shard(out_dir, entry)
+        manifest[entry['shard']] = entry
+    _conform_files(out_dir, manifest)
+    return list(manifest.values())
@@ -0,0 +1,208 @@
+r"""Extract several Groves from a single pass over the data.
+
+```
+>>> forest = Forest({
+...     'orders': Grove([Shoot('id'), Shoot('total')], index='id'),
+...     'order_items': Grove([Shoot('order_id', 'id'),
+...                           Shoot('sku', 'items.:.sku'),
+...                           Shoot('quantity', 'items.:.quantity')]),
+...     'customers': Grove([Shoot('id', 'customer.id'),
+...                         Shoot('email', 'customer.email')]),
+... }, explode=['order_items'])
+>>> frames = forest.dataframes_from_iterator(records)
+>>> frames['order_items']
+```
+"""
+from itertools import chain, islice
+from operator import length_hint
+
+from shootsandleaves.branch import Branch
+from shootsandleaves.column import _length
+from shootsandleaves.grove import _slice_prefix, _take
+from shootsandleaves.leaf import _field_key
+from shootsandleaves.schema import DEFAULT_SAMPLE_SIZE
+
+
+class _Tree(object):
+    r"""The columns of one Grove of a Forest.
+
+    `takes` holds a function for each shoot that picks the values of its
+    leaves out of the Forest's Branch's values.
+    """
+
+    def __init__(self, name, grove, takes, explode):
+        self.name = name
+        self.grove = grove
+        self.takes = takes
+        self.finishers = grove._finishers
+        self.exploded = self._exploded_positions() if explode else []
+        self._exploded = set(self.exploded)
+
+    def _exploded_positions(self):
+        r"""Return the positions of the shoots that fan out over a slice.
+
+        A ValueError is raised unless there is at least one, and they all
+        fan out over the same slice with a single leaf and no transform.
+        """
+        positions = []
+        prefixes = set()
+        for position, shoot in enumerate(self.grove.shoots):
+            leaves = shoot.explicit_leaves
+            prefix = None
+            for leaf in leaves:
+                prefix = prefix or _slice_prefix(leaf.selector)
+            if prefix is None:
+                continue
+            if (len(leaves) != 1 or shoot.transform is not None
+                    or shoot.vectorized_transform is not None):
+                raise ValueError(
+                    f'Shoot {shoot.column_name!r} of {self.name!r} cannot '
+                    'be exploded: it must have a single leaf with a '
+                    'slice, and no transform')
+            prefixes.add(tuple(_field_key(_) for _ in prefix))
+            positions.append(position)
+        if len(prefixes) != 1:
+            raise ValueError(
+                f'Grove {self.name!r} cannot be exploded: its shoots must '
+                f'fan out over exactly one slice, not {len(prefixes)}')
+        return positions
+
+    def start(self, capacity=None):
+        r"""Make empty columns for a run."""
+        self.columns = self.grove._make_columns(capacity)
+        self.appends = [column.append for column in self.columns]
+
+    def append(self, values):
+        r"""Append a row of the values of the Forest's leaves."""
+        for append, finish, take in zip(self.appends, self.finishers,
+                                        self.takes):
+            append(finish(take(values)))
+
+    def append_exploded(self, values):
+        r"""Append a row for each item of the exploded slice in `values`.
+
+        The values of the other shoots, such as foreign keys, are
+        repeated on each row.
+        """
+        row = [finish(take(values))
+               for finish, take in zip(self.finishers, self.takes)]
+        size = _length(row[self.exploded[0]])
+        for position in self.exploded:
+            if _length(row[position]) != size:
+                shoot = self.grove.shoots[position]
+                raise ValueError(
+                    f'Column {shoot.column_name!r} of {self.name!r} has '
+                    f'{_length(row[position])} items where other exploded '
+                    f'columns have {size}')
+        if not size:
+            return
+        exploded = self._exploded
+        for position, (column, value) in enumerate(zip(self.columns, row)):
+            if position in exploded:
+                column.extend(value)
+            else:
+                append = column.append
+                for _ in range(size):
+                    append(value)
+
+    def to_dataframe(self):
+        r"""Return a DataFrame of the rows appended, emptying the columns."""
+        return self.grove._dataframe(
+            [column.to_series() for column in self.columns])
+
+
+class Forest(object):
+    r"""Extract the DataFrames of several Groves in one pass over the data.
+
+    The leaves of all the Groves are merged into a single `Branch`, so
+    each object is traversed once, and prefixes that the Groves share,
+    such as 'customer' in 'customer.id' and 'customer.email', are walked
+    once. Each Grove then builds its rows from the shared values, as
+    `Grove.dataframe_from_iterator` would, with its own dtypes and index.
+
+    Groves named in `explode` hold child tables, with a row per item of
+    a slice rather than per object. Their shoots that select through the
+    slice, such as `Shoot('sku', 'items.:.sku')`, have one item per row,
+    and their other shoots, such as a foreign key `Shoot('order_id',
+    'id')`, are repeated on each item's row. All the exploded shoots of
+    a Grove must fan out over the same slice, with a single leaf and no
+    transform.
+
+    The Groves' profiling counters are not updated, and their compiled
+    functions are not used.
+    """
+
+    def __init__(self, groves, explode=()):
+        r"""Construct a Forest from a dict mapping names to Groves.
+
+        A ValueError is raised if a Grove named in `explode` cannot be
+        exploded.
+        """
+        unknown = [_ for _ in explode if _ not in groves]
+        if unknown:
+            raise ValueError(f'Cannot explode unknown Groves {unknown}')
+        self.groves = dict(groves)
+        self.explode = list(explode)
+
+        leaves = []
+        positions = {}
+        self._trees = []
+        for name, grove in self.groves.items():
+            # The positions in the Forest's Branch of the Grove's leaves,
+            # which are shared as they are between the shoots of a Grove.
+            mapping = []
+            for leaf in grove._branch.leaves:
+                key = (leaf, id(leaf.default))
+                if key not in positions:
+                    positions[key] = len(leaves)
+                    leaves.append(leaf)
+                mapping.append(positions[key])
+            takes = [_take([mapping[_] for _ in indexes])
+                     for indexes in grove._shoot_indexes]
+            self._trees.append(
+                _Tree(name, grove, takes, name in self.explode))
+        self._branch = Branch(leaves)
+
+    def _sampled(self, data):
+        r"""Infer the schemas of Groves that infer dtypes, if need be.
+
+        Returns an iterable of the objects of `data`.
+        """
+        sizes = {}
+        for grove in self.groves.values():
+            if grove.infer_dtypes and grove.schema is None:
+                size = grove.infer_dtypes
+                sizes[grove] = DEFAULT_SAMPLE_SIZE if size is True else size
+        if not sizes:
+            return data
+        data = iter(data)
+        sample = list(islice(data, max(sizes.values())))
+        for grove, size in sizes.items():
+            grove.infer_schema(sample[:size])
+        return chain(sample, data)
+
+    def dataframes_from_iterator(self, data, expected_rows=None):
+        r"""Return a dict mapping the name of each Grove to its DataFrame.
+
+        Args:
+            - data: An iterable of objects, which is iterated once.
+            - expected_rows: As for `Grove.dataframe_from_iterator`. It
+              sizes the columns of Groves that are not exploded.
+        """
+        if expected_rows is None:
+            expected_rows = length_hint(data)
+        data = self._sampled(data)
+        appends = []
+        for tree in self._trees:
+            if tree.exploded:
+                tree.start()
+                appends.append(tree.append_exploded)
+            else:
+                tree.start(expected_rows)
+                appends.append(tree.append)
+        get_from = self._branch.get_from
+        for obj in data:
+            values = get_from(obj)
+            for append in appends:
+                append(values)
+        return {tree.name: tree.to_dataframe() for tree in self._trees}
@@ -5,41 +5,919 @@ r"""TODO.
 >>> g = Grove([S('a'), S('b')], kwargs); g.from_iterator(data)
 ```
 """
-from pandas import DataFrame, Series
+import asyncio
+import warnings
+from functools import partial
+from itertools import chain, islice
+from operator import itemgetter, length_hint
+from time import perf_counter
+
+import numpy as np
+from pandas import CategoricalDtype, DataFrame, RangeIndex, Series, concat
+from pandas.api.types import (is_extension_array_dtype, pandas_dtype,
+                              union_categoricals)
+from shootsandleaves.aio import async_batches
+from shootsandleaves.arrow import (ArrowColumn, pyarrow, record_batch,
+                                   require_pyarrow)
+from shootsandleaves.branch import Branch
+from shootsandleaves.codegen import compile_fill
+from shootsandleaves.column import (ExplodedTable, ProjectionColumn,
+                                    WideningColumn, make_column)
+from shootsandleaves.dataset import write_dataset
+from shootsandleaves.ingest import (DEFAULT_CHUNK_BYTES, extract_task,
+                                    iter_json_array, iter_ndjson, ndjson_tasks)
+from shootsandleaves.leaf import _PROBE_CALLS, _field_key
+from shootsandleaves.mapped import write_mapped
+from shootsandleaves.parallel import (DEFAULT_BATCH_SIZE, batches, map_batches,
+                                      map_tasks)
+from shootsandleaves.projection import Projection
+from shootsandleaves.schema import DEFAULT_SAMPLE_SIZE, infer_dtype
 from shootsandleaves.shoot import Shoot
+from shootsandleaves.stats import GroveStats, selector_string
+
+
+def _identity(arg):
+    r"""Return arg."""
+    return arg
+
+
+def _take(indexes):
+    r"""Return a function returning a list of the items at `indexes`."""
+    start = indexes[0] if indexes else 0
+    if indexes == list(range(start, start + len(indexes))):
+        return itemgetter(slice(start, start + len(indexes)))
+    return lambda values: [values[_] for _ in indexes]
+
+
+def _slice_prefix(selector):
+    r"""Return `selector` up to and including its first slice, or None."""
+    for i, field in enumerate(selector):
+        if isinstance(field, slice):
+            return selector[:i + 1]
+    return None
+
+
+def _fill_compiled(fill, columns, data):
+    r"""Call `Grove._fill` compiled into `fill`."""
+    return fill(data, [column.append for column in columns])
+
+
+def _concat(series):
+    r"""Return the concatenation of a list of Series.
+
+    Categorical Series are combined into one with the union of their
+    categories, sorted unless they are ordered.
+    """
+    if all(isinstance(_.dtype, CategoricalDtype) for _ in series):
+        try:
+            return Series(union_categoricals(
+                series, sort_categories=not series[0].dtype.ordered))
+        except TypeError:
+            # Categories of mixed types that cannot be sorted.
+            return Series(union_categoricals(series))
+    return concat(series, ignore_index=True)
+
+
+# How to avoid relying on the dtypes pandas infers for each chunk.
+_DTYPE_ADVICE = ('Set the dtype of its Shoot, or infer dtypes from a larger '
+                 'sample with infer_dtypes.')
+
 
+def _nullable_dtype(dtype):
+    r"""Return the dtype that holds the values of `dtype` and missing values.
 
-def dataframe_from_iterator(data, shoots, **kwargs):
+    NumPy integer and bool dtypes become the nullable extension dtypes;
+    other dtypes already hold missing values.
+    """
+    if not isinstance(dtype, np.dtype) or dtype.kind not in 'iub':
+        return dtype
+    if dtype.kind == 'b':
+        return pandas_dtype('boolean')
+    prefix = 'UInt' if dtype.kind == 'u' else 'Int'
+    return pandas_dtype(f'{prefix}{8 * dtype.itemsize}')
+
+
+def _numpy_dtype(dtype):
+    r"""Return the numpy dtype of `dtype`'s values, and if it is nullable.
+
+    The dtype is None for extension dtypes other than the nullable
+    numeric and bool ones, such as strings and categoricals.
+    """
+    if isinstance(dtype, np.dtype):
+        return dtype, False
+    numpy_dtype = getattr(dtype, 'numpy_dtype', None)
+    if (is_extension_array_dtype(dtype) and dtype.kind in 'biuf'
+            and isinstance(numpy_dtype, np.dtype)):
+        return numpy_dtype, True
+    return None, False
+
+
+def _result_type(dtype, other):
+    r"""Return the dtype pandas gives a concatenation of the two dtypes.
+
+    Numeric dtypes are promoted by `numpy.result_type`, and stay
+    nullable if either is. Bools, datetimes and timedeltas only combine
+    with their own kind, and other dtypes only with themselves; anything
+    else gives object.
+    """
+    if dtype == other:
+        return dtype
+    (left, nullable), (right, other_nullable) = (
+        _numpy_dtype(dtype), _numpy_dtype(other))
+    if left is None or right is None:
+        return np.dtype(object)
+    kinds = left.kind + right.kind
+    if left.kind != right.kind and any(_ in 'bmM' for _ in kinds):
+        return np.dtype(object)
+    try:
+        common = np.result_type(left, right)
+    except TypeError:
+        return np.dtype(object)
+    if not (nullable or other_nullable):
+        return common
+    if common.kind in 'iub':
+        return _nullable_dtype(common)
+    if common.kind == 'f':
+        return pandas_dtype(f'Float{8 * common.itemsize}')
+    return np.dtype(object)
+
+
+def _common_dtype(name, dtype, values):
+    r"""Return a dtype holding the values of both `dtype` and `values`.
+
+    Only numeric widening and nullability are allowed: a ValueError is
+    raised if the common dtype would be object where neither is.
+    """
+    if values.dtype == dtype:
+        return dtype
+    if len(values) and values.isna().all():
+        return _nullable_dtype(dtype)
+    common = _result_type(dtype, values.dtype)
+    if common == object and object not in (dtype, values.dtype):
+        raise ValueError(
+            f'Column {name!r} has values of dtype {values.dtype} which '
+            f'cannot be combined with the dtype {dtype} of other chunks. '
+            f'{_DTYPE_ADVICE}')
+    return common
+
+
+def _cast(name, values, dtype):
+    r"""Return `values` converted to `dtype`, raising if it loses data."""
+    if values.dtype == dtype:
+        return values
+    try:
+        converted = values.astype(dtype)
+        lossless = converted.astype(values.dtype).equals(values)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValueError(
+            f'Column {name!r} cannot be converted to the dtype {dtype} of '
+            f'other chunks. {_DTYPE_ADVICE}') from e
+    if not lossless and not values.isna().all():
+        raise ValueError(
+            f'Column {name!r} cannot be converted to the dtype {dtype} of '
+            f'other chunks without losing data. {_DTYPE_ADVICE}')
+    return converted
+
+
+def dataframe_from_iterator(data, shoots, expected_rows=None, **kwargs):
     r"""Construct and using a Grove."""
-    return Grove(shoots, **kwargs).dataframe_from_iterator(data)
+    return Grove(shoots, **kwargs).dataframe_from_iterator(
+        data, expected_rows=expected_rows)
 
 
 class Grove(object):
     r"""TODO."""
 
-    def __init__(self, shoots, index=None, **kwargs):
-        r"""TODO."""
+    def __init__(self, shoots, index=None, stats=False, infer_dtypes=False,
+                 compiled=False, **kwargs):
+        r"""TODO.
+
+        If `stats` is True, `self.stats` is a `GroveStats` holding
+        profiling counters for each shoot and leaf, which are reset at
+        the start of each run. Extraction is slower in this mode, and
+        otherwise unaffected by it.
+
+        If `infer_dtypes` is True, or a number of objects, the first
+        run samples that many objects, `DEFAULT_SAMPLE_SIZE` for True,
+        and calls `infer_schema` on them.
+
+        If `compiled` is True, a function extracting whole rows straight
+        into the columns is generated, as by `compile_fill`, and its
+        source is kept in `self.source`. If it cannot be generated, a
+        RuntimeWarning is issued and the Grove extracts as usual. It is
+        not used while profiling with `stats`. The function is generated
+        again once the Branch has adapted its lookups to the first
+        objects extracted; see `Branch.adapt`.
+        """
         if not all(isinstance(s, Shoot) for s in shoots):
             raise ValueError('shoots must be a list of Shoots')
         self.shoots = shoots
         self.index = index
+        self.infer_dtypes = infer_dtypes
+        self.schema = None
+
+        # The distinct leaves of all shoots are merged into a single
+        # Branch, so that each record is traversed once and each leaf is
+        # evaluated once. `_takes` holds a function for each shoot that
+        # picks the values of its leaves out of the Branch's values.
+        leaves = []
+        positions = {}
+        shoot_indexes = []
+        for shoot in self.shoots:
+            indexes = []
+            for leaf in shoot.explicit_leaves:
+                # Shoots compare values to their default by identity, so
+                # leaves are only shared if their defaults are the same.
+                key = (leaf, id(leaf.default))
+                if key not in positions:
+                    positions[key] = len(leaves)
+                    leaves.append(leaf)
+                indexes.append(positions[key])
+            shoot_indexes.append(indexes)
+        self._takes = [_take(_) for _ in shoot_indexes]
+        self._shoot_indexes = shoot_indexes
+        self._branch = Branch(leaves)
+        self.projection = Projection(self.selectors)
+
+        # Shoots with a vectorized transform are transformed a column at
+        # a time, so rows hold their projections rather than values.
+        self._finishers = [
+            _identity if shoot.vectorized_transform is not None
+            else shoot.extract_from_projection
+            for shoot in self.shoots
+        ]
+
+        # When every shoot's value is just that of its single leaf, rows
+        # are picked straight out of the Branch's values.
+        if all(shoot._single and shoot.transform is None
+               and shoot.vectorized_transform is None
+               for shoot in self.shoots):
+            indexes = [_ for _, in shoot_indexes]
+            if indexes == list(range(len(leaves))):
+                self._project_row = self._branch.get_from
+            else:
+                self._pick = _take(indexes)
+                self._project_row = self._project_plain_row
+
+        self.stats = None
+        if stats:
+            self.stats = GroveStats(self.shoots, leaves, shoot_indexes)
+            self._project_row = self._project_row_with_stats
+
+        self.compiled = compiled
+        self.source = None
+        if compiled and not stats:
+            try:
+                fill, self.source = compile_fill(
+                    self._branch, self.shoots, shoot_indexes)
+            except (SyntaxError, RecursionError, MemoryError) as e:
+                warnings.warn(f'Could not compile the Grove ({e}); '
+                              'extracting without it', RuntimeWarning)
+            else:
+                self._fill = partial(self._fill_adapting, fill)
+
+    @property
+    def selectors(self):
+        r"""Return a list of the distinct selectors of the shoots' leaves.
+
+        These are the only paths into an object that the Grove reads.
+        """
+        selectors = {}
+        for shoot in self.shoots:
+            for leaf in shoot.explicit_leaves:
+                key = tuple(_field_key(field) for field in leaf.selector)
+                selectors.setdefault(key, leaf.selector)
+        return list(selectors.values())
+
+    def _extract_row(self, obj):
+        r"""Return a list of the extracted value of each shoot in obj."""
+        values = self._branch.get_from(obj)
+        return [
+            shoot.extract_from_projection(take(values))
+            for shoot, take in zip(self.shoots, self._takes)
+        ]
+
+    def _project_row(self, obj):
+        r"""Return a list of the value to append to each column for obj."""
+        values = self._branch.get_from(obj)
+        return [
+            finish(take(values))
+            for finish, take in zip(self._finishers, self._takes)
+        ]
+
+    def _project_plain_row(self, obj):
+        r"""Return `self._project_row(obj)` for shoots of a single leaf."""
+        return self._pick(self._branch.get_from(obj))
+
+    def _project_row_with_stats(self, obj):
+        r"""Return `self._project_row(obj)`, updating `self.stats`."""
+        values = [_.get_from(obj) for _ in self.stats.leaves]
+        row = []
+        for stats, finish, take in zip(self.stats.shoots, self._finishers,
+                                       self._takes):
+            start = perf_counter()
+            value = finish(take(values))
+            stats.record(value, perf_counter() - start)
+            row.append(value)
+        return row
 
     def extract(self, obj):
         r"""Return a dict mapping column_names to extracted values."""
-        return {shoot.column_name: shoot.extract(obj) for shoot in self.shoots}
+        return {
+            shoot.column_name: value
+            for shoot, value in zip(self.shoots, self._extract_row(obj))
+        }
+
+    def extract_many(self, objs):
+        r"""Return a DataFrame with a row for each of a batch of objects.
+
+        The batch is evaluated column-major: each distinct leaf is
+        evaluated over all of `objs` with `Leaf.get_many`, and each
+        shoot is then extracted from the columns of its leaves, as by
+        `Shoot.extract_many`. The result is the same as that of
+        `dataframe_from_iterator`, but the leaves do not share the
+        lookups of common prefixes, and profiling counters are not
+        updated.
+        """
+        if not isinstance(objs, (list, tuple)):
+            objs = list(objs)
+        leaf_columns = [leaf.get_many(objs) for leaf in self._branch.leaves]
+        series = []
+        for shoot, column, indexes in zip(self.shoots,
+                                          self._make_columns(len(objs)),
+                                          self._shoot_indexes):
+            projections = [leaf_columns[_] for _ in indexes]
+            if shoot.vectorized_transform is not None:
+                series.append(shoot.extract_from_projections(projections))
+                continue
+            column.extend(shoot._extract_values(projections))
+            series.append(column.to_series())
+        return self._dataframe(series)
+
+    def iter_rows(self, data):
+        r"""Yield a tuple of the values extracted from each object in `data`.
 
-    def dataframe_from_iterator(self, data):
-        r"""TODO."""
-        cols = {s.column_name: [] for s in self.shoots}
+        The values are those of `extract`, in the order of the shoots,
+        without building a dict or any columns, so that rows can be
+        passed straight on, as to `shootsandleaves.sql.insert_rows`.
+        Shoots' dtypes are not applied. Shoots with a vectorized
+        transform apply it to each object on its own, which is slow.
+        """
+        extract_row = self._extract_row
         for obj in data:
-            for shoot in self.shoots:
-                cols[shoot.column_name].append(shoot.extract(obj))
-        cols = {
-            shoot.column_name: Series(
-                cols[shoot.column_name], dtype=shoot.dtype)
-            for shoot in self.shoots
-        }
-        df = DataFrame(cols)
+            yield tuple(extract_row(obj))
+
+    def __reduce__(self):
+        r"""Pickle a Grove by its shoots, rebuilding the Branch on load."""
+        return (Grove, (self.shoots, self.index, self.stats is not None,
+                        self.infer_dtypes, self.compiled),
+                {'schema': self.schema})
+
+    def infer_schema(self, sample):
+        r"""Infer the dtypes of shoots without one from a sample of objects.
+
+        The dtype of each shoot with neither a `dtype` nor a vectorized
+        transform is inferred from its values in `sample` by
+        `infer_dtype`. Later extraction collects the shoot's values into
+        a `WideningColumn` of that dtype, so that a typed buffer is used
+        where possible, and values that do not fit widen the column
+        rather than being lost. Chunks of `iter_dataframes` cannot widen
+        those already yielded, so there such values raise.
+
+        Returns `self.schema`, a dict mapping column names to inferred
+        dtypes, which omits shoots whose sampled values were all
+        missing.
+        """
+        rows = [self._project_row(obj) for obj in sample]
+        self.schema = {}
+        for position, shoot in enumerate(self.shoots):
+            if (shoot.dtype is not None
+                    or shoot.vectorized_transform is not None):
+                continue
+            dtype = infer_dtype([row[position] for row in rows])
+            if dtype is not None:
+                self.schema[shoot.column_name] = dtype
+        return self.schema
+
+    def _sampled(self, data):
+        r"""Infer the schema from the start of `data`, if need be.
+
+        Returns an iterable of the objects of `data`.
+        """
+        if not self.infer_dtypes or self.schema is not None:
+            return data
+        size = self.infer_dtypes
+        if size is True:
+            size = DEFAULT_SAMPLE_SIZE
+        data = iter(data)
+        sample = list(islice(data, size))
+        self.infer_schema(sample)
+        return chain(sample, data)
+
+    def _start_run(self):
+        r"""Reset the profiling counters, if any, for a new run."""
+        if self.stats is not None:
+            self.stats.reset()
+
+    def _make_columns(self, capacity=None, nullable=False, shoots=None,
+                      dictionaries=None):
+        r"""Return an empty column for each shoot.
+
+        `shoots` defaults to all of the Grove's shoots. If given,
+        `dictionaries` maps the column names of categorical shoots to
+        the dictionaries of codes their columns share; see
+        `CategoryColumn`. Dictionaries missing from it are added to it.
+        """
+        columns = []
+        for shoot in (self.shoots if shoots is None else shoots):
+            if shoot.vectorized_transform is not None:
+                columns.append(ProjectionColumn(shoot))
+                continue
+            codes = None
+            if dictionaries is not None:
+                codes = dictionaries.setdefault(shoot.column_name, {})
+            inferred = None
+            if shoot.dtype is None and self.schema:
+                inferred = self.schema.get(shoot.column_name)
+            if inferred is not None:
+                columns.append(
+                    WideningColumn(inferred, capacity, nullable, codes))
+            else:
+                columns.append(
+                    make_column(shoot.dtype, capacity, nullable, codes))
+        return columns
+
+    def _fill_adapting(self, fill, columns, data):
+        r"""Call `fill` as `_fill` does, once adapted to the start of data.
+
+        The Branch probes the first objects of `data`, and the function
+        is generated again for the lookups it chose, unless that cannot
+        be compiled, when `fill` is kept. Later runs use it directly.
+        """
+        data = iter(data)
+        sample = list(islice(data, _PROBE_CALLS))
+        self._branch.probe(sample)
+        try:
+            fill, self.source = compile_fill(
+                self._branch, self.shoots, self._shoot_indexes)
+        except (SyntaxError, RecursionError, MemoryError):
+            pass
+        self._fill = partial(_fill_compiled, fill)
+        return self._fill(columns, chain(sample, data))
+
+    def _fill(self, columns, data):
+        r"""Append the values extracted from `data` to `columns`.
+
+        Returns the number of objects in `data`.
+        """
+        appends = [column.append for column in columns]
+        rows = 0
+        for rows, obj in enumerate(data, 1):
+            for append, value in zip(appends, self._project_row(obj)):
+                append(value)
+        return rows
+
+    def _extract_series(self, batch, dictionaries=None):
+        r"""Return a list of the Series of each shoot over `batch`.
+
+        Integer and bool shoots always use the nullable dtypes, so that
+        the dtypes do not depend on the batch. `dictionaries` is as for
+        `_make_columns`.
+        """
+        columns = self._make_columns(len(batch), nullable=True,
+                                     dictionaries=dictionaries)
+        self._fill(columns, batch)
+        return [column.to_series() for column in columns]
+
+    def _conform(self, series, dtypes):
+        r"""Convert each of `series` to the dtype in `dtypes` for its shoot.
+
+        `dtypes` maps column names to the dtypes of earlier chunks, and
+        is set by the first chunk with values. Integer and bool dtypes
+        are made nullable, as for shoots with a `dtype`, so that later
+        missing values fit. A ValueError is raised if a later chunk
+        needs a wider dtype, such as floats after integers, since chunks
+        already yielded cannot be widened to match. Chunks whose values
+        are all missing do not set the dtype.
+        """
+        conformed = []
+        for shoot, values in zip(self.shoots, series):
+            name = shoot.column_name
+            dtype = dtypes.get(name)
+            if dtype is None:
+                if not len(values) or not values.isna().all():
+                    dtype = dtypes[name] = _nullable_dtype(values.dtype)
+                    values = _cast(name, values, dtype)
+            elif not isinstance(dtype, CategoricalDtype):
+                # The categories of categorical chunks may differ, and
+                # are combined by `_concat`. Values of another kind
+                # raise, and others must convert without losing data.
+                _common_dtype(name, dtype, values)
+                values = _cast(name, values, dtype)
+            conformed.append(values)
+        return conformed
+
+    def _dataframe(self, series, shoots=None):
+        r"""Return a DataFrame holding the Series of each shoot.
+
+        `shoots` defaults to all of the Grove's shoots.
+        """
+        df = DataFrame({
+            shoot.column_name: values
+            for shoot, values in zip(
+                self.shoots if shoots is None else shoots, series)
+        }, copy=False)
         if self.index:
             df.set_index(self.index, inplace=True)
         return df
+
+    def dataframe_from_iterator(self, data, expected_rows=None, workers=None,
+                                batch_size=DEFAULT_BATCH_SIZE):
+        r"""Return a DataFrame with a row for each object in `data`.
+
+        Shoots with a numeric, bool or datetime `dtype` are collected
+        into typed buffers rather than lists; see `TypedColumn`. The
+        buffers are sized by `expected_rows`, or by `len(data)` when it
+        is available, and grow as needed.
+
+        If `workers` is given, `data` is split into batches of
+        `batch_size` objects which are extracted by that many worker
+        processes. The result has the dtypes of `iter_dataframes`. The
+        Grove, including the transforms of its shoots, must be picklable.
+        """
+        if expected_rows is None:
+            expected_rows = length_hint(data)
+        data = self._sampled(data)
+        self._start_run()
+        if workers:
+            return self._concat_series(
+                map_batches(self, data, workers, batch_size))
+        columns = self._make_columns(expected_rows)
+        self._fill(columns, data)
+        return self._dataframe([column.to_series() for column in columns])
+
+    def _concat_series(self, chunks):
+        r"""Return a DataFrame of chunks of the Series of each shoot.
+
+        The chunks of each column are converted to the common dtype of
+        all of them, so the result does not depend on the order of the
+        chunks. All the chunks are at hand, so unlike `_conform`, this
+        widens the dtype rather than raising.
+        """
+        parts = [[] for _ in self.shoots]
+        for series in chunks:
+            for part, values in zip(parts, series):
+                part.append(values)
+        if not parts or not parts[0]:
+            return self._dataframe(self._extract_series([]))
+        return self._dataframe([
+            _concat(self._combine(shoot.column_name, part))
+            for shoot, part in zip(self.shoots, parts)])
+
+    def _combine(self, name, part):
+        r"""Return the chunks in `part` converted to their common dtype.
+
+        Integer and bool dtypes are made nullable, as by `_conform`.
+        Categorical chunks are returned as they are, to be combined by
+        `_concat`.
+        """
+        if isinstance(part[0].dtype, CategoricalDtype):
+            return part
+        dtype = None
+        for values in part:
+            if dtype is None:
+                if not values.isna().all():
+                    dtype = values.dtype
+            else:
+                dtype = _common_dtype(name, dtype, values)
+        if dtype is None:
+            return part
+        dtype = _nullable_dtype(dtype)
+        return [_cast(name, values, dtype) for values in part]
+
+    def dataframe_from_ndjson(self, paths, workers=None,
+                              chunk_bytes=DEFAULT_CHUNK_BYTES,
+                              pushdown=False):
+        r"""Return a DataFrame with a row for each line of NDJSON files.
+
+        Args:
+            - paths: A path, or an iterable of paths. Paths ending in
+              '.gz' are decompressed.
+            - workers: If given, the number of worker processes that
+              decode and extract the files. The result then has the
+              dtypes of `iter_dataframes`.
+            - chunk_bytes: The approximate number of bytes decoded at a
+              time, and sent to each worker.
+            - pushdown: If True, decode only the parts of each record
+              that the Grove selects, using `self.projection`. The
+              result is the same, and is faster when most of each
+              record is not selected.
+
+        Plain files are memory-mapped and split into ranges of lines
+        rather than iterated line by line.
+        """
+        if workers:
+            self._start_run()
+            tasks = ndjson_tasks(paths, chunk_bytes)
+            function = partial(extract_task, pushdown=pushdown)
+            return self._concat_series(
+                map_tasks(self, function, tasks, workers))
+        projection = self.projection if pushdown else None
+        return self.dataframe_from_iterator(
+            iter_ndjson(paths, chunk_bytes, projection))
+
+    def dataframe_from_json_array(self, path, pushdown=False):
+        r"""Return a DataFrame with a row for each item of a JSON array.
+
+        `path` names a file holding a single JSON array, which is
+        decompressed if the path ends in '.gz'. `pushdown` is as for
+        `dataframe_from_ndjson`.
+        """
+        projection = self.projection if pushdown else None
+        return self.dataframe_from_iterator(
+            iter_json_array(path, projection))
+
+    def iter_dataframes(self, data, chunksize):
+        r"""Yield a DataFrame for each `chunksize` objects in `data`.
+
+        Each DataFrame has the format of `dataframe_from_iterator`, and
+        only one chunk is held in memory at a time. Integer and bool
+        shoots always use the nullable dtypes, so their dtypes do not
+        depend on the chunk. Columns whose dtype pandas infers keep the
+        dtype of the first chunk with values, with integer and bool
+        dtypes made nullable likewise. A ValueError is raised if a later
+        chunk cannot be converted to it without losing data, such as
+        floats after integers; set `Shoot.dtype`, or infer dtypes from a
+        larger sample with `infer_dtypes`, to avoid that.
+
+        Categorical shoots share a dictionary across chunks, so the
+        categories of each chunk are those seen in it and earlier
+        chunks, sorted.
+        """
+        if chunksize < 1:
+            raise ValueError('chunksize must be positive')
+        data = self._sampled(data)
+        self._start_run()
+        dtypes = {}
+        dictionaries = {}
+        for chunk in batches(data, chunksize):
+            yield self._dataframe(self._conform(
+                self._extract_series(chunk, dictionaries), dtypes))
+
+    async def _iter_series_async(self, data, chunksize, interval, executor):
+        r"""Yield the Series of each shoot for each chunk of async `data`.
+
+        With an `executor`, a chunk is extracted in it while the next
+        chunk is received. At most one chunk is extracted at a time, so
+        the dictionaries of categorical shoots are shared safely.
+        """
+        if chunksize < 1:
+            raise ValueError('chunksize must be positive')
+        self._start_run()
+        dictionaries = {}
+        if executor is None:
+            async for chunk in async_batches(data, chunksize, interval):
+                yield self._extract_series(chunk, dictionaries)
+            return
+        loop = asyncio.get_running_loop()
+        pending = None
+        async for chunk in async_batches(data, chunksize, interval):
+            series = None if pending is None else await pending
+            pending = loop.run_in_executor(
+                executor, self._extract_series, chunk, dictionaries)
+            if series is not None:
+                yield series
+        if pending is not None:
+            yield await pending
+
+    async def iter_dataframes_async(self, data, chunksize=DEFAULT_BATCH_SIZE,
+                                    interval=None, executor=None):
+        r"""Yield DataFrames of the objects of an async iterable, as they come.
+
+        This is the async counterpart of `iter_dataframes`, and the
+        chunks have the same dtypes. A chunk is yielded for every
+        `chunksize` objects received and, if `interval` is given, once
+        `interval` seconds have passed since the first object of a
+        chunk arrived, so that slow streams still yield regularly.
+
+        Extraction runs in the event loop unless an `executor` is given,
+        such as a ThreadPoolExecutor, in which case each chunk is
+        extracted in it while the next chunk is received. With a
+        ProcessPoolExecutor, the Grove is pickled for each chunk, and
+        the categories of categorical shoots are not shared between
+        chunks.
+        """
+        dtypes = {}
+        async for series in self._iter_series_async(data, chunksize,
+                                                    interval, executor):
+            yield self._dataframe(self._conform(series, dtypes))
+
+    async def dataframe_from_async_iterator(self, data,
+                                            chunksize=DEFAULT_BATCH_SIZE,
+                                            executor=None):
+        r"""Return a DataFrame with a row for each object of async `data`.
+
+        Objects are extracted in chunks of `chunksize` as they arrive,
+        in `executor` if one is given, as by `iter_dataframes_async`.
+        The result has the dtypes of `iter_dataframes`.
+        """
+        return self._concat_series([
+            series async for series in self._iter_series_async(
+                data, chunksize, None, executor)])
+
+    def _make_arrow_columns(self):
+        r"""Return an empty Arrow column for each shoot."""
+        return [
+            ProjectionColumn(shoot) if shoot.vectorized_transform is not None
+            else ArrowColumn(shoot)
+            for shoot in self.shoots
+        ]
+
+    def iter_record_batches(self, data, batch_size=DEFAULT_BATCH_SIZE):
+        r"""Yield an Arrow RecordBatch for each `batch_size` objects in data.
+
+        Each shoot's values are converted straight to an Arrow array,
+        without building a DataFrame. A shoot's `dtype`, which may be an
+        Arrow type or a pandas dtype, sets the type of its array, and
+        otherwise Arrow infers it: lists, such as the values of leaves
+        with a slice, become list arrays, and dicts become struct
+        arrays. Each batch's schema holds the types of the earlier
+        batches and its own, so types only ever widen: columns whose
+        values have all been missing, of Arrow's null type, take the
+        type of the first batch with values, integers become floats,
+        and structs gain the fields of later dicts. Batches already
+        yielded keep their schemas; `to_arrow` casts them to the last.
+        A ValueError is raised if the types of a column cannot be
+        combined; set `Shoot.dtype` to avoid relying on inference.
+
+        This requires the optional `pyarrow` package.
+        """
+        require_pyarrow()
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive')
+        self._start_run()
+        schema = None
+        for batch in batches(data, batch_size):
+            columns = self._make_arrow_columns()
+            self._fill(columns, batch)
+            result = record_batch(self.shoots, columns, schema)
+            schema = result.schema
+            yield result
+
+    def to_arrow(self, data, batch_size=DEFAULT_BATCH_SIZE):
+        r"""Return an Arrow Table with a row for each object in `data`.
+
+        The Table is made of the batches of `iter_record_batches`. The
+        last has the types of all of them, so the earlier batches are
+        cast to its types.
+        """
+        require_pyarrow()
+        result = list(self.iter_record_batches(data, batch_size))
+        if not result:
+            result = [
+                record_batch(self.shoots, self._make_arrow_columns())]
+        schema = result[-1].schema
+        return pyarrow.Table.from_batches(
+            [_ if _.schema == schema else _.cast(schema) for _ in result],
+            schema)
+
+    def write_dataset(self, inputs, out_dir, partition_by=(), workers=None,
+                      row_group_size=DEFAULT_BATCH_SIZE,
+                      chunk_bytes=DEFAULT_CHUNK_BYTES, pushdown=False):
+        r"""Write the records of NDJSON shards to a Parquet dataset.
+
+        Args:
+            - inputs: A glob pattern, or an iterable of paths, of the
+              NDJSON shards. Paths ending in '.gz' are decompressed.
+            - out_dir: The directory of the dataset.
+            - partition_by: The names of columns whose values partition
+              the dataset into Hive style directories, such as
+              `out_dir/day=2020-01-01/`. They are not stored in the files.
+            - workers: If given, the number of worker processes that
+              each write a shard at a time.
+            - row_group_size: The number of records extracted and written
+              at a time, as a row group of each partition they fall in.
+            - chunk_bytes, pushdown: As for `dataframe_from_ndjson`.
+
+        Only a row group per partition of a shard is held in memory at
+        a time. Each completed shard is recorded in the manifest
+        `out_dir/_manifest.ndjson`, and shards it records are skipped,
+        so an interrupted run resumes where it stopped. Returns the
+        manifest entries of all shards written, with the paths of their
+        files relative to `out_dir` and their number of records.
+
+        Every file has the same schema. Columns whose values were all
+        missing in the first row groups of a file, or in a whole shard,
+        take the types that other row groups and shards give them, and
+        the files affected are rewritten a row group at a time.
+
+        This requires the optional `pyarrow` package.
+        """
+        return write_dataset(self, inputs, out_dir, partition_by, workers,
+                             row_group_size, chunk_bytes, pushdown)
+
+    def write_mapped(self, data, out_dir, chunk_rows=DEFAULT_BATCH_SIZE):
+        r"""Write the values extracted from `data` to array files on disk.
+
+        Args:
+            - data: An iterable of objects.
+            - out_dir: The directory of the files, which is created if
+              need be. Files of an earlier call are replaced.
+            - chunk_rows: The number of objects extracted at a time, and
+              appended to the files together.
+
+        Only a chunk of values is held in memory at a time, so the
+        result may be larger than memory. Every shoot needs a numeric,
+        bool, datetime or category `dtype`, and no vectorized transform;
+        a ValueError naming the column is raised otherwise. Returns the
+        metadata written to the sidecar `out_dir/_metadata.json`. Use
+        `shootsandleaves.mapped.read_mapped` or `open_mapped` to map the
+        result back as a DataFrame or as arrays.
+        """
+        return write_mapped(self, data, out_dir, chunk_rows)
+
+    def _exploded_tables(self, explode=None):
+        r"""Return an ExplodedTable for each slice the shoots fan out over.
+
+        `explode` names the shoots to explode, and defaults to all that
+        can be: those with a single leaf selecting through a slice, and
+        no transform. A ValueError is raised if any other is named.
+        """
+        tables = {}
+        for position, shoot in enumerate(self.shoots):
+            name = shoot.column_name
+            leaves = shoot.explicit_leaves
+            prefix = _slice_prefix(leaves[0].selector)
+            explodable = (len(leaves) == 1 and prefix is not None
+                          and shoot.transform is None
+                          and shoot.vectorized_transform is None
+                          and name != self.index)
+            if explode is None:
+                if not explodable:
+                    continue
+            elif name not in explode:
+                continue
+            elif not explodable:
+                raise ValueError(
+                    f'Shoot {name!r} cannot be exploded: it must have a '
+                    'single leaf with a slice, no transform, and not be '
+                    'the index')
+            key = tuple(_field_key(_) for _ in prefix)
+            if key not in tables:
+                tables[key] = ExplodedTable(selector_string(prefix))
+            tables[key].add(shoot, position)
+        return list(tables.values())
+
+    def exploded_dataframes(self, data, explode=None, expected_rows=None):
+        r"""Return a DataFrame of `data`, and long-format child DataFrames.
+
+        Shoots whose values are lists, such as `Shoot('skus',
+        'items.:.sku')`, are left out of the parent DataFrame. Instead
+        the items of the lists are collected, in the same single pass
+        over `data`, into flat columns typed by the shoot's `dtype`,
+        with no object column of lists and no `DataFrame.explode`.
+
+        Shoots that fan out over the same slice share one child
+        DataFrame, with a row for each item of the slice, keyed by the
+        slice's dotted selector, such as 'items.:'. Its index has two
+        levels: the label of the parent row, from the Grove's `index`
+        or else the row number, and the position of the item in its
+        list. Rows whose slice is missing have no items.
+
+        Args:
+            - data: An iterable of objects.
+            - explode: The column names of the shoots to explode. By
+              default, every shoot with a single leaf selecting through
+              a slice and no transform is exploded.
+            - expected_rows: As for `dataframe_from_iterator`.
+
+        Returns a tuple of the parent DataFrame and a dict of the child
+        DataFrames.
+        """
+        if expected_rows is None:
+            expected_rows = length_hint(data)
+        data = self._sampled(data)
+        self._start_run()
+        tables = self._exploded_tables(explode)
+        exploded = {position for table in tables
+                    for position in table.positions}
+        positions = [_ for _ in range(len(self.shoots)) if _ not in exploded]
+        shoots = [self.shoots[_] for _ in positions]
+        columns = self._make_columns(expected_rows, shoots=shoots)
+        appends = [column.append for column in columns]
+        rows = 0
+        for rows, obj in enumerate(data, 1):
+            row = self._project_row(obj)
+            for append, position in zip(appends, positions):
+                append(row[position])
+            for table in tables:
+                table.append(row)
+
+        parent = self._dataframe([column.to_series() for column in columns],
+                                 shoots)
+        if not self.index:
+            parent.index = RangeIndex(rows)
+        children = {
+            table.name: table.to_dataframe(parent.index) for table in tables
+        }
+        return parent, children
@@ -0,0 +1,222 @@
+r"""Reading JSON records from files.
+
+NDJSON files are memory-mapped and split on newlines into byte ranges,
+which can be decoded independently, and so in parallel. Gzipped files
+are decompressed as a stream and split into blocks of whole lines.
+
+```
+>>> for task in ndjson_tasks(['a.ndjson', 'b.ndjson.gz']):
+...     for obj in read_task(task):
+...         pass
+>>> for obj in iter_json_array('records.json'):
+...     pass
+```
+"""
+import codecs
+import gzip
+import json
+import mmap
+import os
+import re
+
+# Approximate number of bytes of NDJSON decoded as one task.
+DEFAULT_CHUNK_BYTES = 1 << 24
+
+# Whitespace that may separate the items of a JSON array.
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def _is_gzip(path):
+    r"""Return True if `path` names a gzipped file."""
+    return os.fsdecode(path).endswith('.gz')
+
+
+def _ranges(path, chunk_bytes):
+    r"""Yield (path, start, stop) byte ranges of whole lines of `path`."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            start = 0
+            while start < size:
+                stop = m.find(b'\n', start + chunk_bytes - 1)
+                stop = size if stop == -1 else stop + 1
+                yield (path, start, stop)
+                start = stop
+
+
+def _blocks(path, chunk_bytes):
+    r"""Yield blocks of whole lines of the gzipped file at `path`."""
+    with gzip.open(path, 'rb') as f:
+        rest = b''
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = rest + block
+            end = block.rfind(b'\n') + 1
+            rest = block[end:]
+            if end:
+                yield block[:end]
+        if rest:
+            yield rest
+
+
+def ndjson_tasks(paths, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    r"""Yield tasks that together cover the NDJSON files at `paths`.
+
+    A task is either a `(path, start, stop)` byte range of a plain file
+    or a block of bytes decompressed from a gzipped file. Either way it
+    holds whole lines and can be decoded with `read_task`.
+    """
+    if chunk_bytes < 1:
+        raise ValueError('chunk_bytes must be positive')
+    if isinstance(paths, (str, bytes, os.PathLike)):
+        paths = [paths]
+    for path in paths:
+        if _is_gzip(path):
+            yield from _blocks(path, chunk_bytes)
+        else:
+            yield from _ranges(path, chunk_bytes)
+
+
+def _read_lines(block, projection=None):
+    r"""Yield the object on each non-blank line of `block`."""
+    loads = json.loads if projection is None else projection.loads
+    for line in block.splitlines():
+        if line.strip():
+            yield loads(line)
+
+
+def read_task(task, projection=None):
+    r"""Yield the objects in a task from `ndjson_tasks`.
+
+    If a `Projection` is given, only the parts of each object it
+    selects are decoded.
+    """
+    if isinstance(task, bytes):
+        yield from _read_lines(task, projection)
+        return
+    path, start, stop = task
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            block = m[start:stop]
+    yield from _read_lines(block, projection)
+
+
+def extract_task(grove, task, pushdown=False):
+    r"""Return the Series of each shoot of `grove` over a task's objects.
+
+    If `pushdown` is True, only the parts of the objects that `grove`
+    selects are decoded.
+    """
+    projection = grove.projection if pushdown else None
+    return grove._extract_series(list(read_task(task, projection)))
+
+
+def iter_ndjson(paths, chunk_bytes=DEFAULT_CHUNK_BYTES, projection=None):
+    r"""Yield the objects in the NDJSON files at `paths`, in order."""
+    for task in ndjson_tasks(paths, chunk_bytes):
+        yield from read_task(task, projection)
+
+
+def _read_bytes(path):
+    r"""Return the contents of `path`, decompressing it if it is gzipped."""
+    with (gzip.open if _is_gzip(path) else open)(path, 'rb') as f:
+        return f.read()
+
+
+class _TextReader(object):
+    r"""The text of a binary UTF-8 file, decoded a chunk at a time.
+
+    `text` holds the text from `position` on that has been read but not
+    consumed, and `offset` is the number of characters before `text`.
+    """
+
+    def __init__(self, f, chunk_bytes):
+        self.f = f
+        self.chunk_bytes = chunk_bytes
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.position = 0
+        self.offset = 0
+        self.eof = False
+
+    def _read(self):
+        r"""Append a chunk to `text`, dropping the text consumed.
+
+        The chunk is at least as long as the text kept, so that reading
+        a large value repeatedly takes linear time overall.
+        """
+        kept = self.text[self.position:]
+        data = self.f.read(max(self.chunk_bytes, len(kept)))
+        self.eof = not data
+        self.offset += self.position
+        self.text = kept + self.decoder.decode(data, final=self.eof)
+        self.position = 0
+
+    def peek(self):
+        r"""Skip whitespace, and return the next character or ''."""
+        while True:
+            self.position = _WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text) or self.eof:
+                return self.text[self.position:self.position + 1]
+            self._read()
+
+    def decode(self, decoder):
+        r"""Return the next JSON value, reading as needed.
+
+        A value is only accepted once the delimiter of an array item,
+        ',' or ']', follows it in the text read so far, or the file has
+        ended. Otherwise it may continue in the next chunk, as '1.' may
+        be the start of '1.5', and so is decoded again once more has
+        been read.
+        """
+        self.peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                end = _WHITESPACE.match(self.text, end).end()
+                if self.text[end:end + 1] in (',', ']') or self.eof:
+                    self.position = end
+                    return obj
+            self._read()
+
+
+def iter_json_array(path, projection=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    r"""Yield the items of the JSON array in the file at `path`.
+
+    The file is read and decoded `chunk_bytes` at a time, and items are
+    decoded one at a time, so only a chunk and the current item are held
+    in memory. If a `Projection` is given, only the parts of each item
+    it selects are decoded; simdjson then parses the whole file at
+    once, so it is read into memory.
+    """
+    if chunk_bytes < 1:
+        raise ValueError('chunk_bytes must be positive')
+    if projection is not None and projection.lazy:
+        yield from projection.iter_array(_read_bytes(path))
+        return
+    decoder = json.JSONDecoder()
+    with (gzip.open if _is_gzip(path) else open)(path, 'rb') as f:
+        reader = _TextReader(f, chunk_bytes)
+        if reader.peek() != '[':
+            raise ValueError(f'{path} does not contain a JSON array')
+        reader.position += 1
+        if reader.peek() == ']':
+            return
+        while True:
+            yield reader.decode(decoder)
+            delimiter = reader.peek()
+            if delimiter == ']':
+                return
+            if delimiter != ',':
+                raise ValueError(
+                    f'Expected "," or "]" at character '
+                    f'{reader.offset + reader.position} of {path}')
+            reader.position += 1
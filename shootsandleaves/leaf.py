@@ -15,17 +15,35 @@ r"""Utility functions for extracting data from dictionaries.
 >>> get(obj, (1, '1', slice(1,3), 'foo'))
 ```
 """
-from collections import Hashable
-from copy import deepcopy
+from collections.abc import Hashable
+from functools import lru_cache
+from weakref import WeakValueDictionary
+
+import numpy as np
 from six import string_types
 
 # Sentinel for missing values. This can never coincidentally equal
 # external data.
 _MISSING_VALUE = object()
 
+# The exceptions that signal a field is not accessible in an object.
+_LOOKUP_ERRORS = (KeyError, IndexError, TypeError)
+
+# Maximum number of compiled accessors retained by `get`.
+_ACCESSOR_CACHE_SIZE = 1024
+
+# Number of lookups a `_Lookup` observes before choosing its strategy,
+# and the fraction of them that must miss for it to choose guarded
+# lookups over catching exceptions. A miss costs several times more
+# than a hit when caught as an exception, while guards add a little to
+# every hit.
+_PROBE_CALLS = 256
+_GUARDED_MISS_RATE = 0.2
 
+
+@lru_cache(maxsize=_ACCESSOR_CACHE_SIZE)
 def _create_explicit_selector(selector_string):
-    r"""Return a selector list from a .-separated selector string."""
+    r"""Return a selector tuple from a .-separated selector string."""
     selector = []
     for selector_field in selector_string.split('.'):
         # If there's a :, interpret as a slice.
@@ -42,7 +60,340 @@ def _create_explicit_selector(selector_string):
             except ValueError:
                 # At this point, it can only be a string.
                 selector.append(selector_field)
-    return selector
+    return tuple(selector)
+
+
+def _split_selector(selector):
+    r"""Split a selector into runs of fields that each end in a slice.
+
+    Only the final run may end in something other than a slice. For
+    example, `('a', slice(None), 'b', 0)` is split into
+    `[['a', slice(None)], ['b', 0]]`.
+    """
+    runs = [[]]
+    for position, field in enumerate(selector):
+        runs[-1].append(field)
+        if isinstance(field, slice) and position != len(selector) - 1:
+            runs.append([])
+    return runs
+
+
+def _compile_path(fields):
+    r"""Return a function applying a slice-free run of `fields` to obj.
+
+    Short runs are unrolled into straight-line subscripts. Lookup errors
+    propagate to the caller.
+    """
+    if len(fields) == 1:
+        f0, = fields
+        return lambda obj: obj[f0]
+    if len(fields) == 2:
+        f0, f1 = fields
+        return lambda obj: obj[f0][f1]
+    if len(fields) == 3:
+        f0, f1, f2 = fields
+        return lambda obj: obj[f0][f1][f2]
+
+    def path(obj):
+        for field in fields:
+            obj = obj[field]
+        return obj
+    return path
+
+
+def _fan_out(obj, rest, default):
+    r"""Apply the accessor `rest` to each item of `obj`, a sliced iterable.
+
+    The type of iterable is preserved.
+    """
+    if type(obj) is list:
+        return [rest(item, default) for item in obj]
+    return type(obj)(rest(item, default) for item in obj)
+
+
+def _compile_run(fields, rest):
+    r"""Return an accessor for one run of a split selector.
+
+    `rest` is the accessor for the remaining runs, or None if this is
+    the final run. Accessors take `(obj, default)`.
+    """
+    if not fields:
+        return lambda obj, default: obj
+
+    if rest is None:
+        if len(fields) == 1:
+            f0, = fields
+
+            def accessor(obj, default):
+                try:
+                    return obj[f0]
+                except _LOOKUP_ERRORS:
+                    return default
+        elif len(fields) == 2:
+            f0, f1 = fields
+
+            def accessor(obj, default):
+                try:
+                    return obj[f0][f1]
+                except _LOOKUP_ERRORS:
+                    return default
+        else:
+            path = _compile_path(fields)
+
+            def accessor(obj, default):
+                try:
+                    return path(obj)
+                except _LOOKUP_ERRORS:
+                    return default
+        return accessor
+
+    path = _compile_path(fields)
+
+    def fan_out(obj, default):
+        try:
+            obj = path(obj)
+        except _LOOKUP_ERRORS:
+            return default
+        return _fan_out(obj, rest, default)
+    return fan_out
+
+
+def _guarded_step(field):
+    r"""Return a function applying `field` to obj, or `_MISSING_VALUE`.
+
+    Dicts, and lists for integer fields, are checked for the field
+    rather than raising. Other containers raise as usual, and the
+    exception is caught.
+    """
+    def fallback(obj):
+        try:
+            return obj[field]
+        except _LOOKUP_ERRORS:
+            return _MISSING_VALUE
+    try:
+        hash(field)
+    except TypeError:
+        return fallback
+    if isinstance(field, slice):
+        return fallback
+    if type(field) is int:
+        def step(obj):
+            if type(obj) is dict:
+                return obj.get(field, _MISSING_VALUE)
+            if type(obj) is list:
+                if -len(obj) <= field < len(obj):
+                    return obj[field]
+                return _MISSING_VALUE
+            return fallback(obj)
+        return step
+
+    def step(obj):
+        if type(obj) is dict:
+            return obj.get(field, _MISSING_VALUE)
+        return fallback(obj)
+    return step
+
+
+def _compile_guarded(fields):
+    r"""Return a function applying a slice-free run of `fields` to obj.
+
+    It takes `(obj, missing)`, and returns `missing` if a field is
+    absent. Dicts, the usual case, are looked up inline for runs of
+    hashable fields, and short runs are unrolled.
+    """
+    steps = [_guarded_step(_) for _ in fields]
+    try:
+        hash(tuple(fields))
+    except TypeError:
+        plain = False
+    else:
+        plain = not any(isinstance(_, slice) for _ in fields)
+    if not steps:
+        return lambda obj, missing: obj
+    if plain and len(steps) == 1:
+        f0, = fields
+        s0, = steps
+
+        def path(obj, missing):
+            if type(obj) is dict:
+                return obj.get(f0, missing)
+            obj = s0(obj)
+            return missing if obj is _MISSING_VALUE else obj
+        return path
+    if plain and len(steps) == 2:
+        f0, f1 = fields
+        s0, s1 = steps
+
+        def path(obj, missing):
+            obj = obj.get(f0, _MISSING_VALUE) if type(obj) is dict else s0(obj)
+            if obj is _MISSING_VALUE:
+                return missing
+            obj = obj.get(f1, _MISSING_VALUE) if type(obj) is dict else s1(obj)
+            return missing if obj is _MISSING_VALUE else obj
+        return path
+    if plain and len(steps) == 3:
+        f0, f1, f2 = fields
+        s0, s1, s2 = steps
+
+        def path(obj, missing):
+            obj = obj.get(f0, _MISSING_VALUE) if type(obj) is dict else s0(obj)
+            if obj is _MISSING_VALUE:
+                return missing
+            obj = obj.get(f1, _MISSING_VALUE) if type(obj) is dict else s1(obj)
+            if obj is _MISSING_VALUE:
+                return missing
+            obj = obj.get(f2, _MISSING_VALUE) if type(obj) is dict else s2(obj)
+            return missing if obj is _MISSING_VALUE else obj
+        return path
+    if plain:
+        pairs = list(zip(fields, steps))
+
+        def path(obj, missing):
+            for field, step in pairs:
+                obj = (obj.get(field, _MISSING_VALUE) if type(obj) is dict
+                       else step(obj))
+                if obj is _MISSING_VALUE:
+                    return missing
+            return obj
+        return path
+
+    def path(obj, missing):
+        for step in steps:
+            obj = step(obj)
+            if obj is _MISSING_VALUE:
+                return missing
+        return obj
+    return path
+
+
+def _compile_guarded_run(fields, rest):
+    r"""Return an accessor for one run, as `_compile_run` does.
+
+    Lookups are guarded rather than relying on exceptions; see
+    `_guarded_step`.
+    """
+    path = _compile_guarded(fields)
+    if rest is None:
+        return path
+
+    def fan_out(obj, default):
+        obj = path(obj, _MISSING_VALUE)
+        if obj is _MISSING_VALUE:
+            return default
+        return _fan_out(obj, rest, default)
+    return fan_out
+
+
+def _compile_selector(selector, guarded=False):
+    r"""Compile a selector tuple into an accessor taking (obj, default).
+
+    If `guarded`, lookups in dicts and lists check for the field rather
+    than catching the exception raised when it is missing.
+    """
+    compile_run = _compile_guarded_run if guarded else _compile_run
+    accessor = None
+    for fields in reversed(_split_selector(selector)):
+        accessor = compile_run(fields, accessor)
+    return accessor
+
+
+class _Lookup(object):
+    r"""The accessor of a selector, adapting its strategy to the data.
+
+    Catching the exception raised by a missing field is cheapest when
+    fields are usually present, and checking for the field first when
+    they are often missing. `lookup(obj, default)` uses guarded lookups
+    for the first `_PROBE_CALLS` calls, counting how many return the
+    default, and then settles on whichever strategy suits the rate.
+    Both give the same results.
+    """
+
+    __slots__ = ('lookup', 'selector', 'key', '_guarded', '_raising',
+                 'calls', 'misses', '__weakref__')
+
+    def __init__(self, selector, key=None):
+        r"""Construct the accessor of the selector tuple `selector`.
+
+        `key` is the tuple of the `_field_key`s of its fields, if already
+        made. Each strategy is compiled when it is first used, so
+        selectors that are never looked up compile neither.
+        """
+        self.selector = selector
+        self.key = (tuple(_field_key(_) for _ in selector) if key is None
+                    else key)
+        self._guarded = None
+        self._raising = None
+        self.calls = 0
+        self.misses = 0
+        self.lookup = self._probe
+
+    @property
+    def guarded(self):
+        r"""The accessor checking for fields before looking them up."""
+        if self._guarded is None:
+            self._guarded = _compile_selector(self.selector, guarded=True)
+        return self._guarded
+
+    @property
+    def raising(self):
+        r"""The accessor catching the exceptions of missing fields."""
+        if self._raising is None:
+            self._raising = _compile_selector(self.selector)
+        return self._raising
+
+    def _probe(self, obj, default):
+        r"""Return the field of obj, counting misses to pick a strategy."""
+        value = self.guarded(obj, default)
+        self.calls += 1
+        if value is default:
+            self.misses += 1
+        if self.calls == _PROBE_CALLS:
+            if self.misses >= _GUARDED_MISS_RATE * _PROBE_CALLS:
+                self.lookup = self.guarded
+            else:
+                self.lookup = self.raising
+        return value
+
+
+def _field_key(field):
+    r"""Return a hashable key that distinguishes `field` by type."""
+    if isinstance(field, slice):
+        return (slice, tuple(
+            (type(_), _) for _ in (field.start, field.stop, field.step)))
+    return (type(field), field)
+
+
+def _field_from_key(key):
+    r"""Invert `_field_key`."""
+    kind, value = key
+    if kind is slice:
+        return slice(*(_ for _kind, _ in value))
+    return value
+
+
+# The `_Lookup` of each selector key in use, shared between Leaves.
+_LOOKUPS = WeakValueDictionary()
+
+
+def _intern(key):
+    r"""Return the shared `_Lookup` for a selector key.
+
+    It is kept for as long as a Leaf, or the cache of `get`, refers to
+    it, so any number of selectors can be in use at once.
+    """
+    lookup = _LOOKUPS.get(key)
+    if lookup is None:
+        selector = tuple(_field_from_key(_) for _ in key)
+        lookup = _LOOKUPS.setdefault(key, _Lookup(selector, key))
+    return lookup
+
+
+@lru_cache(maxsize=_ACCESSOR_CACHE_SIZE)
+def _cached_accessor(key):
+    r"""Return the `_Lookup` for a selector string or key."""
+    if isinstance(key, string_types):
+        return Leaf(key)._accessor
+    return _intern(key)
 
 
 def get(obj, selector, default=None):
@@ -54,9 +405,33 @@ def get(obj, selector, default=None):
           recursively extract. `slice` objects are ok.
         - default: Value to return if the leaf value cannot be reached.
 
-    For more details, see the documentation for `Leaf`.
+    Compiled accessors are cached by selector, so repeated calls with
+    the same selector do not re-parse or re-compile it. For more
+    details, see the documentation for `Leaf`.
     """
-    return Leaf(selector, default=default).get_from(obj)
+    if isinstance(selector, string_types):
+        key = selector
+    elif isinstance(selector, (list, tuple)):
+        try:
+            key = tuple(_field_key(field) for field in selector)
+            hash(key)
+        except TypeError:
+            return Leaf(selector, default=default).get_from(obj)
+    else:
+        return Leaf(selector, default=default).get_from(obj)
+    return _cached_accessor(key).lookup(obj, default)
+
+
+def _same_default(default, other):
+    r"""Return True if the defaults of two Leaves are interchangeable."""
+    if default is other:
+        return True
+    if type(default) is not type(other):
+        return False
+    try:
+        return bool(default == other)
+    except (TypeError, ValueError):
+        return False
 
 
 class Leaf(object):
@@ -96,6 +471,8 @@ class Leaf(object):
     ```
     """
 
+    __slots__ = ('selector', 'default', '_accessor')
+
     def __init__(self, selector=None, default=None):
         r"""Construct a Leaf.
 
@@ -120,41 +497,75 @@ class Leaf(object):
               leaf field is not present in a given object.
 
         Internally, selectors are always stored as tuples, regardless of
-        what form of the parameter was used.
+        what form of the parameter was used, and are compiled once into
+        a specialised accessor function. Leaves are immutable, and
+        leaves with the same selector share the tuple and the accessor.
         """
-        self.default = default
-
-        if isinstance(selector, string_types):
-            self.selector = _create_explicit_selector(selector)
-        elif isinstance(selector, slice):
-            self.selector = [selector]
-        elif isinstance(selector, Leaf):
-            self.selector = deepcopy(selector.selector)
+        if isinstance(selector, Leaf):
             if default is not None:
                 raise ValueError('Setting the default value is not permitted '
                                  'when constructing a Leaf from another Leaf.')
-            self.default = selector.default
+            # Leaves are immutable, so everything can be shared.
+            for name in Leaf.__slots__:
+                object.__setattr__(self, name, getattr(selector, name))
+            return
+
+        if isinstance(selector, string_types):
+            selector = _create_explicit_selector(selector)
+        elif isinstance(selector, slice):
+            selector = [selector]
         elif selector is None:
-            self.selector = []
-        else:
-            self.selector = selector
-        assert all(
-            isinstance(field, (Hashable, slice)) for field in self.selector)
-
-        self.selector = tuple(self.selector)
-        self._internal_selector = [[]]
-        index = 0
-        for position, field in enumerate(self.selector):
-            self._internal_selector[index].append(field)
-            if (isinstance(field, slice)
-                    and position != len(self.selector) - 1):
-                self._internal_selector.append([])
-                index += 1
+            selector = []
+        assert all(isinstance(field, (Hashable, slice)) for field in selector)
+
+        # Distinguishes fields by type, so that, for example, the
+        # selectors (1,) and (True,) are not equal.
+        key = tuple(_field_key(field) for field in selector)
+        try:
+            accessor = _intern(key)
+        except TypeError:
+            # A field claimed to be hashable, but was not.
+            accessor = _Lookup(tuple(selector), key)
+        object.__setattr__(self, 'selector', accessor.selector)
+        object.__setattr__(self, 'default', default)
+        object.__setattr__(self, '_accessor', accessor)
+
+    def __setattr__(self, name, value):
+        r"""Raise an AttributeError, as Leaves are immutable."""
+        raise AttributeError('Leaf objects are immutable')
+
+    def __delattr__(self, name):
+        r"""Raise an AttributeError, as Leaves are immutable."""
+        raise AttributeError('Leaf objects are immutable')
 
     def __repr__(self):
         r"""Return repr string for self."""
         return f'Leaf({self.selector}, default={self.default})'
 
+    def __eq__(self, other):
+        r"""Return True if other is a Leaf with the same selector and default.
+
+        Fields of the selectors, and the defaults, must have the same
+        types as well as being equal. Defaults whose comparison does not
+        give a bool, such as numpy arrays, are only equal if they are the
+        same object.
+        """
+        if not isinstance(other, Leaf):
+            return NotImplemented
+        return (self._accessor.key == other._accessor.key
+                and _same_default(self.default, other.default))
+
+    def __hash__(self):
+        r"""Return a hash of the selector.
+
+        The default is not hashed, as it need not be hashable.
+        """
+        return hash(self._accessor.key)
+
+    def __reduce__(self):
+        r"""Pickle a Leaf by its selector, recompiling it on load."""
+        return (Leaf, (self.selector, self.default))
+
     def get_from(self, obj, idx=0):
         r"""Attempt to extract a leaf field from `obj`.
 
@@ -169,22 +580,25 @@ class Leaf(object):
               accessible.
 
         """
-        # The main loop walks through the fields in `selector`, updating
-        # `obj` each time, and bailing if we need to return the default.
-        # If the field is a slice, there is special handling, see below.
-        while idx < len(self.selector):
-            field = self.selector[idx]
-            try:
-                obj = obj[field]
-            except (KeyError, IndexError, TypeError):
-                return self.default
-            idx += 1
-            if isinstance(field, slice):
-                # At this point, `field` is a slice, `obj` is an
-                # iterable (the valid result of having sliced
-                # something), and `idx` points to the next field to
-                # select. We recursively select from each of the items
-                # in `obj`, and then cast the result to be the same type
-                # of iterator as `obj`.
-                return type(obj)(self.get_from(item, idx=idx) for item in obj)
-        return obj
+        if idx:
+            return get(obj, self.selector[idx:], self.default)
+        return self._accessor.lookup(obj, self.default)
+
+    def get_many(self, objs, dtype=None):
+        r"""Return the leaf field of each of `objs`.
+
+        Args:
+            - objs: An iterable of objects.
+            - dtype: If given, a NumPy dtype to return the values as an
+              array of, rather than a list. The values must then be
+              convertible by `numpy.array`.
+
+        Returns:
+            - A list, or array, of `self.get_from(obj)` for each obj.
+        """
+        accessor = self._accessor
+        default = self.default
+        values = [accessor.lookup(obj, default) for obj in objs]
+        if dtype is None:
+            return values
+        return np.array(values, dtype=dtype)
@@ -0,0 +1,212 @@
+r"""Columns written to disk as they are extracted, and memory-mapped back.
+
+```
+>>> grove.write_mapped(data, 'out')
+>>> df = read_mapped('out')
+```
+
+Each column is a raw array file, `out/column0.values` and so on, which
+grows by a chunk of values at a time, so extracting needs memory for a
+chunk rather than for the whole result. The sidecar `out/_metadata.json`
+records the number of rows and, for each column, its name, dtype and
+files. Integer and bool columns with missing values also have a file
+holding their mask; missing floats and datetimes are stored as NaN and
+NaT. Categorical columns hold their codes, and the sidecar their
+categories. Reading maps the files rather than loading them, so it is
+immediate however many rows there are, and pages are read only as they
+are used.
+"""
+import json
+import os
+
+import numpy as np
+from pandas import Categorical, CategoricalDtype, DataFrame, Series
+from pandas.arrays import BooleanArray, IntegerArray
+from shootsandleaves.column import categorical_dtype, typed_dtype
+from shootsandleaves.parallel import DEFAULT_BATCH_SIZE, batches
+
+# The name of the sidecar describing the columns of a directory.
+METADATA = '_metadata.json'
+
+# The dtype of the codes of categorical columns, as in `CategoryColumn`.
+_CODES = np.dtype('int32')
+
+
+def _field(position, shoot):
+    r"""Return the metadata of the column of `shoot`, without its counts.
+
+    A ValueError is raised if its values cannot be stored in an array.
+    """
+    name = shoot.column_name
+    field = {'name': name, 'values': f'column{position}.values'}
+    categorical = categorical_dtype(shoot.dtype)
+    typed = typed_dtype(shoot.dtype)
+    if shoot.vectorized_transform is not None or (
+            categorical is None and typed is None):
+        raise ValueError(
+            f'Column {name!r} cannot be written to an array. Set a '
+            'numeric, bool, datetime or category dtype on its Shoot, and '
+            'no vectorized_transform.')
+    if categorical is not None:
+        field['dtype'] = 'category'
+        field['ordered'] = bool(categorical.ordered)
+    else:
+        field['dtype'] = typed.str
+    return field
+
+
+def _write_chunk(field, column, values_file, mask_file):
+    r"""Write the values of `column` to its files.
+
+    Returns the number of missing values.
+    """
+    values, mask = column.arrays()
+    if field['dtype'] == 'category':
+        values.tofile(values_file)
+        return int(np.count_nonzero(values == -1))
+    nulls = int(np.count_nonzero(mask))
+    if mask_file is not None:
+        mask.tofile(mask_file)
+    elif nulls:
+        kind = values.dtype.kind
+        values[mask] = np.nan if kind == 'f' else values.dtype.type('NaT')
+    values.tofile(values_file)
+    return nulls
+
+
+def write_mapped(grove, data, out_dir, chunk_rows=DEFAULT_BATCH_SIZE):
+    r"""Write the values `grove` extracts from `data` to array files.
+
+    See `Grove.write_mapped`.
+    """
+    fields = [_field(i, shoot) for i, shoot in enumerate(grove.shoots)]
+    if chunk_rows < 1:
+        raise ValueError('chunk_rows must be positive')
+    os.makedirs(out_dir, exist_ok=True)
+    metadata_path = os.path.join(out_dir, METADATA)
+    # Files left by an earlier run no longer match its sidecar.
+    if os.path.exists(metadata_path):
+        os.remove(metadata_path)
+
+    grove._start_run()
+    dictionaries = {}
+    values_files, mask_files = [], []
+    try:
+        for field in fields:
+            path = os.path.join(out_dir, field['values'])
+            values_files.append(open(path, 'wb'))
+            mask_file = None
+            if field['dtype'] != 'category' and np.dtype(
+                    field['dtype']).kind in 'iub':
+                field['mask'] = field['values'].replace('.values', '.mask')
+                path = os.path.join(out_dir, field['mask'])
+                mask_file = open(path, 'wb')
+            mask_files.append(mask_file)
+            field['null_count'] = 0
+        rows = 0
+        for batch in batches(data, chunk_rows):
+            columns = grove._make_columns(len(batch),
+                                          dictionaries=dictionaries)
+            rows += grove._fill(columns, batch)
+            for field, column, values_file, mask_file in zip(
+                    fields, columns, values_files, mask_files):
+                field['null_count'] += _write_chunk(
+                    field, column, values_file, mask_file)
+    finally:
+        for f in values_files + mask_files:
+            if f is not None:
+                f.close()
+
+    for field, shoot in zip(fields, grove.shoots):
+        if 'mask' in field and not field['null_count']:
+            os.remove(os.path.join(out_dir, field.pop('mask')))
+        if field['dtype'] == 'category':
+            categories = categorical_dtype(shoot.dtype).categories
+            if categories is None:
+                categories = dictionaries.get(shoot.column_name, ())
+            field['categories'] = list(categories)
+    metadata = {'rows': rows, 'index': grove.index, 'columns': fields}
+    temporary = metadata_path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(metadata, f)
+    os.replace(temporary, metadata_path)
+    return metadata
+
+
+def read_metadata(directory):
+    r"""Return the sidecar of a directory written by `write_mapped`."""
+    with open(os.path.join(directory, METADATA)) as f:
+        return json.load(f)
+
+
+def _map(directory, name, dtype, rows, mode):
+    r"""Return the array in file `name`, memory-mapped."""
+    if not rows:
+        # Empty files cannot be mapped.
+        return np.empty(0, dtype=dtype)
+    return np.memmap(os.path.join(directory, name), dtype=dtype, mode=mode,
+                     shape=(rows,))
+
+
+def open_mapped(directory, mode='r'):
+    r"""Return the arrays of a directory written by `write_mapped`.
+
+    Returns a dict mapping each column name to a pair of memory-mapped
+    arrays: its values, or codes for categorical columns, and the mask
+    of its missing values, or None if no values are masked. `mode` is as
+    for `numpy.memmap`.
+    """
+    metadata = read_metadata(directory)
+    rows = metadata['rows']
+    arrays = {}
+    for field in metadata['columns']:
+        dtype = field['dtype']
+        dtype = _CODES if dtype == 'category' else np.dtype(dtype)
+        mask = field.get('mask')
+        if mask is not None:
+            mask = _map(directory, mask, bool, rows, mode)
+        arrays[field['name']] = (
+            _map(directory, field['values'], dtype, rows, mode), mask)
+    return arrays
+
+
+def _series(field, values, mask):
+    r"""Return a Series wrapping the arrays of a column."""
+    name = field['name']
+    # Plain ndarray views of the maps, which keep them open, so that
+    # results computed from the Series are not memmaps.
+    values = np.asarray(values)
+    if mask is not None:
+        mask = np.asarray(mask)
+    if field['dtype'] == 'category':
+        dtype = CategoricalDtype(field['categories'], field['ordered'])
+        values = Categorical.from_codes(values, dtype=dtype)
+    elif mask is not None:
+        array = BooleanArray if values.dtype.kind == 'b' else IntegerArray
+        values = array(values, mask)
+    return Series(values, name=name, copy=False)
+
+
+def read_mapped(directory, columns=None):
+    r"""Return a DataFrame of a directory written by `write_mapped`.
+
+    Only the columns named in `columns`, if given, are read. Columns
+    other than categorical ones wrap the memory-mapped files without
+    copying them. The index is set as it was for the Grove.
+    """
+    metadata = read_metadata(directory)
+    arrays = open_mapped(directory)
+    fields = metadata['columns']
+    index = metadata['index']
+    if columns is not None:
+        wanted = set(columns)
+        if index:
+            wanted.update(index if isinstance(index, list) else [index])
+        fields = [_ for _ in fields if _['name'] in wanted]
+    df = DataFrame({
+        field['name']: _series(field, *arrays[field['name']])
+        for field in fields
+    }, copy=False)
+    if index:
+        df.set_index(index, inplace=True)
+    return df
@@ -0,0 +1,96 @@
+r"""Helpers for extracting batches of objects in worker processes.
+
+```
+>>> for series in map_batches(grove, data, workers=4, batch_size=1000):
+...     pass  # One list of Series per batch, in the order of `data`.
+>>> for result in map_tasks(grove, function, tasks, workers=4):
+...     pass  # function(grove, task) for each task, in order.
+```
+"""
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Number of objects sent to a worker process at a time.
+DEFAULT_BATCH_SIZE = 10000
+
+# The Grove that batches are extracted with in a worker process.
+_worker_grove = None
+
+
+def batches(data, size):
+    r"""Yield successive lists of `size` objects from `data`."""
+    data = iter(data)
+    while True:
+        batch = list(islice(data, size))
+        if not batch:
+            return
+        yield batch
+
+
+def dumps_grove(grove):
+    r"""Return `grove` pickled, raising a ValueError if that is impossible.
+
+    The error names the first shoot that cannot be pickled, which is
+    usually one with a lambda or locally defined transform.
+    """
+    try:
+        return pickle.dumps(grove)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        error = e
+    for shoot in grove.shoots:
+        try:
+            pickle.dumps(shoot)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            raise ValueError(
+                f'Shoot {shoot.column_name!r} cannot be sent to worker '
+                f'processes because it cannot be pickled: {e}. Use a '
+                'module-level function as its transform.') from e
+    raise ValueError(
+        f'The Grove cannot be pickled: {error}') from error
+
+
+def _init_worker(payload):
+    r"""Unpickle the Grove for this worker process."""
+    global _worker_grove
+    _worker_grove = pickle.loads(payload)
+
+
+def _run(function, task):
+    r"""Return `function(grove, task)` with the worker's Grove."""
+    return function(_worker_grove, task)
+
+
+def map_tasks(grove, function, tasks, workers):
+    r"""Yield `function(grove, task)` for each of `tasks`, in order.
+
+    `function` must be picklable, such as a module-level function or a
+    `partial` of one, and runs in one of `workers` processes. The Grove
+    is pickled once and sent to each worker when it starts, rather than
+    with every task. At most two tasks per worker are in flight at once,
+    so `tasks` is consumed no faster than it is processed.
+    """
+    payload = dumps_grove(grove)
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(payload,)) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_run, function, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _extract_batch(grove, batch):
+    r"""Return the Series of each shoot of `grove` over `batch`."""
+    return grove._extract_series(batch)
+
+
+def map_batches(grove, data, workers, batch_size=DEFAULT_BATCH_SIZE):
+    r"""Yield the Series extracted from each batch of `data`, in order."""
+    if batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    return map_tasks(grove, _extract_batch, batches(data, batch_size),
+                     workers)
@@ -0,0 +1,136 @@
+r"""A JSON decoder that only builds the values a set of selectors reads.
+
+```
+>>> projection = Projection(['user.id', 'items.:.sku'])
+>>> projection.loads('{"user": {"id": 1, "bio": "..."}, "log": [...]}')
+{'user': {'id': 1}}
+```
+
+Documents are parsed lazily by simdjson, from the optional `pysimdjson`
+package, and only the selected values are converted to Python objects.
+Every selector gets the same result from the projected object as from
+`json.loads` of the whole document. Without simdjson, documents are
+decoded in full by `json.loads`.
+"""
+import json
+
+from six import string_types
+
+from shootsandleaves.leaf import Leaf
+
+try:
+    import simdjson
+except ImportError:  # pragma: no cover
+    simdjson = None
+
+
+class _Node(object):
+    r"""The parts of a JSON value that some selectors read.
+
+    `keys` maps the keys of an object to the nodes of their values, and
+    `items` is the node of every item of an array. If `everything` is
+    True, the whole value is needed.
+    """
+
+    def __init__(self):
+        self.everything = False
+        self.keys = {}
+        self.items = None
+
+    def insert(self, selector):
+        r"""Add the parts of a value that `selector` reads."""
+        node = self
+        for field in selector:
+            if node.everything:
+                return
+            if isinstance(field, string_types):
+                node = node.keys.setdefault(field, _Node())
+            elif isinstance(field, (int, slice)):
+                if node.items is None:
+                    node.items = _Node()
+                node = node.items
+            else:
+                # No JSON container has a key or index of any other type,
+                # so the selector always yields its default.
+                return
+        node.everything = True
+        node.keys = {}
+        node.items = None
+
+    def convert(self, value):
+        r"""Return the parts of a lazy simdjson value read below self.
+
+        An object none of whose keys are read becomes an empty dict, and
+        likewise for arrays, since every selector gets the same result
+        from either.
+        """
+        if isinstance(value, simdjson.Object):
+            if self.everything:
+                return value.as_dict()
+            return {
+                key: child.convert(value[key])
+                for key, child in self.keys.items() if key in value
+            }
+        if isinstance(value, simdjson.Array):
+            if self.everything:
+                return value.as_list()
+            if self.items is None:
+                return []
+            return [self.items.convert(item) for item in value]
+        return value
+
+
+class Projection(object):
+    r"""Decode only the parts of JSON documents read by some selectors.
+
+    If an object has duplicate keys, simdjson keeps the first value of a
+    key, whereas `json.loads` keeps the last.
+    """
+
+    # True if documents are parsed lazily, rather than decoded in full.
+    lazy = simdjson is not None
+
+    def __init__(self, selectors):
+        r"""Construct a Projection from selectors or Leaves."""
+        self._root = _Node()
+        for selector in selectors:
+            self._root.insert(Leaf(selector).selector)
+        self._parser = None
+
+    def loads(self, text):
+        r"""Return the projection of the JSON document `text`."""
+        if not self.lazy:
+            return json.loads(text)
+        if self._parser is None:
+            self._parser = simdjson.Parser()
+        try:
+            return self._root.convert(self._parser.parse(text))
+        except (ValueError, RuntimeError):
+            # simdjson rejects the NaN and Infinity that json accepts,
+            # and raises a RuntimeError for integers wider than 64 bits,
+            # even where nothing selects them, so let json decide.
+            return json.loads(text)
+
+    def iter_array(self, text):
+        r"""Yield the projection of each item of the JSON array `text`.
+
+        This requires simdjson. The array is parsed by a parser of its
+        own, so `loads` may be used while iterating.
+        """
+        yielded = 0
+        try:
+            document = simdjson.Parser().parse(text)
+            if not isinstance(document, simdjson.Array):
+                raise ValueError('The JSON document is not an array')
+            for item in document:
+                projected = self._root.convert(item)
+                yield projected
+                yielded += 1
+            return
+        except (ValueError, RuntimeError):
+            # As in `loads`; the items already yielded are skipped.
+            pass
+        document = json.loads(text)
+        if not isinstance(document, list):
+            raise ValueError('The JSON document is not an array')
+        yield from document[yielded:]
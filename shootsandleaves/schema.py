@@ -0,0 +1,61 @@
+r"""Inference of Shoot dtypes from a sample of extracted values.
+
+```
+>>> infer_dtype([1, 2, None])
+'int64'
+>>> infer_dtype(['de', 'fr', 'de', 'de'])
+'category'
+```
+"""
+from datetime import datetime
+
+import numpy as np
+from pandas import Timestamp
+
+# Strings are categorical if there are at most this many distinct values
+# per value in the sample.
+_CATEGORY_RATIO = 0.5
+
+# Number of objects sampled by `Grove(infer_dtypes=True)`.
+DEFAULT_SAMPLE_SIZE = 1000
+
+# The types of the values each inferred dtype holds without widening;
+# see `WideningColumn`. Dtypes not listed hold any value.
+ACCEPTED_TYPES = {
+    'bool': frozenset([bool, np.bool_]),
+    'int64': frozenset([int, np.int64]),
+    'float64': frozenset([int, float, np.int64, np.float64]),
+    'datetime64[ns]': frozenset([datetime, Timestamp, np.datetime64]),
+    'str': frozenset([str]),
+}
+
+
+def is_missing(value):
+    r"""Return True if `value` is None or NaN."""
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def infer_dtype(values):
+    r"""Return the dtype suited to a sample of a shoot's values, or None.
+
+    The dtype is 'bool', 'int64', 'float64' or 'datetime64[ns]' if every
+    value, ignoring missing ones, is of the matching Python type, and
+    'category' or 'str' for strings, depending on how often they repeat.
+    Anything else, such as lists, dicts or a mixture of types, gives
+    'object'. None is returned if every value is missing.
+    """
+    present = [_ for _ in values if not is_missing(_)]
+    if not present:
+        return None
+    types = {type(_) for _ in present}
+    for dtype in ('bool', 'int64', 'float64'):
+        if types <= ACCEPTED_TYPES[dtype]:
+            return dtype
+    if (types <= ACCEPTED_TYPES['datetime64[ns]']
+            and all(getattr(_, 'tzinfo', None) is None for _ in present)):
+        return 'datetime64[ns]'
+    if types == {str}:
+        if len(set(present)) <= _CATEGORY_RATIO * len(present):
+            return 'category'
+        return 'str'
+    return 'object'
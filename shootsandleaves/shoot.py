@@ -1,10 +1,17 @@
 r"""A specification for extracting a dataframe column from JSON."""
+from functools import partial
+
+from pandas import Series
+from shootsandleaves.column import make_column
 from shootsandleaves.leaf import Leaf
 
 
 class Shoot():
     r"""TODO. This is a test."""
 
+    __slots__ = ('column_name', 'explicit_leaves', 'transform',
+                 'vectorized_transform', 'default', 'dtype', '_single')
+
     def __init__(self,
                  column_name,
                  leaves=None,
@@ -12,33 +19,60 @@ class Shoot():
                  default=None,
                  explicit_leaves=None,
                  dtype=None,
+                 vectorized_transform=None,
                  **kwargs):
-        r"""TODO."""
-        self.column_name = column_name
+        r"""TODO.
 
+        A `vectorized_transform` is an alternative to `transform` that
+        acts on whole columns rather than single values. It is passed a
+        Series of the values of the leaf, or a list of such Series if
+        there are several leaves, and returns a Series or array of the
+        same length. A Grove calls it once per DataFrame, or per chunk.
+
+        Shoots are immutable.
+        """
+        assert (transform is None) or (vectorized_transform is None)
         assert (leaves is None) or (explicit_leaves is None)
         if explicit_leaves is None:
             if leaves is None:
                 leaves = column_name
             if not isinstance(leaves, (list, tuple)):
                 leaves = [leaves]
-            self.explicit_leaves = [Leaf(_, default) for _ in leaves]
+            explicit_leaves = tuple(Leaf(_, default) for _ in leaves)
         else:
             assert all(
                 isinstance(leaf, Leaf) for leaf in explicit_leaves)
-            self.explicit_leaves = explicit_leaves
+            explicit_leaves = tuple(explicit_leaves)
 
-        if transform is None:
-            transform = lambda arg: arg  # noqa
+        set_ = object.__setattr__
+        set_(self, 'column_name', column_name)
+        set_(self, 'explicit_leaves', explicit_leaves)
+        set_(self, 'transform', transform)
+        set_(self, 'vectorized_transform', vectorized_transform)
+        set_(self, 'default', default)
+        set_(self, 'dtype', dtype)
         # When there is only a single leaf value, the transform function
         # should act on that value, not on a list.
-        if len(self.explicit_leaves) == 1:
-            self.transform = lambda arg: transform(arg[0])
-        else:
-            self.transform = transform
+        set_(self, '_single', len(explicit_leaves) == 1)
 
-        self.default = default
-        self.dtype = dtype
+    def __setattr__(self, name, value):
+        r"""Raise an AttributeError, as Shoots are immutable."""
+        raise AttributeError('Shoot objects are immutable')
+
+    def __delattr__(self, name):
+        r"""Raise an AttributeError, as Shoots are immutable."""
+        raise AttributeError('Shoot objects are immutable')
+
+    def __reduce__(self):
+        r"""Pickle a Shoot by its arguments.
+
+        The transform must itself be picklable.
+        """
+        return (partial(Shoot, self.column_name, transform=self.transform,
+                        default=self.default,
+                        explicit_leaves=self.explicit_leaves,
+                        dtype=self.dtype,
+                        vectorized_transform=self.vectorized_transform), ())
 
     def project(self, obj):
         r"""TODO."""
@@ -46,9 +80,91 @@ class Shoot():
 
     def extract(self, obj):
         r"""TODO."""
-        projection = self.project(obj)
-        # Do not attempt to transform a singleton default value
-        if len(projection) == 1 and projection[0] is self.default:
-            return self.default
+        return self.extract_from_projection(self.project(obj))
+
+    def extract_from_projection(self, projection):
+        r"""Return the extracted value given the result of `project`."""
+        if self.vectorized_transform is not None:
+            return self.extract_from_projections(
+                [[_] for _ in projection]).iloc[0]
+
+        if self._single:
+            value = projection[0]
+            # Do not attempt to transform a singleton default value
+            if value is self.default:
+                return value
+        else:
+            value = projection
+
+        if self.transform is None:
+            return value
+        return self.transform(value)
+
+    def extract_from_projections(self, columns):
+        r"""Return a Series of the extracted values of many projections.
+
+        `columns` holds a list of the values of each leaf, that is, the
+        results of `project` for many objects, transposed. The transform
+        is applied once to whole columns if the Shoot has a
+        `vectorized_transform`, and to each projection otherwise. As in
+        `extract_from_projection`, a single leaf's default value is not
+        transformed.
+        """
+        if self.vectorized_transform is None:
+            return Series(self._extract_values(columns), dtype=self.dtype)
+
+        series = [Series(values) for values in columns]
+        if len(series) == 1:
+            result = self.vectorized_transform(series[0])
+        else:
+            result = self.vectorized_transform(series)
+        if not isinstance(result, Series):
+            result = Series(result)
+        if len(columns) == 1:
+            default = self.default
+            missing = [value is default for value in columns[0]]
+            if any(missing):
+                result = result.mask(missing, default)
+        if self.dtype is not None:
+            result = result.astype(self.dtype)
+        return result
+
+    def _extract_values(self, columns):
+        r"""Return a list of the extracted values of many projections.
+
+        `columns` is as for `extract_from_projections`, and the Shoot
+        must not have a vectorized transform.
+        """
+        transform = self.transform
+        if self._single:
+            values = columns[0]
+            if transform is None:
+                return list(values)
+            default = self.default
+            return [_ if _ is default else transform(_) for _ in values]
+        projections = [list(_) for _ in zip(*columns)]
+        if transform is None:
+            return projections
+        return [transform(_) for _ in projections]
+
+    def extract_many(self, objs, dtype=None):
+        r"""Return a Series of the extracted value of each of `objs`.
 
-        return self.transform(projection)
+        Each leaf is evaluated over all of `objs` with `Leaf.get_many`,
+        and the transform is then applied to the resulting columns, as
+        by `extract_from_projections`. `dtype` overrides `self.dtype`.
+        Values of numeric, bool and datetime dtypes are collected as by
+        `Grove.dataframe_from_iterator`, so missing integers give a
+        nullable integer Series.
+        """
+        if not isinstance(objs, (list, tuple)):
+            objs = list(objs)
+        columns = [leaf.get_many(objs) for leaf in self.explicit_leaves]
+        if dtype is None:
+            dtype = self.dtype
+        if self.vectorized_transform is not None:
+            series = self.extract_from_projections(columns)
+            return series if dtype is None else series.astype(dtype)
+        column = make_column(dtype, len(objs))
+        column.extend(self._extract_values(columns))
+        return column.to_series()
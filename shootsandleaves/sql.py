@@ -0,0 +1,84 @@
+r"""Bulk inserts of extracted rows through a DB-API connection.
+
+```
+>>> columns = [shoot.column_name for shoot in grove.shoots]
+>>> statement = insert_statement('orders', columns)
+>>> insert_rows(connection, statement, grove.iter_rows(data),
+...             batch_size=1000, commit_interval=100000)
+```
+
+Rows go straight from the Grove to `executemany`, without pandas, and
+only a batch of them is held in memory at a time.
+"""
+from shootsandleaves.parallel import DEFAULT_BATCH_SIZE, batches
+
+# Placeholders of the DB-API paramstyles that take a sequence of values.
+_PLACEHOLDERS = {
+    'qmark': lambda i: '?',
+    'numeric': lambda i: f':{i + 1}',
+    'format': lambda i: '%s',
+}
+
+
+def _quote(name):
+    r"""Return `name` quoted as an SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def insert_statement(table, columns, paramstyle='qmark'):
+    r"""Return an INSERT statement for rows of values of `columns`.
+
+    `paramstyle` is that of the DB-API module, such as
+    `sqlite3.paramstyle`; only those that take a sequence of values,
+    'qmark', 'numeric' and 'format', are supported. The table and column
+    names are quoted.
+    """
+    try:
+        placeholder = _PLACEHOLDERS[paramstyle]
+    except KeyError:
+        raise ValueError(
+            f'paramstyle must be one of {sorted(_PLACEHOLDERS)}, not '
+            f'{paramstyle!r}') from None
+    names = ', '.join(_quote(_) for _ in columns)
+    values = ', '.join(placeholder(i) for i in range(len(columns)))
+    return f'INSERT INTO {_quote(table)} ({names}) VALUES ({values})'
+
+
+def insert_rows(connection, statement, rows, batch_size=DEFAULT_BATCH_SIZE,
+                commit_interval=None):
+    r"""Execute `statement` for each of `rows`, in batches.
+
+    Args:
+        - connection: A DB-API connection.
+        - statement: A statement with a parameter for each value of a
+          row, such as from `insert_statement`.
+        - rows: An iterable of sequences of values, such as
+          `Grove.iter_rows`.
+        - batch_size: The number of rows passed to each `executemany`.
+        - commit_interval: The number of rows after which the
+          transaction is committed, rounded up to whole batches. By
+          default, it is committed once at the end.
+
+    If a batch fails, the uncommitted rows are rolled back, and the
+    error is raised. Returns the number of rows executed.
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    cursor = connection.cursor()
+    count = uncommitted = 0
+    try:
+        for batch in batches(rows, batch_size):
+            cursor.executemany(statement, batch)
+            count += len(batch)
+            uncommitted += len(batch)
+            if commit_interval and uncommitted >= commit_interval:
+                connection.commit()
+                uncommitted = 0
+        if uncommitted:
+            connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return count
@@ -0,0 +1,182 @@
+r"""Profiling counters for the Shoots and Leaves of a Grove.
+
+```
+>>> grove = Grove(shoots, stats=True)
+>>> df = grove.dataframe_from_iterator(data)
+>>> grove.stats.to_dataframe('shoots')
+>>> grove.stats.to_dict()
+```
+"""
+from time import perf_counter
+
+from pandas import DataFrame
+from shootsandleaves.leaf import _LOOKUP_ERRORS, _split_selector
+
+
+def selector_string(selector):
+    r"""Return the dotted string form of a selector tuple."""
+    def field_string(field):
+        if not isinstance(field, slice):
+            return str(field)
+        return ':'.join('' if _ is None else str(_)
+                        for _ in (field.start, field.stop, field.step)
+                        ).rstrip(':') or ':'
+    return '.'.join(field_string(_) for _ in selector)
+
+
+class LeafStats(object):
+    r"""Counters for one Leaf.
+
+    `get_from` evaluates the Leaf as `Leaf.get_from` does, while
+    counting lookup errors swallowed and the sizes of the iterables that
+    slices fan out over.
+    """
+
+    def __init__(self, leaf):
+        r"""Construct zeroed counters for `leaf`."""
+        self.leaf = leaf
+        self._runs = _split_selector(leaf.selector)
+        self.reset()
+
+    def reset(self):
+        r"""Zero the counters."""
+        self.calls = 0
+        self.seconds = 0.0
+        self.last_seconds = 0.0
+        self.defaults = 0
+        self.errors = 0
+        self.fan_outs = 0
+        self.fan_out_items = 0
+        self.max_fan_out = 0
+
+    def _get(self, runs, obj):
+        r"""Return the value of the selector split into `runs` in obj."""
+        try:
+            for field in runs[0]:
+                obj = obj[field]
+        except _LOOKUP_ERRORS:
+            self.errors += 1
+            return self.leaf.default
+        if runs[0] and isinstance(runs[0][-1], slice):
+            # `obj` is the result of a slice, which only the final run
+            # may lack.
+            size = len(obj)
+            self.fan_outs += 1
+            self.fan_out_items += size
+            self.max_fan_out = max(self.max_fan_out, size)
+        if len(runs) == 1:
+            return obj
+        rest = runs[1:]
+        values = [self._get(rest, item) for item in obj]
+        return values if type(obj) is list else type(obj)(values)
+
+    def get_from(self, obj):
+        r"""Return `self.leaf.get_from(obj)`, updating the counters."""
+        start = perf_counter()
+        value = self._get(self._runs, obj)
+        self.last_seconds = perf_counter() - start
+        self.seconds += self.last_seconds
+        self.calls += 1
+        if value is self.leaf.default:
+            self.defaults += 1
+        return value
+
+    def to_dict(self):
+        r"""Return a dict of the counters."""
+        return {
+            'selector': selector_string(self.leaf.selector),
+            'calls': self.calls,
+            'seconds': self.seconds,
+            'defaults': self.defaults,
+            'errors': self.errors,
+            'fan_outs': self.fan_outs,
+            'fan_out_items': self.fan_out_items,
+            'max_fan_out': self.max_fan_out,
+        }
+
+
+class ShootStats(object):
+    r"""Counters for one Shoot.
+
+    `seconds` is the time spent evaluating the Shoot's leaves and
+    transforming their values. Leaves shared by several shoots count
+    towards each of them.
+    """
+
+    def __init__(self, shoot, leaf_stats):
+        r"""Construct zeroed counters for `shoot`."""
+        self.shoot = shoot
+        self.leaf_stats = leaf_stats
+        self.reset()
+
+    def reset(self):
+        r"""Zero the counters."""
+        self.calls = 0
+        self.seconds = 0.0
+        self.transform_seconds = 0.0
+        self.defaults = 0
+
+    def record(self, value, transform_seconds):
+        r"""Count one extraction of `value`."""
+        self.calls += 1
+        self.transform_seconds += transform_seconds
+        self.seconds += transform_seconds + sum(
+            _.last_seconds for _ in self.leaf_stats)
+        if value is self.shoot.default:
+            self.defaults += 1
+
+    def to_dict(self):
+        r"""Return a dict of the counters."""
+        return {
+            'calls': self.calls,
+            'seconds': self.seconds,
+            'transform_seconds': self.transform_seconds,
+            'defaults': self.defaults,
+        }
+
+
+class GroveStats(object):
+    r"""Counters for the Shoots and distinct Leaves of a Grove.
+
+    Only extraction in the current process is counted, so runs using
+    worker processes leave the counters at zero. Vectorized transforms
+    run once per column and are not timed.
+    """
+
+    def __init__(self, shoots, leaves, indexes):
+        r"""Construct zeroed counters.
+
+        `indexes` holds, for each shoot, the positions in `leaves` of
+        its leaves.
+        """
+        self.leaves = [LeafStats(leaf) for leaf in leaves]
+        self.shoots = [
+            ShootStats(shoot, [self.leaves[_] for _ in shoot_indexes])
+            for shoot, shoot_indexes in zip(shoots, indexes)
+        ]
+
+    def reset(self):
+        r"""Zero all counters."""
+        for stats in self.leaves + self.shoots:
+            stats.reset()
+
+    def to_dict(self):
+        r"""Return the counters of each shoot and leaf.
+
+        Shoots are keyed by column name, and leaves by their position
+        among the Grove's distinct leaves.
+        """
+        return {
+            'shoots': {
+                _.shoot.column_name: _.to_dict() for _ in self.shoots},
+            'leaves': {i: _.to_dict() for i, _ in enumerate(self.leaves)},
+        }
+
+    def to_dataframe(self, level='shoots'):
+        r"""Return a DataFrame of the counters of each shoot or leaf.
+
+        `level` is 'shoots' or 'leaves'.
+        """
+        if level not in ('shoots', 'leaves'):
+            raise ValueError("level must be 'shoots' or 'leaves'")
+        return DataFrame.from_dict(self.to_dict()[level], orient='index')
@@ -0,0 +1,83 @@
+r"""Tests for the GroveAccumulator class."""
+import numpy as np
+import pandas as pd
+from pytest import raises
+
+from shootsandleaves.accumulator import GroveAccumulator
+from shootsandleaves.grove import Grove
+from shootsandleaves.shoot import Shoot
+
+records = [
+    {'id': 1, 'amount': 1.5, 'status': 'new', 'name': 'a'},
+    {'id': 2, 'status': 'done'},
+    {'id': 3, 'amount': 2.5, 'status': 'new', 'name': 'c'},
+]
+
+
+def grove():
+    r"""Return a Grove of typed, categorical and object shoots."""
+    return Grove([
+        Shoot('id', dtype='int64'),
+        Shoot('amount', dtype='float64'),
+        Shoot('status', dtype='category'),
+        Shoot('name'),
+    ], index='id')
+
+
+def test_accumulator():
+    r"""Test that an accumulator matches iter_dataframes."""
+    accumulator = GroveAccumulator(grove(), capacity=1)
+    assert len(accumulator) == 0
+    assert accumulator.snapshot().empty
+
+    accumulator.add(records[0])
+    first = accumulator.snapshot()
+    accumulator.add_many(records[1:])
+    assert len(accumulator) == 3
+    assert len(first) == 1
+    assert first['amount'].tolist() == [1.5]
+
+    expected = next(grove().iter_dataframes(records, 3))
+    pd.testing.assert_frame_equal(accumulator.snapshot(), expected)
+    pd.testing.assert_frame_equal(accumulator.drain(), expected)
+    assert len(accumulator) == 0
+    assert accumulator.drain().empty
+
+    accumulator.add({'id': 4, 'status': 'late'})
+    df = accumulator.drain()
+    assert str(df['amount'].dtype) == 'float64'
+    assert df['status'].cat.categories.tolist() == ['done', 'late', 'new']
+
+
+def test_snapshot_is_a_view():
+    r"""Test that snapshots of typed columns share the buffers."""
+    accumulator = GroveAccumulator(Grove([Shoot('x', dtype='float64')]))
+    accumulator.add_many({'x': i} for i in range(10))
+    column = accumulator._columns[0]
+    snapshot = accumulator.snapshot()
+    assert np.shares_memory(snapshot['x'].to_numpy(), column._values)
+    accumulator.add({'x': 10})
+    assert len(snapshot) == 10
+    assert accumulator.drain()['x'].tolist() == list(range(11))
+    assert snapshot['x'].tolist() == list(range(10))
+
+
+def test_snapshot_is_read_only():
+    r"""Test that writing to a snapshot cannot change the accumulator."""
+    accumulator = GroveAccumulator(Grove([
+        Shoot('a', dtype='int64'), Shoot('x', dtype='float64'),
+        Shoot('s', dtype='category')]))
+    accumulator.add_many([{'a': 1, 's': 'p'}, {'a': 2, 'x': 2.5}])
+    snapshot = accumulator.snapshot()
+    assert snapshot['x'].isna().tolist() == [True, False]
+    for column, value in (('a', 99), ('x', 9.5)):
+        with raises(ValueError, match='read-only'):
+            snapshot.loc[1, column] = value
+    # Categorical codes are copied by pandas when written to.
+    snapshot.loc[1, 's'] = 'p'
+    accumulator.add({'a': 3})
+    for df in (accumulator.snapshot(), accumulator.drain()):
+        assert df['a'].tolist() == [1, 2, 3]
+        assert df['x'].tolist()[1] == 2.5
+        assert df['x'].isna().tolist() == [True, False, True]
+        assert df['s'].isna().tolist() == [False, True, True]
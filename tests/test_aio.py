@@ -0,0 +1,32 @@
+r"""Tests for async helpers."""
+import asyncio
+
+from shootsandleaves.aio import async_batches
+
+
+async def source(items, delays=None):
+    r"""Yield items, sleeping for the corresponding delay before each."""
+    for i, item in enumerate(items):
+        await asyncio.sleep(delays[i] if delays else 0)
+        yield item
+
+
+def collect(data, size, interval=None):
+    r"""Return the batches of `async_batches` as a list."""
+    async def run():
+        return [_ async for _ in async_batches(data, size, interval)]
+    return asyncio.run(run())
+
+
+def test_async_batches():
+    r"""Test batching by size."""
+    assert collect(source(range(5)), 2) == [[0, 1], [2, 3], [4]]
+    assert collect(source(range(4)), 2, interval=10) == [[0, 1], [2, 3]]
+    assert collect(source([]), 2) == []
+    assert collect(source([]), 2, interval=1) == []
+
+
+def test_async_batches_interval():
+    r"""Test that batches are yielded while waiting for a slow source."""
+    data = source(range(4), delays=[0, 0, 0.3, 0])
+    assert collect(data, 10, interval=0.1) == [[0, 1], [2, 3]]
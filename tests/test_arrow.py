@@ -0,0 +1,120 @@
+r"""Tests for Arrow output."""
+from pytest import importorskip, raises
+
+from shootsandleaves.grove import Grove
+from shootsandleaves.shoot import Shoot
+
+pyarrow = importorskip('pyarrow')
+
+from shootsandleaves.arrow import arrow_type  # noqa: E402
+
+records = [
+    {'id': 1, 'name': 'a', 'items': [{'sku': 'x'}, {'sku': 'y'}],
+     'user': {'id': 5, 'email': 'e'}, 'score': 1.5},
+    {'id': 2, 'items': [], 'user': {'id': 6}},
+    {'id': 3, 'name': 'c', 'score': float('nan')},
+]
+
+
+def test_arrow_type():
+    r"""Test that dtypes map to Arrow types."""
+    assert arrow_type(None) is None
+    assert arrow_type(object) is None
+    assert arrow_type('int32') == pyarrow.int32()
+    assert arrow_type('Int64') == pyarrow.int64()
+    assert arrow_type('boolean') == pyarrow.bool_()
+    assert arrow_type('string') == pyarrow.string()
+    assert arrow_type('datetime64[ns]') == pyarrow.timestamp('ns')
+    assert arrow_type(pyarrow.float32()) == pyarrow.float32()
+    assert pyarrow.types.is_dictionary(arrow_type('category'))
+
+
+def test_to_arrow():
+    r"""Test that values are converted to native Arrow types."""
+    grove = Grove([
+        Shoot('id', dtype='int32'),
+        Shoot('name'),
+        Shoot('skus', 'items.:.sku'),
+        Shoot('user'),
+        Shoot('score', dtype='float64'),
+        Shoot('double', 'id', vectorized_transform=lambda x: x * 2),
+    ])
+    table = grove.to_arrow(records)
+    assert table.num_rows == 3
+    assert table.schema.field('id').type == pyarrow.int32()
+    assert table.schema.field('name').type == pyarrow.string()
+    assert table.schema.field('skus').type == pyarrow.list_(pyarrow.string())
+    assert pyarrow.types.is_struct(table.schema.field('user').type)
+    assert table.column('skus').to_pylist() == [['x', 'y'], [], None]
+    assert table.column('user').to_pylist()[1] == {'id': 6, 'email': None}
+    assert table.column('score').to_pylist() == [1.5, None, None]
+    assert table.column('double').to_pylist() == [2, 4, 6]
+
+    empty = grove.to_arrow([])
+    assert empty.num_rows == 0
+    assert empty.schema.names == table.schema.names
+
+
+def test_iter_record_batches():
+    r"""Test that every batch has the schema of the first."""
+    grove = Grove([Shoot('id'), Shoot('score')])
+    batches = list(grove.iter_record_batches(records, batch_size=2))
+    assert [_.num_rows for _ in batches] == [2, 1]
+    assert batches[1].schema == batches[0].schema
+    assert pyarrow.Table.from_batches(batches).column('id').to_pylist() == [
+        1, 2, 3]
+
+    with raises(ValueError):
+        list(grove.iter_record_batches(records, batch_size=0))
+    grove = Grove([Shoot('name')])
+    data = [{'name': 1}, {'name': 'a'}]
+    with raises(ValueError, match="'name'"):
+        list(grove.iter_record_batches(data, batch_size=1))
+
+
+def test_null_first_batch():
+    r"""Test that columns of only missing values take later types."""
+    grove = Grove([Shoot('a'), Shoot('b')])
+    data = [{'a': None}, {'a': 'x'}, {}]
+    batches = list(grove.iter_record_batches(data, batch_size=1))
+    assert [str(_.schema.field('a').type) for _ in batches] == [
+        'null', 'string', 'string']
+    table = grove.to_arrow(data, batch_size=1)
+    assert str(table.schema.field('a').type) == 'string'
+    assert str(table.schema.field('b').type) == 'null'
+    assert table.column('a').to_pylist() == [None, 'x', None]
+
+
+def test_batches_widen():
+    r"""Test that later batches widen the types rather than losing values."""
+    grove = Grove([Shoot('c'), Shoot('n')])
+    data = [{'c': {'x': 1}, 'n': 1}, {'c': {'x': 2, 'y': 'z'}, 'n': 2.5}]
+    batches = list(grove.iter_record_batches(data, batch_size=1))
+    assert str(batches[1].schema.field('c').type) == (
+        'struct<x: int64, y: string>')
+    table = grove.to_arrow(data, batch_size=1)
+    assert table.column('c').to_pylist() == [
+        {'x': 1, 'y': None}, {'x': 2, 'y': 'z'}]
+    assert table.column('n').to_pylist() == [1.0, 2.5]
+
+    grove = Grove([Shoot('c', 'c.:')])
+    table = grove.to_arrow([{'c': [{'x': 1}]}, {'c': [{'y': 2}]}],
+                           batch_size=1)
+    assert table.column('c').to_pylist() == [
+        [{'x': 1, 'y': None}], [{'x': None, 'y': 2}]]
+
+
+def test_typed_conversions():
+    r"""Test that typed shoots convert values as for DataFrames."""
+    grove = Grove([Shoot('t', dtype='datetime64[ns]'),
+                   Shoot('i', dtype='int64')])
+    data = [{'t': '2020-01-01', 'i': 2.0}, {'t': None}]
+    table = grove.to_arrow(data)
+    assert table.schema.field('t').type == pyarrow.timestamp('ns')
+    assert table.column('i').type == pyarrow.int64()
+    expected = grove.dataframe_from_iterator(data)
+    assert table.column('t').to_pylist()[0] == expected['t'][0]
+    assert table.column('t').to_pylist()[1] is None
+    assert table.column('i').to_pylist() == [2, None]
+    with raises(ValueError, match='coerce float'):
+        grove.to_arrow([{'i': 2.5}])
@@ -0,0 +1,103 @@
+r"""Tests for the Branch class.
+
+A Branch must always agree with evaluating each of its leaves
+separately, so most tests compare the two.
+"""
+from shootsandleaves.branch import Branch
+from shootsandleaves.leaf import _PROBE_CALLS, Leaf
+
+data = {
+    'payload': {
+        'order': {
+            'customer': {
+                'id': 7,
+                'name': 'Apple',
+            },
+            'items': [
+                {'sku': 'a', 'qty': 1, 'tags': ['x', 'y']},
+                {'sku': 'b'},
+                {'qty': 3, 'tags': []},
+            ],
+            'coords': (1, 2, 3),
+        },
+    },
+    'empty': None,
+}
+
+selectors = [
+    'payload.order.customer.id',
+    'payload.order.customer.name',
+    'payload.order.customer.missing',
+    'payload.order.items.:.sku',
+    'payload.order.items.:.qty',
+    'payload.order.items.:1.tags.:.upper',
+    'payload.order.items.:.tags.0',
+    'payload.order.items.1:',
+    'payload.order.items.-1.qty',
+    'payload.order.coords.:2',
+    'payload.order.coords.1:',
+    'payload.order.missing.:.x',
+    'empty.x',
+    'payload',
+    '',
+]
+
+
+def check(leaves, obj):
+    r"""Assert that a Branch agrees with its leaves on obj."""
+    expected = [leaf.get_from(obj) for leaf in leaves]
+    assert Branch(leaves).get_from(obj) == expected
+
+
+def test_agrees_with_leaves():
+    r"""Test a Branch of many overlapping selectors."""
+    leaves = [Leaf(_ or None, default=i) for i, _ in enumerate(selectors)]
+    for obj in (data, {}, None, [], data['payload']['order']):
+        check(leaves, obj)
+
+
+def test_adapted_lookups():
+    r"""Test that a Branch agrees with its leaves after adapting lookups."""
+    leaves = [Leaf(_ or None, default=i) for i, _ in enumerate(selectors)]
+    objs = (data, {}, None, [], data['payload']['order'])
+    branch = Branch(leaves)
+    for _ in range(_PROBE_CALLS):
+        branch.get_from(data)
+    # Fields that were always present are looked up by catching the
+    # exception of a missing one, and others by checking for them.
+    nodes = list(branch._root.walk())
+    assert not any(_.guarded for _ in nodes if _.calls and not _.misses)
+    assert all(_.guarded for _ in nodes if _.misses)
+    for obj in objs:
+        assert branch.get_from(obj) == [_.get_from(obj) for _ in leaves]
+
+    branch = Branch(leaves)
+    branch.probe([{'payload': {}}, {'empty': 1}])
+    assert all(_.guarded for _ in branch._root.walk())
+    for obj in objs:
+        assert branch.get_from(obj) == [_.get_from(obj) for _ in leaves]
+
+
+def test_defaults_are_preserved():
+    r"""Test that each leaf receives its own default object."""
+    defaults = [[], [], {}]
+    leaves = [
+        Leaf('a.b', default=defaults[0]),
+        Leaf('a.c', default=defaults[1]),
+        Leaf('a.:.d', default=defaults[2]),
+    ]
+    values = Branch(leaves).get_from({})
+    assert all(v is d for v, d in zip(values, defaults))
+
+    values = Branch(leaves).get_from({'a': [{}, {'d': 1}]})
+    assert values[2] == [defaults[2], 1]
+    assert values[2][0] is defaults[2]
+
+
+def test_duplicate_and_single_leaves():
+    r"""Test degenerate Branches."""
+    check([], data)
+    check([Leaf('payload.order.customer.id')], data)
+    check([Leaf('payload.order.customer.id')] * 2, data)
+    check([Leaf(slice(None)), Leaf([slice(1), 'sku'])],
+          data['payload']['order']['items'])
@@ -0,0 +1,73 @@
+r"""Tests for Grove code generation."""
+import pickle
+
+import pandas as pd
+from pytest import warns
+
+from shootsandleaves.grove import Grove
+from shootsandleaves.shoot import Shoot
+
+records = [
+    {'user': {'id': 1, 'name': 'a'}, 'items': [{'sku': 'x'}, {}],
+     'tags': ('t', 'u'), 7: 'seven'},
+    {'user': {'id': 2}, 'items': 5},
+    {'user': None},
+    [],
+]
+
+default = object()
+
+
+def shoots():
+    r"""Return shoots covering each kind of generated code."""
+    return [
+        Shoot('id', 'user.id', dtype='int64'),
+        Shoot('name', 'user.name', transform=str.upper, default=''),
+        Shoot('missing', 'user.name', transform=str.upper, default=default),
+        Shoot('skus', 'items.:.sku'),
+        Shoot('items', 'items.:'),
+        Shoot('tags', 'tags.1:'),
+        Shoot('pair', ['user.id', 'user.name']),
+        Shoot('joined', ['user.id', 'user.name'], transform=str),
+        Shoot('seven', leaves=[(7,)]),
+        Shoot('double', 'user.id', vectorized_transform=lambda x: x * 2),
+    ]
+
+
+def test_compiled():
+    r"""Test that a compiled Grove extracts what an interpreted one does."""
+    compiled = Grove(shoots(), compiled=True)
+    assert 'def fill(data, appends):' in compiled.source
+    assert Grove(shoots()).source is None
+    pd.testing.assert_frame_equal(
+        compiled.dataframe_from_iterator(records),
+        Grove(shoots()).dataframe_from_iterator(records))
+    assert Grove([], compiled=True).dataframe_from_iterator(records).empty
+
+    loaded = pickle.loads(pickle.dumps(Grove([Shoot('id', 'user.id')],
+                                             compiled=True)))
+    assert loaded.source is not None
+    assert loaded.dataframe_from_iterator(records)['id'].tolist()[:2] == [
+        1, 2]
+
+    # The function is generated again for the lookups the Branch chose.
+    grove = Grove([Shoot('a', 'a'), Shoot('b', 'x.b'), Shoot('c', 'c')],
+                  compiled=True)
+    objs = [{'a': 1, 'x': {}}, {'a': 2, 'x': {'b': 3}}, {'a': 3, 'c': 4}]
+    for _ in range(2):
+        df = grove.dataframe_from_iterator(objs)
+        assert df.fillna(0).values.tolist() == [
+            [1, 0, 0], [2, 3, 0], [3, 0, 4]]
+    assert "n1 = obj['a']" in grove.source
+    assert "n3 = obj.get('c', MISSING)" in grove.source
+
+def test_fallback():
+    r"""Test that a Grove too deep to compile falls back."""
+    selectors = ['.'.join(['a'] * depth + ['b']) for depth in range(120)]
+    grove_shoots = [Shoot(str(i), _) for i, _ in enumerate(selectors)]
+    with warns(RuntimeWarning):
+        grove = Grove(grove_shoots, compiled=True)
+    assert grove.source is None
+    obj = {'a': {'a': {'b': 2}, 'b': 1}, 'b': 0}
+    df = grove.dataframe_from_iterator([obj])
+    assert df.iloc[0].tolist()[:3] == [0, 1, 2]
@@ -0,0 +1,196 @@
+r"""Tests for column buffers."""
+import numpy as np
+import pandas as pd
+from pandas import CategoricalDtype
+from pytest import raises
+
+from shootsandleaves.column import (CategoryColumn, ObjectColumn,
+                                    TypedColumn, WideningColumn, make_column,
+                                    typed_dtype)
+
+
+def test_make_column():
+    r"""Test that only numpy-representable dtypes are buffered."""
+    assert isinstance(make_column(), ObjectColumn)
+    assert isinstance(make_column('category'), CategoryColumn)
+    assert isinstance(make_column('Int64'), ObjectColumn)
+    assert isinstance(make_column(str), ObjectColumn)
+    assert isinstance(make_column('float64'), TypedColumn)
+    assert typed_dtype(int) == np.dtype(int)
+    assert typed_dtype('timedelta64[s]').kind == 'm'
+
+
+def test_growth_and_missing_values():
+    r"""Test that buffers grow and record missing values."""
+    column = TypedColumn('float64', capacity=1)
+    for value in (1, None, '2.5', float('nan'), np.nan):
+        column.append(value)
+    assert len(column) == 5
+    series = column.to_series(name='x')
+    assert series.name == 'x'
+    assert series.isna().tolist() == [False, True, False, True, True]
+    assert series.iloc[2] == 2.5
+    assert len(column) == 0
+
+    column = TypedColumn('timedelta64[s]')
+    column.append(None)
+    column.append(np.timedelta64(3, 's'))
+    assert column.to_series().isna().tolist() == [True, False]
+
+
+def test_nullable_integers():
+    r"""Test that integer columns with missing values are nullable."""
+    column = make_column('int32', capacity=2)
+    for value in (1, None, 3):
+        column.append(value)
+    series = column.to_series()
+    assert str(series.dtype) == 'Int32'
+    assert series.tolist()[::2] == [1, 3]
+    assert series.isna().tolist() == [False, True, False]
+
+
+def test_arrays():
+    r"""Test that arrays are views of the values appended and their mask."""
+    column = make_column('int32', capacity=4)
+    for value in (1, None, 3):
+        column.append(value)
+    values, mask = column.arrays()
+    assert len(values) == 3 and values.base is not None
+    assert mask.tolist() == [False, True, False]
+    column = make_column('category')
+    for value in ('a', None, 'a'):
+        column.append(value)
+    codes, mask = column.arrays()
+    assert codes.tolist() == [0, -1, 0] and not mask.any()
+
+
+def test_unconvertible_values():
+    r"""Test that values that cannot be converted raise errors."""
+    column = make_column('int64')
+    with raises(ValueError):
+        column.append('not a number')
+    with raises(TypeError):
+        column.append({})
+
+
+def test_lossy_integers():
+    r"""Test that floats are only stored in integer columns if integral."""
+    column = make_column('int64')
+    column.append(2.0)
+    column.append(float('nan'))
+    with raises(ValueError, match='coerce float values to integers'):
+        column.append(2.5)
+    with raises(ValueError, match='coerce float values to integers'):
+        column.extend([1, 2.5])
+    column.extend([3.0, 4])
+    assert column.to_series().tolist() == [2, pd.NA, 3, 4]
+    with raises(OverflowError):
+        make_column('int8').extend([1.0, 300.0])
+
+
+def test_datetimes():
+    r"""Test that datetimes are parsed by pandas, without timezones."""
+    column = make_column('datetime64[ns]')
+    column.extend(['01/02/2018', None, pd.Timestamp('2018-01-03')])
+    assert column.to_series().tolist() == [
+        pd.Timestamp('2018-01-02'), pd.NaT, pd.Timestamp('2018-01-03')]
+
+    # Strings are parsed together when the column is read or extended.
+    column = make_column('datetime64[ns]')
+    column.append('2018-01-02')
+    column.append('2018-01-02T03:45:00Z')
+    with raises(ValueError, match='timezone'):
+        column.to_series()
+    column = make_column('datetime64[ns]')
+    column.extend(['2018-01-02', '01/03/2018 12:00', None])
+    with raises(ValueError, match='not a datetime'):
+        column.extend(['2018-01-04', ''])
+    column.append('2018-01-05')
+    assert column.view().tolist() == [
+        pd.Timestamp('2018-01-02'), pd.Timestamp('2018-01-03 12:00'),
+        pd.NaT, pd.Timestamp('2018-01-05')]
+
+
+def test_category_column():
+    r"""Test that values are dictionary-encoded, with sorted categories."""
+    codes = {}
+    column = CategoryColumn('category', capacity=1, codes=codes)
+    for value in ('b', 'a', None, 'b', float('nan')):
+        column.append(value)
+    series = column.to_series(name='x')
+    assert series.name == 'x'
+    assert series.cat.categories.tolist() == ['a', 'b']
+    assert series.cat.codes.tolist() == [1, 0, -1, 1, -1]
+    assert len(column) == 0
+
+    # A shared dictionary carries the categories between columns.
+    column = CategoryColumn('category', codes=codes)
+    for value in ('c', 'a'):
+        column.append(value)
+    series = column.to_series()
+    assert series.cat.categories.tolist() == ['a', 'b', 'c']
+    assert series.cat.codes.tolist() == [2, 0]
+    assert codes == {'b': 0, 'a': 1, 'c': 2}
+
+    # Categories that cannot be sorted are kept in first-seen order.
+    column = make_column('category')
+    for value in ('b', 1, 'a'):
+        column.append(value)
+    expected = pd.Series(['b', 1, 'a']).astype('category')
+    assert column.to_series().cat.categories.tolist() == (
+        expected.cat.categories.tolist())
+
+    column = make_column(CategoricalDtype(['x', 'y'], ordered=True))
+    for value in ('y', 'z', 'x'):
+        column.append(value)
+    series = column.to_series()
+    assert series.dtype == CategoricalDtype(['x', 'y'], ordered=True)
+    assert series.cat.codes.tolist() == [1, -1, 0]
+
+
+def test_widening_column():
+    r"""Test that inferred columns widen to fit other values."""
+    column = WideningColumn('int64', capacity=1)
+    for value in (1, None, float('nan'), 2):
+        column.append(value)
+    assert column.dtype == 'int64'
+    column.append(2.5)
+    assert column.dtype == 'float64'
+    column.append('x')
+    assert column.dtype == 'object'
+    series = column.to_series()
+    assert series.tolist()[3:] == [2.0, 2.5, 'x']
+    assert series.isna().tolist() == [False, True, True, False, False, False]
+
+    column = WideningColumn('int64')
+    column.append(1)
+    column.append(2 ** 70)
+    assert column.to_series().tolist() == [1, 2 ** 70]
+
+    column = WideningColumn('category')
+    column.append('a')
+    column.append(['b'])
+    assert column.to_series().tolist() == ['a', ['b']]
+
+    column = WideningColumn('bool')
+    column.append(True)
+    column.append(None)
+    assert str(column.to_series().dtype) == 'boolean'
+
+
+def test_extend():
+    r"""Test that extending a column matches appending to it."""
+    for dtype in ('int64', 'float64', 'bool', 'datetime64[ns]', 'category',
+                  None):
+        for values in ([1, 0, 2], [1, None, 0], [True, 'x', None]):
+            appended = make_column(dtype, capacity=1)
+            extended = make_column(dtype, capacity=1)
+            try:
+                for value in values:
+                    appended.append(value)
+            except (TypeError, ValueError):
+                continue
+            extended.extend(values)
+            assert len(extended) == len(values)
+            expected = appended.to_series()
+            pd.testing.assert_series_equal(extended.to_series(), expected)
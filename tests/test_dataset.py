@@ -0,0 +1,133 @@
+r"""Tests for writing Parquet datasets."""
+import gzip
+import json
+import os
+
+from pytest import importorskip, raises
+
+from shootsandleaves.grove import Grove
+from shootsandleaves.shoot import Shoot
+
+importorskip('pyarrow')
+parquet = importorskip('pyarrow.parquet')
+
+from shootsandleaves.dataset import MANIFEST, read_manifest  # noqa: E402
+
+grove = Grove([
+    Shoot('id', dtype='int64'),
+    Shoot('day', 'meta.day'),
+    Shoot('name'),
+])
+
+
+def write_shards(directory, count=3, size=5):
+    r"""Write `count` NDJSON shards of `size` records, the last gzipped."""
+    paths = []
+    for shard in range(count):
+        path = os.path.join(directory, f'part{shard}.ndjson')
+        if shard == count - 1:
+            path += '.gz'
+        lines = ''.join(
+            json.dumps({'id': shard * size + i,
+                        'meta': {'day': ['mon', 'tue', None][i % 3]},
+                        'name': f'n{i}'}) + '\n'
+            for i in range(size))
+        with (gzip.open if path.endswith('.gz') else open)(path, 'wt') as f:
+            f.write(lines)
+        paths.append(path)
+    return paths
+
+
+def read_ids(out_dir):
+    r"""Return the ids and days of a dataset, sorted by id."""
+    table = parquet.read_table(out_dir, partitioning='hive')
+    rows = sorted(zip(table.column('id').to_pylist(),
+                      table.column('day').to_pylist()))
+    return rows
+
+
+expected = [(i, ['mon', 'tue', None][i % 5 % 3]) for i in range(15)]
+
+
+def test_write_dataset(tmp_path):
+    r"""Test that shards are written to partitions, in row groups."""
+    write_shards(tmp_path)
+    out_dir = tmp_path / 'out'
+    entries = grove.write_dataset(str(tmp_path / 'part*'), str(out_dir),
+                                  partition_by=['day'], row_group_size=2)
+    assert len(entries) == 3
+    assert sum(entry['rows'] for entry in entries) == 15
+    assert sorted(os.listdir(out_dir)) == [
+        MANIFEST, 'day=__HIVE_DEFAULT_PARTITION__', 'day=mon', 'day=tue']
+    assert read_ids(out_dir) == expected
+    # Records 0 and 3 of a shard are in the 'mon' partition, and in
+    # different row groups.
+    path = out_dir / entries[0]['files'][1]
+    assert path.parent.name == 'day=mon'
+    metadata = parquet.ParquetFile(path).metadata
+    assert metadata.num_row_groups > 1
+    assert metadata.schema.names == ['id', 'name']
+
+
+def test_write_dataset_workers(tmp_path):
+    r"""Test that worker processes write the same dataset."""
+    paths = write_shards(tmp_path)
+    grove.write_dataset(paths, str(tmp_path / 'a'), partition_by=['day'])
+    grove.write_dataset(paths, str(tmp_path / 'b'), partition_by=['day'],
+                        workers=2)
+    assert read_ids(tmp_path / 'a') == read_ids(tmp_path / 'b')
+    assert read_manifest(tmp_path / 'a') == read_manifest(tmp_path / 'b')
+
+
+def test_write_dataset_resume(tmp_path):
+    r"""Test that shards recorded in the manifest are not written again."""
+    paths = write_shards(tmp_path)
+    out_dir = tmp_path / 'out'
+    first, = grove.write_dataset(paths[:1], str(out_dir))
+    written = out_dir / first['files'][0]
+    mtime = os.stat(written).st_mtime_ns
+    entries = grove.write_dataset(paths, str(out_dir))
+    assert [entry['shard'] for entry in entries] == paths
+    assert os.stat(written).st_mtime_ns == mtime
+    assert read_ids(out_dir) == expected
+
+
+def test_write_dataset_null_columns(tmp_path):
+    r"""Test that every file has the dataset's types, though some null."""
+    shards = [[{'id': 0}, {'id': 1, 'name': 'b', 'score': 1}],
+              [{'id': 2, 'score': 2.5}]]
+    paths = []
+    for i, records in enumerate(shards):
+        paths.append(str(tmp_path / f'part{i}.ndjson'))
+        with open(paths[-1], 'w') as f:
+            f.writelines(json.dumps(_) + '\n' for _ in records)
+    out_dir = tmp_path / 'out'
+    grove = Grove([Shoot('id'), Shoot('name'), Shoot('score')])
+    entries = grove.write_dataset(paths, str(out_dir), row_group_size=1)
+    for entry in entries:
+        schema = parquet.read_schema(out_dir / entry['files'][0])
+        assert [str(_.type) for _ in schema] == ['int64', 'string', 'double']
+    table = parquet.read_table(out_dir / entries[0]['files'][0])
+    assert table.column('name').to_pylist() == [None, 'b']
+    assert parquet.ParquetFile(
+        out_dir / entries[0]['files'][0]).metadata.num_row_groups == 2
+
+    # Fields of later dicts are kept, rewriting the file written so far.
+    structs = tmp_path / 'structs.ndjson'
+    structs.write_text(json.dumps({'c': {'x': 1}}) + '\n'
+                       + json.dumps({'c': {'x': 2, 'y': 'z'}}) + '\n')
+    entry, = Grove([Shoot('c')]).write_dataset(
+        [str(structs)], str(tmp_path / 's'), row_group_size=1)
+    table = parquet.read_table(tmp_path / 's' / entry['files'][0])
+    assert table.column('c').to_pylist()[1] == {'x': 2, 'y': 'z'}
+
+    strings = tmp_path / 'strings.ndjson'
+    strings.write_text(json.dumps({'id': 3, 'score': 'high'}) + '\n')
+    with raises(ValueError, match='incompatible types'):
+        grove.write_dataset([paths[1], str(strings)], str(tmp_path / 'x'))
+
+
+def test_write_dataset_errors(tmp_path):
+    r"""Test that unknown partition columns are rejected."""
+    with raises(ValueError, match='unknown columns'):
+        grove.write_dataset([], str(tmp_path), partition_by=['missing'])
@@ -0,0 +1,90 @@
+r"""Tests for the Forest class."""
+from pandas.testing import assert_frame_equal
+from pytest import raises
+
+from shootsandleaves.forest import Forest
+from shootsandleaves.grove import Grove
+from shootsandleaves.shoot import Shoot
+
+records = [
+    {'id': 1, 'total': 3.5, 'customer': {'id': 7, 'email': 'a@x'},
+     'items': [{'sku': 'a', 'quantity': 1}, {'sku': 'b', 'quantity': 2}]},
+    {'id': 2, 'total': 1.0, 'customer': {'id': 8}, 'items': []},
+    {'id': 3, 'customer': {'id': 7, 'email': 'a@x'},
+     'items': [{'sku': 'c'}]},
+]
+
+
+def groves():
+    r"""Return a dict of Groves of orders, their items and customers."""
+    return {
+        'orders': Grove([
+            Shoot('id', dtype='int64'),
+            Shoot('total', dtype='float64'),
+            Shoot('customer_id', 'customer.id'),
+        ], index='id'),
+        'order_items': Grove([
+            Shoot('order_id', 'id', dtype='int64'),
+            Shoot('sku', 'items.:.sku'),
+            Shoot('quantity', 'items.:.quantity', dtype='float64'),
+        ]),
+        'customers': Grove([
+            Shoot('id', 'customer.id', dtype='int64'),
+            Shoot('email', 'customer.email'),
+        ]),
+    }
+
+
+class CountingDict(dict):
+    r"""A dict counting the lookups of each key."""
+
+    lookups = {}
+
+    def __getitem__(self, key):
+        CountingDict.lookups[key] = CountingDict.lookups.get(key, 0) + 1
+        return super().__getitem__(key)
+
+
+def test_forest():
+    r"""Test that each Grove's DataFrame is extracted in one pass."""
+    forest = Forest(groves(), explode=['order_items'])
+    frames = forest.dataframes_from_iterator(iter(records))
+    assert list(frames) == ['orders', 'order_items', 'customers']
+    for name in ('orders', 'customers'):
+        assert_frame_equal(
+            frames[name], groves()[name].dataframe_from_iterator(records))
+    items = frames['order_items']
+    assert items['order_id'].tolist() == [1, 1, 3]
+    assert items['sku'].tolist() == ['a', 'b', 'c']
+    assert items['quantity'].tolist()[:2] == [1.0, 2.0]
+    assert items['quantity'].isna().tolist() == [False, False, True]
+    # Leaves shared between the Groves are evaluated once.
+    assert len(forest._branch.leaves) == 6
+
+
+def test_forest_walks_shared_prefixes_once():
+    r"""Test that each record's shared prefixes are looked up once."""
+    data = [CountingDict(customer=CountingDict(id=1, email='e'), id=1)]
+    CountingDict.lookups = {}
+    Forest(groves()).dataframes_from_iterator(data)
+    assert CountingDict.lookups['customer'] == 1
+    assert CountingDict.lookups['id'] == 2
+
+
+def test_forest_errors():
+    r"""Test that Groves that cannot be exploded are rejected."""
+    with raises(ValueError, match='unknown'):
+        Forest(groves(), explode=['missing'])
+    with raises(ValueError, match="'orders' cannot be exploded"):
+        Forest(groves(), explode=['orders'])
+    grove = Grove([Shoot('skus', 'items.:.sku', transform=len)])
+    with raises(ValueError, match="'skus'"):
+        Forest({'skus': grove}, explode=['skus'])
+    grove = Grove([Shoot('skus', 'items.:.sku'), Shoot('tags', 'tags.:')])
+    with raises(ValueError, match='exactly one slice'):
+        Forest({'skus': grove}, explode=['skus'])
+    grove = Grove([Shoot('skus', 'items.:.sku'),
+                   Shoot('kinds', 'items.:.kind', default=['none'])])
+    forest = Forest({'items': grove}, explode=['items'])
+    with raises(ValueError, match="'kinds' of 'items' has 1 items"):
+        forest.dataframes_from_iterator([{}])
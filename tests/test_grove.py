@@ -0,0 +1,424 @@
+r"""Tests for the Grove class."""
+import asyncio
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from pytest import raises
+
+from shootsandleaves.grove import Grove, dataframe_from_iterator
+from shootsandleaves.shoot import Shoot
+
+records = [
+    {
+        'user': {'id': 1, 'name': 'apple'},
+        'payment': {'amount': 1.5},
+        'items': [{'sku': 'a'}, {'sku': 'b'}],
+    },
+    {
+        'user': {'id': 2},
+        'payment': {'amount': 20.0},
+        'items': [],
+    },
+    {
+        'user': {'id': 3, 'name': 'cherry'},
+    },
+]
+
+
+def shoots():
+    r"""Return a list of Shoots over `records`."""
+    return [
+        Shoot('id', 'user.id'),
+        Shoot('name', 'user.name', default='', transform=str.upper),
+        Shoot('amount', 'payment.amount', dtype='float64'),
+        Shoot('skus', 'items.:.sku'),
+        Shoot('label', ['user.id', 'user.name'],
+              transform=lambda args: f'{args[0]}:{args[1]}'),
+    ]
+
+
+def test_extract():
+    r"""Test that Grove.extract agrees with each Shoot."""
+    grove = Grove(shoots())
+    for obj in records:
+        assert grove.extract(obj) == {
+            shoot.column_name: shoot.extract(obj)
+            for shoot in grove.shoots
+        }
+
+
+def test_iter_rows():
+    r"""Test that Grove.iter_rows yields the values of extract in order."""
+    grove = Grove(shoots())
+    rows = list(grove.iter_rows(iter(records)))
+    assert rows == [tuple(grove.extract(obj).values()) for obj in records]
+    assert all(type(row) is tuple for row in rows)
+
+
+def test_dataframe_from_iterator():
+    r"""Test building a DataFrame from an iterator of records."""
+    df = dataframe_from_iterator(iter(records), shoots(), index='id')
+    assert list(df.index) == [1, 2, 3]
+    assert list(df.columns) == ['name', 'amount', 'skus', 'label']
+    assert list(df['name']) == ['APPLE', '', 'CHERRY']
+    assert str(df['amount'].dtype) == 'float64'
+    assert df['amount'].isna().tolist() == [False, False, True]
+    assert list(df['skus']) == [['a', 'b'], [], None]
+    assert list(df['label']) == ['1:apple', '2:None', '3:cherry']
+
+
+def test_shoots_must_be_shoots():
+    r"""Test that Groves are only constructed from Shoots."""
+    with raises(ValueError):
+        Grove(['id'])
+
+
+def test_typed_columns():
+    r"""Test columns built in typed buffers."""
+    data = [{'n': i, 'x': i / 2, 'b': i % 2 == 0} for i in range(3000)]
+    data.append({'t': '2018-01-02 03:45'})
+    grove = Grove([
+        Shoot('n', dtype='int64'),
+        Shoot('x', dtype='float32'),
+        Shoot('b', dtype='bool'),
+        Shoot('t', dtype='datetime64[ns]'),
+    ])
+    for expected_rows in (None, 1, len(data)):
+        df = grove.dataframe_from_iterator(
+            iter(data), expected_rows=expected_rows)
+        assert len(df) == len(data)
+        assert str(df['n'].dtype) == 'Int64'
+        assert df['n'].iloc[2999] == 2999
+        assert df['n'].isna().sum() == 1
+        assert str(df['x'].dtype) == 'float32'
+        assert df['x'].iloc[3] == 1.5
+        assert str(df['b'].dtype) == 'boolean'
+        assert str(df['t'].dtype) == 'datetime64[ns]'
+        assert df['t'].isna().sum() == 3000
+        assert str(df['t'].iloc[-1]) == '2018-01-02 03:45:00'
+
+    df = grove.dataframe_from_iterator(data[:-1])
+    assert str(df['n'].dtype) == 'int64'
+    assert str(df['b'].dtype) == 'bool'
+
+
+def test_iter_dataframes():
+    r"""Test that chunks agree with a single DataFrame."""
+    data = records * 3
+    grove = Grove(shoots(), index='id')
+    whole = grove.dataframe_from_iterator(data)
+    # Chunks of inferred integers are nullable, as for declared dtypes.
+    whole.index = whole.index.astype('Int64')
+    for chunksize in (1, 2, 4, len(data), 100):
+        chunks = list(grove.iter_dataframes(iter(data), chunksize))
+        assert len(chunks) == -(-len(data) // chunksize)
+        assert all(len(chunk) <= chunksize for chunk in chunks)
+        assert all((chunk.dtypes == chunks[0].dtypes).all()
+                   for chunk in chunks)
+        df = pd.concat(chunks)
+        assert df.index.tolist() == whole.index.tolist()
+        pd.testing.assert_frame_equal(df, whole)
+
+    assert list(grove.iter_dataframes([], 10)) == []
+    with raises(ValueError):
+        next(grove.iter_dataframes(data, 0))
+
+
+def test_iter_dataframes_dtypes():
+    r"""Test that chunk dtypes do not depend on the values in each chunk."""
+    data = [{'n': 1, 'x': 1}, {'x': 2}, {'x': 3}]
+    grove = Grove([Shoot('n', dtype='int64'), Shoot('x')])
+    chunks = list(grove.iter_dataframes(data, 1))
+    assert [str(_['n'].dtype) for _ in chunks] == ['Int64'] * 3
+    assert [_['n'].tolist() for _ in chunks] == [[1], [pd.NA], [pd.NA]]
+
+    # Inferred integers and bools are nullable from the first chunk, and
+    # later chunks are converted to the dtype of the first.
+    data = [{'x': 1, 'b': True}, {'x': None}, {'x': 3.0, 'b': False}]
+    chunks = list(Grove([Shoot('x'), Shoot('b')]).iter_dataframes(data, 1))
+    assert [str(_['x'].dtype) for _ in chunks] == ['Int64'] * 3
+    assert [str(_['b'].dtype) for _ in chunks] == ['boolean'] * 3
+    assert [_['x'].tolist() for _ in chunks] == [[1], [pd.NA], [3]]
+
+    # Chunks already yielded could not be widened to match a later one.
+    chunks = grove.iter_dataframes([{'x': 1}, {'x': 2.5}], 1)
+    assert str(next(chunks)['x'].dtype) == 'Int64'
+    with raises(ValueError, match='infer_dtypes'):
+        next(chunks)
+    with raises(ValueError):
+        list(grove.iter_dataframes([{'x': 1}, {'x': 'a'}], 1))
+    with raises(ValueError, match='losing data'):
+        list(grove.iter_dataframes([{'x': 0.5}, {'x': 2 ** 53 + 1}], 1))
+
+
+def test_pickle():
+    r"""Test that a Grove survives pickling."""
+    grove = Grove([Shoot('id', 'user.id', transform=str, dtype='object'),
+                   Shoot('skus', 'items.:.sku', default=[])], index='id')
+    loaded = pickle.loads(pickle.dumps(grove))
+    assert loaded.index == 'id'
+    for obj in records:
+        assert loaded.extract(obj) == grove.extract(obj)
+
+
+def test_parallel():
+    r"""Test extraction in worker processes."""
+    data = records * 5
+    grove = Grove([
+        Shoot('id', 'user.id', dtype='int64'),
+        Shoot('name', 'user.name', default='', transform=str.upper),
+        Shoot('amount', 'payment.amount', dtype='float64'),
+        Shoot('skus', 'items.:.sku'),
+    ], index='name')
+    expected = pd.concat(grove.iter_dataframes(data, 2))
+    for batch_size in (1, 4, 100):
+        df = grove.dataframe_from_iterator(
+            iter(data), workers=2, batch_size=batch_size)
+        pd.testing.assert_frame_equal(df, expected)
+    df = grove.dataframe_from_iterator([], workers=2)
+    assert df.empty and list(df.columns) == ['id', 'amount', 'skus']
+
+    grove = Grove([Shoot('id', 'user.id', transform=lambda x: x)])
+    with raises(ValueError, match="'id'"):
+        grove.dataframe_from_iterator(data, workers=2)
+
+
+def test_concat_widens(tmp_path):
+    r"""Test that chunks extracted separately are combined losslessly."""
+    data = [{'x': 1}, {'x': 2}, {'x': None}]
+    grove = Grove([Shoot('x')])
+    df = grove.dataframe_from_iterator(data, workers=2, batch_size=2)
+    assert str(df['x'].dtype) == 'Int64'
+    assert df['x'].tolist() == [1, 2, pd.NA]
+
+    path = tmp_path / 'data.ndjson'
+    path.write_text(''.join(json.dumps(_) + '\n' for _ in data))
+    df = grove.dataframe_from_ndjson(path, workers=2, chunk_bytes=8)
+    assert df['x'].tolist() == [1, 2, pd.NA]
+
+    async def source():
+        for obj in data:
+            yield obj
+    df = asyncio.run(grove.dataframe_from_async_iterator(source(), 2))
+    assert df['x'].tolist() == [1, 2, pd.NA]
+
+    df = grove.dataframe_from_iterator(
+        [{'x': 1}, {'x': 2.5}, {'x': 3}], workers=2, batch_size=1)
+    assert df['x'].tolist() == [1.0, 2.5, 3.0]
+    with raises(ValueError, match='losing data'):
+        grove.dataframe_from_iterator(
+            [{'x': 2 ** 53 + 1}, {'x': 0.5}], workers=2, batch_size=1)
+
+
+def test_result_type():
+    r"""Test the common dtypes of chunks, which pandas would give them."""
+    from shootsandleaves.grove import _result_type
+
+    expected = [
+        ('int64', 'float32', 'float64'), ('Int64', 'float64', 'Float64'),
+        ('Int8', 'uint8', 'Int16'), ('bool', 'boolean', 'boolean'),
+        ('bool', 'int64', 'object'), ('str', 'int64', 'object'),
+        ('datetime64[ns]', 'datetime64[us]', 'datetime64[ns]'),
+        ('datetime64[ns]', 'timedelta64[ns]', 'object'),
+        ('str', 'str', 'str'), ('object', 'Int64', 'object'),
+    ]
+    for dtype, other, common in expected:
+        assert str(_result_type(pd.api.types.pandas_dtype(dtype),
+                                pd.api.types.pandas_dtype(other))) == common
+
+
+def test_selectors():
+    r"""Test the distinct selectors of a Grove."""
+    assert Grove(shoots()).selectors == [
+        ('user', 'id'), ('user', 'name'), ('payment', 'amount'),
+        ('items', slice(None), 'sku')]
+
+
+def test_vectorized_transform():
+    r"""Test that vectorized transforms agree with scalar ones."""
+    def scalar():
+        return Grove([
+            Shoot('id', 'user.id', dtype='float64',
+                  transform=lambda x: x * 2),
+            Shoot('amount', 'payment.amount', default=-1.0,
+                  transform=lambda x: x * 100),
+            Shoot('total', ['user.id', 'payment.amount'], default=0,
+                  transform=sum),
+        ])
+
+    def vectorized():
+        return Grove([
+            Shoot('id', 'user.id', dtype='float64',
+                  vectorized_transform=lambda x: x * 2),
+            Shoot('amount', 'payment.amount', default=-1.0,
+                  vectorized_transform=lambda x: x * 100),
+            Shoot('total', ['user.id', 'payment.amount'], default=0,
+                  vectorized_transform=lambda args: args[0] + args[1]),
+        ])
+
+    pd.testing.assert_frame_equal(
+        vectorized().dataframe_from_iterator(records),
+        scalar().dataframe_from_iterator(records))
+    assert vectorized().extract(records[2]) == scalar().extract(records[2])
+    chunks = list(vectorized().iter_dataframes(records, 2))
+    assert pd.concat(chunks)['amount'].tolist() == [150.0, 2000.0, -1.0]
+
+
+def test_shared_leaves():
+    r"""Test that identical leaves are evaluated once."""
+    default = {}
+    grove = Grove([
+        Shoot('amount', 'payment.amount'),
+        Shoot('cents', 'payment.amount', transform=lambda x: int(x * 100)),
+        Shoot('pair', ['user.id', 'payment.amount']),
+        Shoot('swapped', ['payment.amount', 'user.id']),
+        Shoot('a', 'missing', default=default, transform=len),
+        Shoot('b', 'missing', default={}, transform=len),
+    ])
+    assert len(grove._branch.leaves) == 4
+    assert grove.extract(records[0]) == {
+        'amount': 1.5, 'cents': 150, 'pair': [1, 1.5], 'swapped': [1.5, 1],
+        'a': {}, 'b': {}}
+    assert grove.extract(records[2])['swapped'] == [None, 3]
+
+
+def test_exploded_dataframes():
+    r"""Test that list-valued shoots are exploded into child frames."""
+    orders = [
+        {'id': 7, 'items': [{'sku': 'a', 'qty': 1}, {'sku': 'b'}],
+         'tags': ['x']},
+        {'id': 8},
+        {'id': 9, 'items': [{'sku': 'c', 'qty': 3}], 'tags': []},
+    ]
+    grove = Grove([
+        Shoot('id', dtype='int64'),
+        Shoot('sku', 'items.:.sku'),
+        Shoot('qty', 'items.:.qty', dtype='float64'),
+        Shoot('count', 'items.:', transform=len, default=0),
+        Shoot('tag', 'tags.:'),
+    ], index='id')
+    parent, children = grove.exploded_dataframes(orders)
+    assert parent.columns.tolist() == ['count']
+    assert parent.index.tolist() == [7, 8, 9]
+    assert sorted(children) == ['items.:', 'tags.:']
+
+    items = children['items.:']
+    assert items.index.names == ['id', 'position']
+    assert items.index.tolist() == [(7, 0), (7, 1), (9, 0)]
+    assert items['sku'].tolist() == ['a', 'b', 'c']
+    assert items['qty'].dtype == 'float64'
+    assert items['qty'].isna().tolist() == [False, True, False]
+    assert children['tags.:']['tag'].tolist() == ['x']
+    assert items.loc[7]['sku'].tolist() == ['a', 'b']
+
+    parent, children = Grove([Shoot('sku', 'items.:.sku')]) \
+        .exploded_dataframes(orders)
+    assert parent.index.tolist() == [0, 1, 2]
+    assert children['items.:'].index.tolist() == [(0, 0), (0, 1), (2, 0)]
+
+    grove = Grove([Shoot('sku', 'items.:.sku'), Shoot('tag', 'tags.:'),
+                   Shoot('count', 'items.:', transform=len, default=0)])
+    parent, children = grove.exploded_dataframes(orders, explode=['tag'])
+    assert parent.columns.tolist() == ['sku', 'count']
+    assert list(children) == ['tags.:']
+    with raises(ValueError):
+        grove.exploded_dataframes(orders, explode=['count'])
+
+
+def test_categorical():
+    r"""Test that categorical shoots are dictionary-encoded."""
+    data = [{'s': 'new'}, {'s': 'done'}, {}, {'s': 'new'}, {'s': 'late'}]
+    grove = Grove([Shoot('s', dtype='category')])
+    df = grove.dataframe_from_iterator(data)
+    assert df['s'].dtype == 'category'
+    assert df['s'].cat.categories.tolist() == ['done', 'late', 'new']
+    assert df['s'].cat.codes.tolist() == [2, 0, -1, 2, 1]
+    expected = pd.Series([_.get('s') for _ in data]).astype('category')
+    assert df['s'].cat.categories.equals(expected.cat.categories)
+
+    chunks = list(grove.iter_dataframes(data, 2))
+    assert [_['s'].cat.categories.tolist() for _ in chunks] == [
+        ['done', 'new'], ['done', 'new'], ['done', 'late', 'new']]
+    assert pd.concat([_['s'].astype(object) for _ in chunks],
+                     ignore_index=True).equals(
+        df['s'].astype(object))
+
+    parallel = grove.dataframe_from_iterator(data, workers=2, batch_size=2)
+    assert parallel['s'].dtype == 'category'
+    assert parallel['s'].cat.categories.tolist() == ['done', 'late', 'new']
+    assert parallel['s'].astype(object).equals(df['s'].astype(object))
+
+
+def test_async():
+    r"""Test extraction from async iterators."""
+    async def source():
+        for obj in records * 3:
+            await asyncio.sleep(0)
+            yield obj
+
+    async def chunks(grove, **kwargs):
+        return [_ async for _ in grove.iter_dataframes_async(source(),
+                                                             **kwargs)]
+
+    grove = Grove(shoots(), index='id')
+    expected = list(grove.iter_dataframes(records * 3, 2))
+    with ThreadPoolExecutor(1) as executor:
+        for kwargs in ({}, {'executor': executor}, {'interval': 5}):
+            result = asyncio.run(chunks(grove, chunksize=2, **kwargs))
+            assert len(result) == len(expected)
+            for chunk, chunk_expected in zip(result, expected):
+                pd.testing.assert_frame_equal(chunk, chunk_expected)
+            pd.testing.assert_frame_equal(
+                asyncio.run(grove.dataframe_from_async_iterator(
+                    source(), chunksize=4,
+                    executor=kwargs.get('executor'))),
+                pd.concat(grove.iter_dataframes(records * 3, 4)))
+
+
+def test_infer_dtypes():
+    r"""Test that dtypes inferred from a sample are used and widened."""
+    data = [{'n': i, 'x': i, 's': 'ab'[i % 2], 'tags': ['t']}
+            for i in range(6)]
+    data.append({'n': 6, 'x': 6.5, 's': 'c'})
+    grove = Grove([Shoot('n'), Shoot('x'), Shoot('s'), Shoot('tags'),
+                   Shoot('m', dtype='float64')], infer_dtypes=4)
+    df = grove.dataframe_from_iterator(data)
+    assert grove.schema == {
+        'n': 'int64', 'x': 'int64', 's': 'category', 'tags': 'object'}
+    assert str(df['n'].dtype) == 'int64'
+    assert df['x'].tolist() == [0, 1, 2, 3, 4, 5, 6.5]
+    assert df['s'].tolist() == list('ababab') + ['c']
+    assert df['tags'].tolist()[-2:] == [['t'], None]
+
+    loaded = pickle.loads(pickle.dumps(grove))
+    assert loaded.schema == grove.schema
+    grove = Grove([Shoot('n')])
+    assert grove.infer_schema([]) == {}
+
+    # Streams cannot widen chunks already yielded, so a value that does
+    # not fit the sample raises, and a larger sample avoids that.
+    data = [{'a': 1}, {'a': 2}, {'a': 2.5}]
+    chunks = Grove([Shoot('a')], infer_dtypes=2).iter_dataframes(data, 2)
+    assert str(next(chunks)['a'].dtype) == 'Int64'
+    with raises(ValueError, match='infer_dtypes'):
+        next(chunks)
+    grove = Grove([Shoot('a')], infer_dtypes=3)
+    chunks = list(grove.iter_dataframes(data, 2))
+    assert [str(_['a'].dtype) for _ in chunks] == ['float64'] * 2
+    assert pd.concat(chunks)['a'].tolist() == [1, 2, 2.5]
+
+
+def test_extract_many():
+    r"""Test that column-major extraction matches row-major extraction."""
+    grove = Grove(shoots() + [
+        Shoot('cents', 'payment.amount', default=-1,
+              vectorized_transform=lambda x: x * 100),
+        Shoot('flag', 'user.id', dtype='bool',
+              transform=lambda x: x > 1),
+    ], index='id')
+    pd.testing.assert_frame_equal(grove.extract_many(records),
+                                  grove.dataframe_from_iterator(records))
+    pd.testing.assert_frame_equal(grove.extract_many(iter(records)),
+                                  grove.dataframe_from_iterator(records))
@@ -0,0 +1,117 @@
+r"""Tests for reading JSON records from files."""
+import gzip
+import json
+
+import pandas as pd
+from pytest import raises
+
+from shootsandleaves.grove import Grove
+from shootsandleaves.ingest import (iter_json_array, iter_ndjson,
+                                    ndjson_tasks, read_task)
+from shootsandleaves.shoot import Shoot
+
+records = [{'id': i, 'user': {'name': f'user{i}'}, 'tags': ['a'] * (i % 3)}
+           for i in range(50)]
+
+
+def write_ndjson(path, objs, opener=open):
+    r"""Write `objs` to `path` as NDJSON, with a blank line in the middle."""
+    lines = [json.dumps(obj) for obj in objs]
+    lines.insert(len(lines) // 2, '')
+    with opener(path, 'wt') as f:
+        f.write('\n'.join(lines))
+    return path
+
+
+def grove():
+    r"""Return a Grove over `records`."""
+    return Grove([
+        Shoot('id', dtype='int64'),
+        Shoot('name', 'user.name'),
+        Shoot('tags', 'tags.:'),
+    ], index='id')
+
+
+def test_iter_ndjson(tmp_path):
+    r"""Test that every record is read, in order, whatever the chunking."""
+    plain = write_ndjson(tmp_path / 'a.ndjson', records[:30])
+    gz = write_ndjson(str(tmp_path / 'b.ndjson.gz'), records[30:], gzip.open)
+    empty = write_ndjson(tmp_path / 'c.ndjson', [])
+    for chunk_bytes in (1, 7, 100, 1 << 20):
+        assert list(iter_ndjson([plain, empty, gz], chunk_bytes)) == records
+        tasks = list(ndjson_tasks(plain, chunk_bytes))
+        assert [obj for task in tasks for obj in read_task(task)] == \
+            records[:30]
+    assert len(list(ndjson_tasks(plain, 1))) == 31
+    with raises(ValueError):
+        list(ndjson_tasks(plain, 0))
+
+
+def test_iter_json_array(tmp_path):
+    r"""Test reading the items of a JSON array."""
+    path = tmp_path / 'a.json'
+    path.write_text(json.dumps(records, indent=2))
+    assert list(iter_json_array(path)) == records
+
+    path = str(tmp_path / 'a.json.gz')
+    with gzip.open(path, 'wt') as f:
+        f.write(json.dumps(records))
+    assert list(iter_json_array(path)) == records
+
+    for text, expected in ((' [ ] ', []), ('[1,"a" , {}]', [1, 'a', {}])):
+        path = tmp_path / 'b.json'
+        path.write_text(text)
+        assert list(iter_json_array(path)) == expected
+    for text in ('{}', '[1 2]', '[1, {"a": 2]', '[1, 2'):
+        path.write_text(text)
+        with raises(ValueError):
+            list(iter_json_array(path, chunk_bytes=2))
+
+    # Values, including numbers and multibyte characters, may span the
+    # chunks in which the file is read.
+    items = [12345, 'é€😀', {'a': [1.5, None, True]}, -0.25e-3, 'x' * 40]
+    path.write_text(' [ ' + ' , '.join(json.dumps(_, ensure_ascii=False)
+                                       for _ in items) + ' ] ')
+    for chunk_bytes in range(1, 40):
+        assert list(iter_json_array(path, chunk_bytes=chunk_bytes)) == items
+
+    # Numbers cut short by a chunk, such as '1.' or '2e', are not taken
+    # for whole numbers.
+    path.write_text('[1.5, 2e3, {"a": 1}, -7, 10]')
+    for chunk_bytes in range(1, 30):
+        assert list(iter_json_array(path, chunk_bytes=chunk_bytes)) == [
+            1.5, 2000.0, {'a': 1}, -7, 10]
+
+
+def test_grove_from_files(tmp_path):
+    r"""Test that reading files agrees with dataframe_from_iterator."""
+    paths = [write_ndjson(tmp_path / 'a.ndjson', records[:20]),
+             write_ndjson(str(tmp_path / 'b.ndjson.gz'), records[20:],
+                          gzip.open)]
+    expected = grove().dataframe_from_iterator(records)
+    pd.testing.assert_frame_equal(
+        grove().dataframe_from_ndjson(paths, chunk_bytes=64), expected)
+    df = grove().dataframe_from_ndjson(paths, workers=2, chunk_bytes=64)
+    pd.testing.assert_frame_equal(df, pd.concat(
+        grove().iter_dataframes(records, 20)))
+
+    path = tmp_path / 'c.json'
+    path.write_text(json.dumps(records))
+    pd.testing.assert_frame_equal(
+        grove().dataframe_from_json_array(path), expected)
+
+
+def test_pushdown(tmp_path):
+    r"""Test that decoding only selected values gives the same result."""
+    path = write_ndjson(tmp_path / 'a.ndjson', records)
+    expected = grove().dataframe_from_ndjson(path)
+    pd.testing.assert_frame_equal(
+        grove().dataframe_from_ndjson(path, pushdown=True), expected)
+    pd.testing.assert_frame_equal(
+        grove().dataframe_from_ndjson(path, workers=2, pushdown=True),
+        grove().dataframe_from_ndjson(path, workers=2))
+
+    path = tmp_path / 'b.json'
+    path.write_text(json.dumps(records))
+    pd.testing.assert_frame_equal(
+        grove().dataframe_from_json_array(path, pushdown=True), expected)
@@ -1,4 +1,6 @@
 """Test utility functions."""
+import numpy as np
+import pandas as pd
 from pytest import raises
 
 from shootsandleaves.leaf import get, Leaf
@@ -148,3 +150,129 @@ def test_copy_construction():
 
     with raises(ValueError):
         Leaf(leaf1, default=1)
+
+
+def test_compiled_accessors():
+    r"""Test compiled accessors over selectors of varying shape."""
+    # Long slice-free paths.
+    deep = {'a': {'b': {'c': {'d': {'e': 'deep'}}}}}
+    assert get(deep, 'a.b.c.d.e') == 'deep'
+    assert get(deep, 'a.b.c.x.e', 'default') == 'default'
+
+    # Fan-out preserves the type of the sliced iterable.
+    data = {'t': ({'x': 1}, {'x': 2}, {})}
+    assert get(data, 't.:.x') == (1, 2, None)
+
+    # Starting part way through a selector.
+    lf = Leaf(['I', 'A', 0, '1', 0, 'a'])
+    assert lf.get_from(dict_blob['I'], idx=1) == 'nested_deep'
+
+
+def test_get_cache():
+    r"""Test that cached accessors distinguish selectors and defaults."""
+    assert get(list_blob, [1, 1]) == 4
+    assert get(list_blob, [1, True]) == 4
+    assert get(list_blob, [1, 1.0], 'default') == 'default'
+    assert get(list_blob, [1, slice(1, None)]) == [4, 5]
+    assert get(list_blob, [1, slice(True, None)]) == [4, 5]
+    assert get(list_blob, [1, slice(1.0, None)], 'default') == 'default'
+
+    default = ['unhashable']
+    assert get({}, 'a.b', default=default) is default
+    assert get({}, 'a.b', default='other') == 'other'
+
+
+def test_equality():
+    r"""Test that Leaves are equal if their selectors and defaults are."""
+    assert Leaf('a.0.:2') == Leaf(['a', 0, slice(None, 2)])
+    assert hash(Leaf('a.0.:2')) == hash(Leaf(('a', 0, slice(None, 2))))
+    assert Leaf('a', default=[]) == Leaf('a', default=[])
+    assert Leaf('a') != Leaf('a', default=0)
+    assert Leaf('a', default=1) != Leaf('a', default=True)
+    assert Leaf('a', default=1) != Leaf('a', default=1.0)
+    array = np.arange(3)
+    assert Leaf('a', default=array) == Leaf('a', default=array)
+    assert Leaf('a', default=array) != Leaf('a', default=np.arange(3))
+    assert Leaf('a', default=pd.NA) == Leaf('a', default=pd.NA)
+    assert Leaf('a', default=pd.NA) != Leaf('a', default=None)
+    assert Leaf('a', default=[array]) != Leaf('a', default=[array.copy()])
+    assert Leaf('a') != Leaf('b')
+    assert Leaf([1]) != Leaf([True])
+    assert Leaf([1]) != Leaf([1.0])
+    assert Leaf('a') != 'a'
+    assert len({Leaf('a.b'), Leaf('a.b'), Leaf('a.c')}) == 2
+
+    # Copies share the selector rather than copying it.
+    leaf = Leaf('a.b')
+    assert Leaf(leaf).selector is leaf.selector
+
+
+def test_immutable_and_shared():
+    r"""Test that Leaves are immutable and share their selectors."""
+    leaf = Leaf('a.b', default=0)
+    with raises(AttributeError):
+        leaf.default = 1
+    with raises(AttributeError):
+        leaf.extra = 1
+    with raises(AttributeError):
+        del leaf.selector
+    assert not hasattr(leaf, '__dict__')
+
+    assert Leaf(['a', 'b']).selector is leaf.selector
+    assert Leaf(('a', 'b'))._accessor is leaf._accessor
+    assert Leaf([1]).selector is not Leaf([True]).selector
+    copy = Leaf(leaf)
+    assert copy._accessor is leaf._accessor and copy.default == 0
+
+    # However many selectors are in use.
+    leaves = [Leaf(f'f{i}.g') for i in range(3000)]
+    assert all(Leaf(f'f{i}.g')._accessor is leaves[i]._accessor
+               for i in range(3000))
+
+
+def test_get_many():
+    r"""Test evaluating a Leaf over many objects."""
+    leaf = Leaf('II.A.2', default='missing')
+    objs = [dict_blob, list_blob, {}]
+    assert leaf.get_many(objs) == [leaf.get_from(_) for _ in objs]
+    assert leaf.get_many(iter(objs)) == leaf.get_many(objs)
+    assert leaf.get_many([]) == []
+    values = Leaf('x').get_many([{'x': 1}, {'x': 2.5}, {}], dtype='float64')
+    assert values.dtype == 'float64'
+    assert values[:2].tolist() == [1.0, 2.5] and values[2] != values[2]
+
+
+def test_lookup_strategies():
+    r"""Test that guarded and raising lookups agree, and are adapted."""
+    from collections import defaultdict
+
+    from shootsandleaves.leaf import _PROBE_CALLS, _Lookup
+
+    objs = [dict_blob, list_blob, None, 'string', ('t', 'u'), {1: 'one'},
+            {True: 'true'}, defaultdict(lambda: 'made', a=[1]), [[0, 1]],
+            {'a': [{'b': 1}, {}, None]}, {'a': ({'b': 2}, 'y')}, 7]
+    selectors = [(), ('I', 'A', 0, '2'), (1, 0, -1), (0, 1), (1,), (-5,),
+                 (True,), ('a', 0), ('a', slice(None), 'b'),
+                 ('a', slice(1, None)), (slice(None), 0), ('III', 0),
+                 ('II', 'A', 2), (0, 'I', 'B', 'x'), ((1, 2),)]
+    for selector in selectors:
+        lookup = _Lookup(selector)
+        for obj in objs:
+            if isinstance(obj, str) and slice in map(type, selector):
+                # Slicing a str gives the str of a generator.
+                continue
+            assert lookup.guarded(obj, 'd') == lookup.raising(obj, 'd'), (
+                selector, obj)
+
+    lookup = _Lookup(('a', 'b'))
+    # Neither strategy is compiled before the first lookup.
+    assert lookup._guarded is None and lookup._raising is None
+    for _ in range(_PROBE_CALLS):
+        assert lookup.lookup({'a': {}}, None) is None
+    assert lookup.lookup == lookup.guarded
+    # The raising strategy is only compiled once it is used.
+    assert lookup._raising is None
+    lookup = _Lookup(('a', 'b'))
+    for _ in range(_PROBE_CALLS):
+        assert lookup.lookup({'a': {'b': 1}}, None) == 1
+    assert lookup.lookup == lookup.raising
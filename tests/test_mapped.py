@@ -0,0 +1,99 @@
+r"""Tests for memory-mapped output."""
+import mmap
+import os
+
+import numpy as np
+from pandas.testing import assert_frame_equal
+from pytest import raises
+
+from shootsandleaves.grove import Grove
+from shootsandleaves.mapped import (METADATA, open_mapped, read_mapped,
+                                    read_metadata)
+from shootsandleaves.shoot import Shoot
+
+records = [
+    {'id': i, 'score': None if i % 4 == 0 else i / 2,
+     'flag': None if i == 3 else i % 2 == 0,
+     'kind': [None, 'a', 'b'][i % 3],
+     'at': None if i == 5 else '2020-01-0%d' % (i % 9 + 1)}
+    for i in range(10)
+]
+
+grove = Grove([
+    Shoot('id', dtype='int64'),
+    Shoot('score', dtype='float64'),
+    Shoot('flag', dtype='bool'),
+    Shoot('kind', dtype='category'),
+    Shoot('at', dtype='datetime64[ns]'),
+])
+
+
+def is_mapped(array):
+    r"""Return whether `array` is a view of a memory map."""
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def test_write_mapped(tmp_path):
+    r"""Test that columns written in chunks read back as extracted."""
+    metadata = grove.write_mapped(iter(records), tmp_path, chunk_rows=3)
+    assert metadata == read_metadata(tmp_path)
+    assert metadata['rows'] == 10
+    assert [_['null_count'] for _ in metadata['columns']] == [0, 3, 1, 4, 1]
+    # Only integer and bool columns with missing values have a mask.
+    assert sorted(os.listdir(tmp_path)) == [
+        METADATA, 'column0.values', 'column1.values', 'column2.mask',
+        'column2.values', 'column3.values', 'column4.values']
+
+    expected = grove.dataframe_from_iterator(records)
+    df = read_mapped(tmp_path)
+    assert_frame_equal(df, expected, check_categorical=False)
+    assert list(df['kind'].cat.categories) == ['a', 'b']
+    assert df['flag'].dtype == 'boolean'
+
+    arrays = open_mapped(tmp_path)
+    values, mask = arrays['id']
+    assert isinstance(values, np.memmap) and mask is None
+    assert is_mapped(df['id'].to_numpy())
+    assert list(arrays['flag'][1]) == [_ == 3 for _ in range(10)]
+
+
+def test_read_mapped_columns(tmp_path):
+    r"""Test reading some of the columns, with the Grove's index."""
+    indexed = Grove(grove.shoots, index='id')
+    indexed.write_mapped(records, tmp_path)
+    df = read_mapped(tmp_path, columns=['score'])
+    assert list(df.columns) == ['score']
+    assert list(df.index) == list(range(10))
+
+
+def test_write_mapped_empty(tmp_path):
+    r"""Test that no rows read back as an empty DataFrame."""
+    grove.write_mapped([], tmp_path)
+    df = read_mapped(tmp_path)
+    assert len(df) == 0
+    assert list(df.dtypes) == [
+        np.dtype('int64'), np.dtype('float64'), np.dtype('bool'), 'category',
+        np.dtype('datetime64[ns]')]
+
+
+def test_write_mapped_errors(tmp_path):
+    r"""Test that columns without an array dtype are rejected."""
+    with raises(ValueError, match="'name'"):
+        Grove([Shoot('name')]).write_mapped(records, tmp_path)
+    vectorized = Shoot('double', 'id', dtype='int64',
+                       vectorized_transform=lambda x: x * 2)
+    with raises(ValueError, match="'double'"):
+        Grove([vectorized]).write_mapped(records, tmp_path)
+    with raises(ValueError, match='chunk_rows'):
+        grove.write_mapped(records, tmp_path, chunk_rows=0)
+
+
+def test_write_mapped_replaces(tmp_path):
+    r"""Test that writing again replaces the earlier files."""
+    grove.write_mapped(records, tmp_path)
+    grove.write_mapped(records[:2], tmp_path)
+    assert list(read_mapped(tmp_path)['id']) == [0, 1]
@@ -0,0 +1,114 @@
+r"""Tests for the Projection class.
+
+A projected object must give every selector the same result as the
+fully decoded object, so most tests compare the two.
+"""
+import json
+
+from pytest import mark, raises
+
+from shootsandleaves.leaf import Leaf
+from shootsandleaves.projection import Projection
+
+document = {
+    'user': {'id': 7, 'name': 'Apple', 'bio': 'a [long] "bio" {}'},
+    'items': [
+        {'sku': 'a', 'qty': 1, 'tags': ['x', 'y'], 'blob': {'z': [1, 2]}},
+        {'sku': 'b', 'skip': [[], {}, '\\"]']},
+        3,
+        'text',
+        [{'sku': 'nested'}],
+    ],
+    'log': [{'event': i, 'data': [None, True, 1.5e3]} for i in range(20)],
+    'flag': False,
+    'empty': {},
+    'number': -1.25,
+    'list_or_dict': [1, 2],
+}
+
+selectors = [
+    'user.id',
+    'user.name.0',
+    'items.:.sku',
+    'items.0.tags',
+    'items.-1.0.sku',
+    'items.1:.qty',
+    'flag',
+    'empty.x',
+    'number',
+    'list_or_dict.x',
+    'missing.deeper',
+    ('user', 1.5),
+]
+
+lazy = mark.skipif(not Projection.lazy, reason='requires pysimdjson')
+
+
+def check(selectors, obj):
+    r"""Assert that a projection agrees with the document on selectors."""
+    text = json.dumps(obj, indent=1)
+    projected = Projection(selectors).loads(text)
+    for selector in selectors:
+        leaf = Leaf(selector, default='default')
+        assert leaf.get_from(projected) == leaf.get_from(obj)
+    return projected
+
+
+def test_agrees_with_full_decode():
+    r"""Test a projection of many selectors."""
+    check(selectors, document)
+    for obj in ([], 'text', 1, None, [document], {'number': float('inf')}):
+        check(selectors, obj)
+
+
+@lazy
+def test_unselected_values_are_skipped():
+    r"""Test that only the selected values are decoded."""
+    projected = check(selectors, document)
+    assert 'log' not in projected
+    assert 'bio' not in projected['user']
+    assert projected['list_or_dict'] == []
+    assert projected['items'][0] == {'sku': 'a', 'qty': 1,
+                                     'tags': ['x', 'y']}
+
+
+def test_whole_values():
+    r"""Test that selectors ending at a container decode all of it."""
+    assert check(['user', 'user.id'], document)['user'] == document['user']
+    assert check([None], document) == document
+    assert check(['log.:'], document)['log'] == document['log']
+
+
+def test_bytes_and_errors():
+    r"""Test decoding bytes, and invalid documents."""
+    projection = Projection(['a.b'])
+    assert projection.loads(b' {"a": {"b": "\\u00e9"}} ') == {
+        'a': {'b': 'é'}}
+    for text in ('', '{"a": }', '{"a": 1} x', '{"c": [1, 2'):
+        with raises(ValueError):
+            projection.loads(text)
+
+
+@lazy
+def test_iter_array():
+    r"""Test projecting the items of an array."""
+    projection = Projection(['user.id'])
+    text = json.dumps([document, {}, document])
+    items = projection.iter_array(text)
+    assert next(items) == {'user': {'id': 7}}
+    assert projection.loads('{"user": {}}') == {'user': {}}
+    assert list(items) == [{}, {'user': {'id': 7}}]
+    assert list(projection.iter_array('[NaN]'))[0] != 0
+    with raises(ValueError):
+        list(projection.iter_array('{}'))
+
+
+def test_big_integers():
+    r"""Test that integers wider than 64 bits decode as json does."""
+    big = 10 ** 20
+    projection = Projection(['a'])
+    assert projection.loads(json.dumps({'a': big}))['a'] == big
+    assert projection.loads(json.dumps({'b': big, 'a': 1}))['a'] == 1
+    text = json.dumps([{'a': 1}, {'a': [1, big]}, {'a': 3}])
+    assert [Leaf('a').get_from(_) for _ in projection.iter_array(text)] == [
+        1, [1, big], 3]
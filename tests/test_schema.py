@@ -0,0 +1,21 @@
+r"""Tests for dtype inference."""
+from datetime import datetime, timezone
+
+from shootsandleaves.schema import infer_dtype
+
+
+def test_infer_dtype():
+    r"""Test the dtype inferred for samples of values."""
+    assert infer_dtype([]) is None
+    assert infer_dtype([None, float('nan')]) is None
+    assert infer_dtype([True, None, False]) == 'bool'
+    assert infer_dtype([1, None, 2]) == 'int64'
+    assert infer_dtype([1, 2.5]) == 'float64'
+    assert infer_dtype([1, True]) == 'object'
+    assert infer_dtype([datetime(2020, 1, 1), None]) == 'datetime64[ns]'
+    assert infer_dtype([datetime(2020, 1, 1, tzinfo=timezone.utc)]) == \
+        'object'
+    assert infer_dtype(['a', 'b', 'a', 'a']) == 'category'
+    assert infer_dtype(['a', 'b', 'c', 'a']) == 'str'
+    assert infer_dtype([[1], [2]]) == 'object'
+    assert infer_dtype(['a', 1]) == 'object'
@@ -4,6 +4,7 @@ The basic pattern in this file is to construct Shoots in many different
 ways, and verify that s.column_name, s.project, and s.extract all behave
 as expected.
 """
+import pandas as pd
 from pytest import raises
 from shootsandleaves.leaf import Leaf
 from shootsandleaves.shoot import Shoot
@@ -129,3 +130,66 @@ def test_explicit_leaves():
 
     with raises(AssertionError):
         s = Shoot('a', explicit_leaves=['a'])
+
+
+def test_vectorized_transform():
+    r"""Test transforms that act on whole columns."""
+    objs = [data, {'time': '2019-05-06 07:08'}, {}]
+    s = Shoot('time', vectorized_transform=pd.to_datetime)
+    values = s.extract_from_projections([[s.project(_)[0] for _ in objs]])
+    assert list(values[:2]) == [pd.Timestamp('2018-01-02 03:45'),
+                                pd.Timestamp('2019-05-06 07:08')]
+    # Transforms are not applied to default values.
+    assert pd.isna(values[2])
+    assert s.extract(data) == pd.Timestamp('2018-01-02 03:45')
+    assert pd.isna(s.extract({}))
+
+    s = Shoot('total', ['coordinates.x', 'coordinates.y'], default=0,
+              vectorized_transform=lambda args: args[0] + args[1],
+              dtype='float64')
+    values = s.extract_from_projections([[10, 1, 0], [20, 2, 0]])
+    assert values.tolist() == [30.0, 3.0, 0.0]
+    assert str(values.dtype) == 'float64'
+    assert s.extract(data) == 30
+
+    s = Shoot('name', transform=str.upper)
+    values = s.extract_from_projections([['a', None]])
+    assert values[0] == 'A' and pd.isna(values[1])
+
+    with raises(AssertionError):
+        Shoot('a', transform=str, vectorized_transform=str)
+
+
+def test_immutable():
+    r"""Test that Shoots are immutable."""
+    s = Shoot('first_name', transform=str.upper)
+    with raises(AttributeError):
+        s.dtype = 'category'
+    with raises(AttributeError):
+        s.extra = 1
+    assert not hasattr(s, '__dict__')
+    assert s.transform is str.upper
+    assert isinstance(s.explicit_leaves, tuple)
+
+
+def test_extract_many():
+    r"""Test extracting from many objects at once."""
+    objs = [data, {'coordinates': {'x': 1}}, {}]
+    shoots = [
+        Shoot('first_name'),
+        Shoot('x', 'coordinates.x', dtype='int64'),
+        Shoot('sum', ['coordinates.x', 'coordinates.y'],
+              transform=lambda args: sum(_ or 0 for _ in args)),
+        Shoot('upper', 'first_name', transform=str.upper),
+        Shoot('count', 'emails', default=[], transform=len),
+        Shoot('scaled', 'value', vectorized_transform=lambda x: x * 10),
+    ]
+    for shoot in shoots[:1] + shoots[2:]:
+        pd.testing.assert_series_equal(
+            shoot.extract_many(objs),
+            pd.Series([shoot.extract(_) for _ in objs]))
+    assert str(shoots[1].extract_many(objs).dtype) == 'Int64'
+    assert shoots[1].extract_many(objs).tolist()[:2] == [10, 1]
+    assert shoots[1].extract_many(iter(objs), dtype='float64').dtype == \
+        'float64'
+    assert shoots[5].extract_many(objs, dtype='float32').dtype == 'float32'
@@ -0,0 +1,96 @@
+r"""Tests for bulk inserts through DB-API connections."""
+import sqlite3
+
+from pytest import raises
+
+from shootsandleaves.grove import Grove
+from shootsandleaves.shoot import Shoot
+from shootsandleaves.sql import insert_rows, insert_statement
+
+grove = Grove([
+    Shoot('id', 'user.id'),
+    Shoot('name', 'user.name', transform=str.upper),
+    Shoot('amount', 'payment.amount'),
+])
+
+records = [
+    {'user': {'id': i, 'name': f'n{i}'}, 'payment': {'amount': i / 2}}
+    for i in range(10)
+] + [{'user': {'id': 10}}]
+
+
+class CountingConnection(object):
+    r"""A sqlite3 connection counting batches, commits and rollbacks."""
+
+    def __init__(self):
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute(
+            'CREATE TABLE "rows" (id INTEGER PRIMARY KEY, name TEXT, '
+            'amount REAL)')
+        self.batches = []
+        self.commits = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        cursor = self.connection.cursor()
+        outer = self
+
+        class Cursor(object):
+            def executemany(self, statement, rows):
+                outer.batches.append(len(rows))
+                return cursor.executemany(statement, rows)
+
+            def close(self):
+                cursor.close()
+        return Cursor()
+
+    def commit(self):
+        self.commits.append(sum(self.batches))
+        self.connection.commit()
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.connection.rollback()
+
+    def rows(self):
+        return self.connection.execute(
+            'SELECT * FROM "rows" ORDER BY id').fetchall()
+
+
+def test_insert_statement():
+    r"""Test that statements use the placeholders of the paramstyle."""
+    assert insert_statement('t', ['a', 'b"c']) == (
+        'INSERT INTO "t" ("a", "b""c") VALUES (?, ?)')
+    assert insert_statement('t', ['a', 'b'], 'numeric').endswith(
+        'VALUES (:1, :2)')
+    assert insert_statement('t', ['a'], 'format').endswith('VALUES (%s)')
+    with raises(ValueError, match='paramstyle'):
+        insert_statement('t', ['a'], 'named')
+
+
+def test_insert_rows():
+    r"""Test that rows are inserted in batches, with periodic commits."""
+    connection = CountingConnection()
+    statement = insert_statement(
+        'rows', [shoot.column_name for shoot in grove.shoots])
+    count = insert_rows(connection, statement, grove.iter_rows(records),
+                        batch_size=3, commit_interval=5)
+    assert count == 11
+    assert connection.batches == [3, 3, 3, 2]
+    assert connection.commits == [6, 11]
+    assert connection.rows()[0] == (0, 'N0', 0.0)
+    assert connection.rows()[-1] == (10, None, None)
+
+
+def test_insert_rows_rollback():
+    r"""Test that uncommitted rows are rolled back when a batch fails."""
+    connection = CountingConnection()
+    statement = insert_statement('rows', ['id'])
+    rows = [(1,), (2,), (3,), (1,)]
+    with raises(sqlite3.IntegrityError):
+        insert_rows(connection, statement, rows, batch_size=2,
+                    commit_interval=2)
+    assert connection.rollbacks == 1
+    assert connection.rows() == [(1, None, None), (2, None, None)]
+    with raises(ValueError, match='batch_size'):
+        insert_rows(connection, statement, rows, batch_size=0)
@@ -0,0 +1,68 @@
+r"""Tests for Grove profiling counters."""
+import pandas as pd
+from pytest import raises
+
+from shootsandleaves.grove import Grove
+from shootsandleaves.shoot import Shoot
+from shootsandleaves.stats import selector_string
+
+records = [
+    {'user': {'id': 1}, 'items': [{'sku': 'a'}, {'sku': 'b'}, {}]},
+    {'user': {'id': 2}, 'items': []},
+    {'user': None},
+]
+
+
+def shoots():
+    r"""Return a list of Shoots over `records`."""
+    return [
+        Shoot('id', 'user.id'),
+        Shoot('double', 'user.id', transform=lambda x: 2 * x),
+        Shoot('skus', 'items.:.sku'),
+        Shoot('items', 'items.:'),
+        Shoot('name', 'user.name', default=''),
+    ]
+
+
+def test_stats():
+    r"""Test the counters after a run."""
+    grove = Grove(shoots(), stats=True)
+    df = grove.dataframe_from_iterator(records)
+    pd.testing.assert_frame_equal(
+        df, Grove(shoots()).dataframe_from_iterator(records))
+
+    stats = grove.stats.to_dict()
+    assert list(stats['shoots']) == ['id', 'double', 'skus', 'items',
+                                    'name']
+    assert stats['shoots']['double']['calls'] == 3
+    assert stats['shoots']['double']['defaults'] == 1
+    assert stats['shoots']['name']['defaults'] == 3
+    assert stats['shoots']['double']['transform_seconds'] > 0
+
+    leaves = grove.stats.to_dataframe('leaves').set_index('selector')
+    assert leaves.loc['user.id', 'errors'] == 1
+    assert leaves.loc['user.name', 'errors'] == 3
+    assert leaves.loc['items.:.sku', 'defaults'] == 1
+    assert leaves.loc['items.:.sku', 'errors'] == 2
+    assert leaves.loc['items.:.sku', 'fan_outs'] == 2
+    assert leaves.loc['items.:.sku', 'fan_out_items'] == 3
+    assert leaves.loc['items.:.sku', 'max_fan_out'] == 3
+    # A final slice counts the size of its result.
+    assert leaves.loc['items.:', 'fan_outs'] == 2
+    assert leaves.loc['items.:', 'fan_out_items'] == 3
+    assert leaves.loc['items.:', 'max_fan_out'] == 3
+    assert len(leaves) == 4
+
+    # Counters are reset for each run.
+    list(grove.iter_dataframes(records[:1], 1))
+    assert grove.stats.to_dict()['shoots']['id']['calls'] == 1
+
+    with raises(ValueError):
+        grove.stats.to_dataframe('trees')
+    assert Grove(shoots()).stats is None
+
+
+def test_selector_string():
+    r"""Test the dotted form of selectors."""
+    assert selector_string(('a', 1, slice(None), slice(1, -1), slice(2),
+                            slice(None, None, 2))) == 'a.1.:.1:-1.:2.::2'